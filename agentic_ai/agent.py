@@ -1,8 +1,22 @@
 # agentic_ai/agent.py
 
 from google.adk.agents import Agent
-from agentic_ai.tools import save_attachment_data, get_all_purchases_for_a_user, generate_wallet_pass_url_for_shopping_list
+from agentic_ai.tools import (
+    DUPLICATE_RECEIPT_FILTER,
+    save_attachment_data,
+    get_all_purchases_for_a_user,
+    search_purchases,
+    get_top_purchases_by_amount,
+    get_spending_by_period,
+    get_monthly_spending_summary,
+    get_dashboard_data,
+    get_insights_data,
+    generate_wallet_pass_url_for_shopping_list,
+)
 from agentic_ai.callbacks import modify_image_data_in_history
+from agentic_ai.router import INTENT_ROUTER, IntentRouterAgent
+from agentic_ai import model_policy
+from agentic_ai.model_policy import MODEL_POLICY
 import os
 from settings import get_settings
 from google.adk.planners import BuiltInPlanner
@@ -13,24 +27,111 @@ os.environ["GOOGLE_CLOUD_PROJECT"] = SETTINGS.GCLOUD_PROJECT_ID
 os.environ["GOOGLE_CLOUD_LOCATION"] = SETTINGS.GCLOUD_LOCATION
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "TRUE"
 
-# Get the code file directory path and read the task prompt file
+# Get the code file directory path, every sub-agent only gets the prompt sections it needs
 current_dir = os.path.dirname(os.path.abspath(__file__))
-prompt_path = os.path.join(current_dir, "task_prompt.md")
-with open(prompt_path, "r") as file:
-    task_prompt = file.read()
+prompts_dir = os.path.join(current_dir, "prompts")
+
+
+def load_prompt(*names: str) -> str:
+    """Read and join prompt sections from the prompts directory."""
+    sections = []
+    for name in names:
+        with open(os.path.join(prompts_dir, f"{name}.md"), "r") as file:
+            sections.append(file.read())
+    return "\n\n".join(sections)
+
+
+def make_intent_agent(
+    name: str, description: str, instruction: str, tools: list, before_model_callbacks: tuple = ()
+) -> Agent:
+    """Create a sub-agent answering one intent, with the model settings and callbacks shared by all of them.
+
+    `before_model_callbacks` run after the fixed-format router and before the shared history callbacks.
+    """
+    return Agent(
+        name=name,
+        model="gemini-2.5-flash",
+        description=description,
+        instruction=instruction,
+        tools=tools,
+        # Default thinking budget, MODEL_POLICY adjusts it and the model to the intent of each turn
+        planner=BuiltInPlanner(
+            thinking_config=types.ThinkingConfig(
+                thinking_budget=8096,
+            )
+        ),
+        # Fixed-format requests are answered by the router, the others go on to the model
+        before_model_callback=[
+            INTENT_ROUTER,
+            *before_model_callbacks,
+            modify_image_data_in_history,
+            MODEL_POLICY.before_model,
+        ],
+        after_model_callback=MODEL_POLICY.after_model,
+        # Turns are routed by the root agent only
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
+
+extraction_agent = make_intent_agent(
+    name="extraction_agent",
+    description="Extracts receipts, product packaging and warranty cards from images and stores them",
+    instruction=load_prompt("extraction"),
+    tools=[save_attachment_data],
+    # Images of receipts already saved are answered without extraction
+    before_model_callbacks=(DUPLICATE_RECEIPT_FILTER,),
+)
 
-root_agent = Agent(
+dashboard_agent = make_intent_agent(
+    name="dashboard_agent",
+    description="Returns the Dashboard screen data",
+    instruction=load_prompt("screens", "dashboard"),
+    tools=[get_dashboard_data],
+)
+
+insights_agent = make_intent_agent(
+    name="insights_agent",
+    description="Returns the Insights screen data",
+    instruction=load_prompt("screens", "insights"),
+    tools=[get_insights_data],
+)
+
+query_agent = make_intent_agent(
+    name="query_agent",
+    description="Answers free-form questions about the purchase history and general questions",
+    instruction=load_prompt("query"),
+    tools=[
+        search_purchases,
+        get_top_purchases_by_amount,
+        get_spending_by_period,
+        get_monthly_spending_summary,
+        get_all_purchases_for_a_user,
+        generate_wallet_pass_url_for_shopping_list,
+    ],
+)
+
+shopping_list_agent = make_intent_agent(
+    name="shopping_list_agent",
+    description="Creates Google Wallet shopping list passes, recipes and item lists",
+    instruction=load_prompt("shopping_list"),
+    tools=[generate_wallet_pass_url_for_shopping_list, search_purchases],
+)
+
+root_agent = IntentRouterAgent(
     name="expense_manager_agent",
-    model="gemini-2.5-flash",
     description=(
         "Personal expense agent to help user track expenses, analyze receipts and purchases, and manage their financial records"
     ),
-    instruction=task_prompt,
-    tools=[save_attachment_data, get_all_purchases_for_a_user, generate_wallet_pass_url_for_shopping_list],
-    planner=BuiltInPlanner(
-        thinking_config=types.ThinkingConfig(
-            thinking_budget=8096,
-        )
-    ),
-    before_model_callback=modify_image_data_in_history,
+    sub_agents=[extraction_agent, dashboard_agent, insights_agent, query_agent, shopping_list_agent],
+    classifier=MODEL_POLICY.classifier,
+    intent_agents={
+        model_policy.RECEIPT_EXTRACTION: extraction_agent.name,
+        model_policy.DASHBOARD: dashboard_agent.name,
+        model_policy.INSIGHTS: insights_agent.name,
+        model_policy.SHOPPING_LIST: shopping_list_agent.name,
+        model_policy.FREE_FORM_QUERY: query_agent.name,
+        model_policy.CHIT_CHAT: query_agent.name,
+    },
+    default_agent=query_agent.name,
 )
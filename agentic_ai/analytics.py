@@ -0,0 +1,256 @@
+# agentic_ai/analytics.py
+
+import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from agentic_ai.purchase_time import current_time, format_display_date, parse_purchased_at
+
+# Dashboard rules from prompts/dashboard.md
+MONTHS_IN_GRAPH = 6
+RECENT_ITEMS_COUNT = 3
+TOP_CATEGORIES_COUNT = 3
+TOP_ITEMS_PER_CATEGORY = 5
+SAVE_MORE_COUNT = 2
+SAVE_MORE_MIN_DIFFERENCE = 0.02
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_ONE_SECOND = datetime.timedelta(seconds=1)
+_NAT = np.iinfo(np.int64).min
+
+
+def _to_number(value: Any) -> float:
+    """Convert a receipt value to float, treating missing or invalid values as 0."""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def item_total(item: Dict[str, Any]) -> float:
+    """Return the amount spent on a receipt item, its totalPrice, or unitPrice * quantity when it has none."""
+    total_price = item.get("totalPrice")
+    if total_price is not None:
+        return _to_number(total_price)
+    return _to_number(item.get("unitPrice")) * (_to_number(item.get("quantity")) or 1.0)
+
+
+def _encode(vocabulary: Dict[str, int], value: str) -> int:
+    """Return the integer code of a value, adding it to the vocabulary if needed."""
+    code = vocabulary.get(value)
+    if code is None:
+        code = len(vocabulary)
+        vocabulary[value] = code
+    return code
+
+
+class PurchaseColumns:
+    """Columnar view of a purchase history.
+
+    Receipt level and item level values are stored in parallel numpy arrays,
+    strings are dictionary encoded into integer codes, so that aggregations
+    can be expressed as vectorized numpy operations.
+
+    Attributes:
+        receipt_time: Local purchase time of every receipt (datetime64[s], NaT if unknown).
+        receipt_total: Total amount of every receipt.
+        item_time: Local purchase time of every item, copied from its receipt.
+        item_amount: Total price of every item.
+        item_unit_price: Unit price of every item.
+        item_name: Name code of every item, see `names`.
+        item_category: Category code of every item, see `categories`.
+        item_merchant: Merchant code of every item, see `merchants`.
+        names: Item names indexed by code.
+        categories: Categories indexed by code.
+        merchants: Merchant names indexed by code.
+    """
+
+    def __init__(self, purchases: List[Dict[str, Any]]):
+        receipt_time, receipt_total = [], []
+        item_time, item_amount, item_unit_price = [], [], []
+        item_name, item_category, item_merchant = [], [], []
+        names, categories, merchants = {}, {}, {}
+
+        for purchase in purchases:
+            purchased_at = parse_purchased_at(purchase.get("purchasedAt"))
+            # Keep the local wall clock time, month and day boundaries are local
+            timestamp = (
+                (purchased_at.replace(tzinfo=None) - _EPOCH) // _ONE_SECOND if purchased_at else _NAT
+            )
+            merchant_code = _encode(merchants, purchase.get("merchantName") or "Unknown")
+            receipt_time.append(timestamp)
+            receipt_total.append(_to_number(purchase.get("totalAmount")))
+
+            for item in purchase.get("items") or []:
+                amount = item_total(item)
+                unit_price = _to_number(item.get("unitPrice")) or amount / (_to_number(item.get("quantity")) or 1.0)
+
+                item_time.append(timestamp)
+                item_amount.append(amount)
+                item_unit_price.append(unit_price)
+                item_name.append(_encode(names, item.get("name") or "Unknown"))
+                item_category.append(_encode(categories, item.get("category") or "Other"))
+                item_merchant.append(merchant_code)
+
+        self.receipt_time = np.array(receipt_time, dtype=np.int64).view("datetime64[s]")
+        self.receipt_total = np.array(receipt_total, dtype=np.float64)
+        self.item_time = np.array(item_time, dtype=np.int64).view("datetime64[s]")
+        self.item_amount = np.array(item_amount, dtype=np.float64)
+        self.item_unit_price = np.array(item_unit_price, dtype=np.float64)
+        self.item_name = np.array(item_name, dtype=np.int64)
+        self.item_category = np.array(item_category, dtype=np.int64)
+        self.item_merchant = np.array(item_merchant, dtype=np.int64)
+        self.names = list(names)
+        self.categories = list(categories)
+        self.merchants = list(merchants)
+
+
+def _local_now(now: datetime.datetime | None) -> np.datetime64:
+    """Return the reference time as a naive local datetime64."""
+    now = now or current_time()
+    return np.datetime64(now.replace(tzinfo=None), "s")
+
+
+def _total_last_30_days(columns: PurchaseColumns, now: np.datetime64) -> float:
+    """Sum of receipt totals in the last 30 days."""
+    start = now - np.timedelta64(30, "D")
+    in_range = (columns.receipt_time >= start) & (columns.receipt_time <= now)
+    return round(float(columns.receipt_total[in_range].sum()), 2)
+
+
+def _monthly_expense_graph(columns: PurchaseColumns, now: np.datetime64) -> List[Dict[str, Any]]:
+    """Receipt totals per month, for the last 6 months including the current one."""
+    current_month = now.astype("datetime64[M]")
+    months = current_month - np.arange(MONTHS_IN_GRAPH - 1, -1, -1)
+
+    valid = ~np.isnat(columns.receipt_time)
+    offsets = (columns.receipt_time[valid].astype("datetime64[M]") - months[0]).astype(np.int64)
+    in_range = (offsets >= 0) & (offsets < MONTHS_IN_GRAPH)
+    totals = np.bincount(
+        offsets[in_range],
+        weights=columns.receipt_total[valid][in_range],
+        minlength=MONTHS_IN_GRAPH,
+    )
+
+    return [
+        {"month": month.astype(datetime.date).strftime("%B"), "amount": round(float(total), 2)}
+        for month, total in zip(months, totals)
+    ]
+
+
+def _recent_spending(columns: PurchaseColumns) -> List[Dict[str, Any]]:
+    """The 3 most recently purchased items."""
+    valid = np.flatnonzero(~np.isnat(columns.item_time))
+    # Stable sort, reversed, so later items of the same receipt come first
+    order = valid[np.argsort(columns.item_time[valid], kind="stable")[::-1][:RECENT_ITEMS_COUNT]]
+
+    return [
+        {
+            "name": columns.names[columns.item_name[idx]],
+            "purchaseDate": format_display_date(columns.item_time[idx].astype(datetime.datetime)),
+            "amount": round(float(columns.item_amount[idx]), 2),
+            "category": columns.categories[columns.item_category[idx]],
+        }
+        for idx in order
+    ]
+
+
+def _save_more(columns: PurchaseColumns, category_code: int) -> List[Dict[str, Any]]:
+    """Items of a category that were bought cheaper at another merchant."""
+    in_category = np.flatnonzero(columns.item_category == category_code)
+    if in_category.size == 0:
+        return []
+
+    # Sort by item name, then unit price: first and last row of every name group
+    # are the cheapest and the most expensive purchase of that item
+    names = columns.item_name[in_category]
+    prices = columns.item_unit_price[in_category]
+    order = in_category[np.lexsort((prices, names))]
+    sorted_names = columns.item_name[order]
+    group_starts = np.flatnonzero(np.r_[True, sorted_names[1:] != sorted_names[:-1]])
+    group_ends = np.r_[group_starts[1:], sorted_names.size] - 1
+
+    cheaper, higher = order[group_starts], order[group_ends]
+    cheaper_price = columns.item_unit_price[cheaper]
+    higher_price = columns.item_unit_price[higher]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difference = np.where(higher_price > 0, (higher_price - cheaper_price) / higher_price, 0.0)
+    eligible = (difference > SAVE_MORE_MIN_DIFFERENCE) & (
+        columns.item_merchant[cheaper] != columns.item_merchant[higher]
+    )
+
+    candidates = np.flatnonzero(eligible)
+    candidates = candidates[np.argsort(-difference[candidates], kind="stable")[:SAVE_MORE_COUNT]]
+
+    return [
+        {
+            "name": columns.names[columns.item_name[cheaper[idx]]],
+            "cheaperPrice": round(float(cheaper_price[idx]), 2),
+            "cheaperMerchantName": columns.merchants[columns.item_merchant[cheaper[idx]]],
+            "higherPrice": round(float(higher_price[idx]), 2),
+            "higherMerchantName": columns.merchants[columns.item_merchant[higher[idx]]],
+            "savings": f"Save {round(float(difference[idx]) * 100)}%",
+        }
+        for idx in candidates
+    ]
+
+
+def _top_spending_categories(columns: PurchaseColumns) -> List[Dict[str, Any]]:
+    """Top 3 categories by total amount, with their items and saving opportunities."""
+    if columns.item_amount.size == 0:
+        return []
+
+    category_totals = np.bincount(
+        columns.item_category, weights=columns.item_amount, minlength=len(columns.categories)
+    )
+    top_categories = np.argsort(-category_totals, kind="stable")[:TOP_CATEGORIES_COUNT]
+
+    # Cumulative amount per (category, item name) pair
+    pair_keys = columns.item_category * len(columns.names) + columns.item_name
+    unique_pairs, inverse = np.unique(pair_keys, return_inverse=True)
+    pair_totals = np.bincount(inverse, weights=columns.item_amount)
+    pair_categories = unique_pairs // len(columns.names)
+    pair_names = unique_pairs % len(columns.names)
+
+    result = []
+    for category_code in top_categories:
+        pairs = np.flatnonzero(pair_categories == category_code)
+        pairs = pairs[np.argsort(-pair_totals[pairs], kind="stable")[:TOP_ITEMS_PER_CATEGORY]]
+        result.append(
+            {
+                "category": columns.categories[category_code],
+                "amount": round(float(category_totals[category_code]), 2),
+                "items": [
+                    {"name": columns.names[pair_names[idx]], "amount": round(float(pair_totals[idx]), 2)}
+                    for idx in pairs
+                ],
+                "saveMore": _save_more(columns, category_code),
+            }
+        )
+
+    return result
+
+
+def build_dashboard(
+    purchases: List[Dict[str, Any]] | PurchaseColumns,
+    now: datetime.datetime | None = None,
+) -> Dict[str, Any]:
+    """Build the "Dashboard" screen data described in prompts/dashboard.md.
+
+    Args:
+        purchases: The purchase history of a user, or a columnar view of it.
+        now: Reference time, defaults to the current time in Asia/Kolkata.
+
+    Returns:
+        Dict[str, Any]: The Dashboard screen JSON object.
+    """
+    columns = purchases if isinstance(purchases, PurchaseColumns) else PurchaseColumns(purchases)
+    local_now = _local_now(now)
+
+    return {
+        "totalMonthlyExpense": _total_last_30_days(columns, local_now),
+        "monthlyExpenseGraph": _monthly_expense_graph(columns, local_now),
+        "recentSpending": _recent_spending(columns),
+        "topSpendingCategories": _top_spending_categories(columns),
+    }
@@ -0,0 +1,40 @@
+# agentic_ai/backfill_index.py
+
+"""Backfill of the index fields of the receipts stored with an older INDEX_VERSION.
+
+Usage:
+    python -m agentic_ai.backfill_index [--batch-size 500]
+
+Recomputes the normalized purchase time, the day, ISO week and month buckets
+and the filter keys of `purchase_queries.build_index_fields` in the
+repository selected by PURCHASE_REPOSITORY. It can run while the agent
+serves requests, and again after an interruption: documents already at the
+current version are skipped.
+"""
+
+import argparse
+import json
+import time
+
+import logger
+from agentic_ai.purchase_queries import INDEX_VERSION
+from agentic_ai.purchase_repository import create_repository
+from settings import get_settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the index fields of the stored receipts")
+    parser.add_argument("--batch-size", type=int, default=500, help="documents updated per write batch")
+    args = parser.parse_args()
+
+    repository = create_repository(get_settings())
+    start_time = time.perf_counter()
+    updated = repository.backfill_index_fields(batch_size=args.batch_size)
+    seconds = round(time.perf_counter() - start_time, 3)
+    logger.info("Index backfill done", updated=updated, index_version=INDEX_VERSION, seconds=seconds)
+    print(json.dumps({"updated": updated, "index_version": INDEX_VERSION, "seconds": seconds}, indent=2))
+    logger.stop_async_writer()
+
+
+if __name__ == "__main__":
+    main()
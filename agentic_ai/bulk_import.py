@@ -0,0 +1,341 @@
+# agentic_ai/bulk_import.py
+
+"""Bulk import of exported receipts into the purchase repository.
+
+Usage:
+    python -m agentic_ai.bulk_import receipts.jsonl --user-id USER_ID [--batch-size 500] [--workers 8]
+
+The file is either JSON Lines, one receipt per line, or a JSON array of
+receipts such as agentic_ai/datasetv2.json. It is streamed, never loaded
+whole in memory.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError
+
+import logger
+from agentic_ai.purchase_queries import build_index_fields
+from agentic_ai.purchase_time import parse_purchased_at
+from agentic_ai.receipt_dedup import purchase_document_id, purchase_key
+from schema import Receipt
+from settings import get_settings
+
+SETTINGS = get_settings()
+
+# Maximum number of writes in a batch, the Firestore limit
+MAX_BATCH_SIZE = 500
+
+# Backoff between the attempts to commit a batch, doubled on every retry, with full jitter
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+
+# Number of invalid records whose error is kept in the report
+MAX_REPORTED_ERRORS = 20
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_json_array(file: IO[str]) -> Iterator[Any]:
+    """Yield the elements of a JSON array one at a time, reading the file in chunks.
+
+    Raises:
+        ValueError: The file is not a single JSON array, elements decoded before the error were yielded
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        chunk = file.read(READ_CHUNK_SIZE)
+        buffer, position = buffer[position:] + chunk, 0
+        eof = not chunk
+        return not eof
+
+    def next_character() -> str:
+        """Skip the whitespace and return the next character, without consuming it, "" at the end of the file."""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return ""
+
+    if next_character() != "[":
+        raise ValueError("Expected a JSON array of receipts")
+    position += 1
+    closed = next_character() == "]"
+    if closed:
+        position += 1
+    while not closed:
+        if next_character() == "]":
+            raise ValueError("Expected an element after \",\" in the JSON array")
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                if not fill():
+                    raise
+                continue
+            if end == len(buffer) and not eof:
+                # A number or literal may continue in the next chunk, decode it again with more input
+                fill()
+                continue
+            break
+        position = end
+        yield element
+
+        separator = next_character()
+        if separator not in (",", "]"):
+            found = repr(separator) if separator else "the end of the file"
+            raise ValueError(f"Expected \",\" or \"]\" after an element of the JSON array, found {found}")
+        closed = separator == "]"
+        position += 1
+    if next_character():
+        raise ValueError("Unexpected content after the JSON array")
+
+
+def iter_records(file: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Yield the (record number, record) pairs of a JSON or JSON Lines file.
+
+    The format is detected from the first character, "[" for a JSON array.
+    Record numbers start at 1, and are line numbers for JSON Lines.
+
+    Raises:
+        ValueError: A line of a JSON Lines file is not valid JSON
+    """
+    first = ""
+    while True:
+        first = file.read(1)
+        if not first or not first.isspace():
+            break
+
+    if first == "[":
+        yield from enumerate(_iter_json_array(_Prepended(first, file)), start=1)
+        return
+
+    for number, line in enumerate(_Prepended(first, file), start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}")
+
+
+class _Prepended:
+    """A text file with the characters already consumed put back in front of it."""
+
+    def __init__(self, head: str, file: IO[str]):
+        self.head = head
+        self.file = file
+
+    def read(self, size: int = -1) -> str:
+        head, self.head = self.head, ""
+        return head + self.file.read(max(size - len(head), 0) if size >= 0 else -1)
+
+    def __iter__(self) -> Iterator[str]:
+        head, self.head = self.head, ""
+        first_line = head + self.file.readline()
+        if first_line:
+            yield first_line
+        yield from self.file
+
+
+def validate_receipt(record: Any) -> Dict[str, Any]:
+    """Validate an imported record against the receipt schema.
+
+    Args:
+        record: A decoded record of the import file
+
+    Returns:
+        Dict[str, Any]: The receipt, with the fields given in the record and their types normalized
+
+    Raises:
+        ValueError: If the record is not a valid receipt
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"Expected a receipt object, got {type(record).__name__}")
+    try:
+        receipt = Receipt.model_validate(record)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+    if parse_purchased_at(receipt.purchasedAt) is None:
+        raise ValueError(f"purchasedAt: unsupported date {receipt.purchasedAt!r}")
+    return receipt.model_dump(exclude_unset=True)
+
+
+class _ImportProgress:
+    """Counters of an import, updated by the committers."""
+
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+        self.errors: List[str] = []
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            seconds = time.monotonic() - self.started_at
+            return {
+                "read": self.read,
+                "imported": self.imported,
+                "invalid": self.invalid,
+                "failed": self.failed,
+                "batches": self.batches,
+                "retries": self.retries,
+                "seconds": round(seconds, 3),
+                "receipts_per_second": round(self.imported / seconds, 1) if seconds else 0.0,
+                "errors": list(self.errors),
+            }
+
+
+def import_receipts(
+    file: IO[str],
+    user_id: str,
+    repository=None,
+    batch_size: int = MAX_BATCH_SIZE,
+    workers: int | None = None,
+    max_retries: int | None = None,
+    progress_interval: float = 5.0,
+) -> Dict[str, Any]:
+    """Import the receipts of a JSON or JSON Lines file for a user.
+
+    Receipts are validated, written in batches committed by a pool of
+    workers, and retried with exponential backoff on transient errors. Receipts
+    are stored under the same deterministic IDs as save_attachment_data, so
+    importing a file again, or a receipt the user already saved, does not
+    duplicate it. Invalid records are skipped and reported.
+
+    Args:
+        file: The text file to import
+        user_id: The ID of the user owning the receipts
+        repository: The PurchaseRepository to write to, the application's one if not set
+        batch_size: Number of receipts per batch, at most 500
+        workers: Number of batches committed in parallel, IMPORT_COMMIT_WORKERS if not set
+        max_retries: Number of retries of a failing batch, IMPORT_MAX_RETRIES if not set
+        progress_interval: Seconds between two progress logs
+
+    Returns:
+        Dict[str, Any]: The import report, with the counts of receipts read, imported, invalid and failed,
+            the receipts imported per second and the first errors
+    """
+    from agentic_ai import tools
+
+    repository = repository or tools.PURCHASE_REPOSITORY
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    workers = workers or SETTINGS.IMPORT_COMMIT_WORKERS
+    max_retries = SETTINGS.IMPORT_MAX_RETRIES if max_retries is None else max_retries
+
+    progress = _ImportProgress()
+    # Bounds the batches waiting for a committer, so that memory stays flat on large files
+    pending = threading.BoundedSemaphore(workers * 2)
+
+    def commit(writes: List[Tuple[str, Dict[str, Any]]]) -> None:
+        try:
+            for attempt in range(max_retries + 1):
+                try:
+                    repository.write_batch(writes)
+                except Exception as e:
+                    if attempt == max_retries or not repository.is_transient_error(e):
+                        logger.error(f"Failed to commit an import batch of {len(writes)} receipts: {e}")
+                        with progress.lock:
+                            progress.failed += len(writes)
+                            if len(progress.errors) < MAX_REPORTED_ERRORS:
+                                progress.errors.append(f"Batch of {len(writes)} receipts: {e}")
+                        return
+                    with progress.lock:
+                        progress.retries += 1
+                    time.sleep(random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt)))
+                    continue
+                with progress.lock:
+                    progress.imported += len(writes)
+                    progress.batches += 1
+                return
+        finally:
+            pending.release()
+
+    def submit(executor: ThreadPoolExecutor, writes: List[Tuple[str, Dict[str, Any]]]) -> None:
+        pending.acquire()
+        executor.submit(commit, writes)
+
+    writes: List[Tuple[str, Dict[str, Any]]] = []
+    last_log = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-import") as executor:
+        try:
+            for number, record in iter_records(file):
+                with progress.lock:
+                    progress.read += 1
+                try:
+                    receipt = validate_receipt(record)
+                except ValueError as e:
+                    with progress.lock:
+                        progress.invalid += 1
+                        if len(progress.errors) < MAX_REPORTED_ERRORS:
+                            progress.errors.append(f"Record {number}: {e}")
+                    continue
+
+                document = {"user_id": user_id, "data": receipt, **build_index_fields(receipt)}
+                key = purchase_key(receipt)
+                if key is not None:
+                    document["purchaseKey"] = key
+                    document_id = purchase_document_id(user_id, key)
+                else:
+                    document_id = uuid.uuid4().hex
+                writes.append((document_id, document))
+
+                if len(writes) == batch_size:
+                    submit(executor, writes)
+                    writes = []
+                if time.monotonic() - last_log >= progress_interval:
+                    last_log = time.monotonic()
+                    report = progress.report()
+                    logger.info(
+                        "Bulk import progress",
+                        read=report["read"],
+                        imported=report["imported"],
+                        receipts_per_second=report["receipts_per_second"],
+                    )
+            if writes:
+                submit(executor, writes)
+        finally:
+            # Whatever was imported must be visible to the tools, even when the file turned out malformed
+            executor.shutdown(wait=True)
+            if progress.imported:
+                tools.invalidate_user_data(user_id)
+
+    report = progress.report()
+    logger.info("Bulk import done", **{name: value for name, value in report.items() if name != "errors"})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import exported receipts into the purchase repository")
+    parser.add_argument("path", help="JSON array or JSON Lines file of receipts")
+    parser.add_argument("--user-id", required=True, help="user owning the receipts")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE, help="receipts per batch, at most 500")
+    parser.add_argument("--workers", type=int, default=None, help="batches committed in parallel")
+    args = parser.parse_args()
+
+    with open(args.path, "r", encoding="utf-8") as file:
+        report = import_receipts(file, args.user_id, batch_size=args.batch_size, workers=args.workers)
+    print(json.dumps(report, indent=2))
+    logger.stop_async_writer()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,16 @@ import hashlib
 from google.genai import types
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models.llm_request import LlmRequest
+from agentic_ai.history_compactor import HistoryCompactor
+from settings import get_settings
+import logger
+import tracing
+
+SETTINGS = get_settings()
+HISTORY_COMPACTOR = HistoryCompactor(
+    token_budget=SETTINGS.HISTORY_TOKEN_BUDGET,
+    keep_recent_turns=SETTINGS.HISTORY_KEEP_RECENT_TURNS,
+)
 
 
 def modify_image_data_in_history(
@@ -12,38 +22,47 @@ def modify_image_data_in_history(
     # The following code will modify the request sent to LLM
     # We will only keep image / video data in the last 3 user messages using a reverse and counter approach
 
-    # Count how many user messages we've processed
-    user_message_count = 0
-
-    # Process the reversed list
-    for content in reversed(llm_request.contents):
-        # Only count for user manual query, not function call
-        if (content.role == 'model'):
-            print("Model output")
-            print(content.parts)
-        if (content.role == "user") and (content.parts[0].function_response is None):
-            user_message_count += 1
-            modified_content_parts = []
-
-            # Check any missing image ID placeholder for any image data
-            # Then remove image data from conversation history if more than 3 user messages
-            for idx, part in enumerate(content.parts):
-                if part.inline_data is None:
-                    modified_content_parts.append(part)
-                    continue
-                # Check if it's an image or video based on MIME type
-                mime_type = part.inline_data.mime_type
-                is_image = mime_type.startswith('image/')
-                is_video = mime_type.startswith('video/')
-                
-                print(f"Attachment is of type ${mime_type}")
-                if not (is_image or is_video):
-                    modified_content_parts.append(part)
-                    continue
-
-                placeholder_prefix = f"[ATTACHMENT-ID "
-                if user_message_count <= 1:
-                    modified_content_parts.append(part)
-
-            # This will modify the contents inside the llm_request
-            content.parts = modified_content_parts
+    with tracing.span("callback.before_model", agent=callback_context.agent_name) as span:
+        # Count how many user messages we've processed
+        user_message_count = 0
+
+        # Process the reversed list
+        for content in reversed(llm_request.contents):
+            # Only count for user manual query, not function call
+            if (content.role == 'model') and span.sampled:
+                span.event("Model output", parts=str(content.parts))
+            if (content.role == "user") and (content.parts[0].function_response is None):
+                user_message_count += 1
+                modified_content_parts = []
+
+                # Check any missing image ID placeholder for any image data
+                # Then remove image data from conversation history if more than 3 user messages
+                for idx, part in enumerate(content.parts):
+                    if part.inline_data is None:
+                        modified_content_parts.append(part)
+                        continue
+                    # Check if it's an image or video based on MIME type
+                    mime_type = part.inline_data.mime_type
+                    is_image = mime_type.startswith('image/')
+                    is_video = mime_type.startswith('video/')
+                    
+                    span.event("Attachment", mime_type=mime_type)
+                    if not (is_image or is_video):
+                        modified_content_parts.append(part)
+                        continue
+
+                    placeholder_prefix = f"[ATTACHMENT-ID "
+                    if user_message_count <= 1:
+                        modified_content_parts.append(part)
+
+                # This will modify the contents inside the llm_request
+                content.parts = modified_content_parts
+
+        # Keep the rest of the history within the token budget
+        report = HISTORY_COMPACTOR.compact(llm_request.contents)
+        span.set(**report)
+        logger.info(
+            "History compacted",
+            invocation_id=callback_context.invocation_id,
+            **report,
+        )
@@ -0,0 +1,158 @@
+# agentic_ai/compact_format.py
+
+import json
+from typing import Any, Dict, List
+
+FORMAT_NAME = "purchases-compact-v1"
+
+# Column order of the receipt and item tables, "merchant" and "category" are
+# indexes into the dictionaries of the encoded document
+RECEIPT_COLUMNS = (
+    "merchant",
+    "purchasedAt",
+    "totalAmount",
+    "taxAmount",
+    "paymentMethod",
+    "purchaseNumber",
+    "currency",
+)
+ITEM_COLUMNS = (
+    "receipt",
+    "name",
+    "category",
+    "totalPrice",
+    "quantity",
+    "unitPrice",
+    "tax",
+    "isSubscription",
+)
+
+# Values a trailing cell takes when omitted, columns are ordered so that the
+# most often defaulted ones come last
+RECEIPT_DEFAULTS = {"currency": "INR", "purchaseNumber": None, "paymentMethod": None, "taxAmount": 0}
+ITEM_DEFAULTS = {"isSubscription": False, "tax": 0, "unitPrice": None, "quantity": 1}
+
+DECIMALS = 2
+
+
+def _compact_number(value: Any) -> Any:
+    """Round numbers and drop useless decimals, e.g. 280.0 -> 280."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    value = round(float(value), DECIMALS)
+    return int(value) if value.is_integer() else value
+
+
+def _to_number(value: Any) -> float | None:
+    """Convert a receipt value to float, None if it is missing or not a number, e.g. a model-written "n/a"."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _derived_unit_price(total_price: Any, quantity: Any) -> Any:
+    """Return totalPrice / quantity rounded like the encoded numbers, None if either value is not a number."""
+    total_price, quantity = _to_number(total_price), _to_number(quantity)
+    if total_price is None or not quantity:
+        return None
+    return _compact_number(total_price / quantity)
+
+
+def _trim_defaults(row: List[Any], columns: tuple, defaults: Dict[str, Any]) -> List[Any]:
+    """Drop the trailing cells of a row that hold their column's default value."""
+    end = len(row)
+    while end > 0 and columns[end - 1] in defaults and row[end - 1] == defaults[columns[end - 1]]:
+        end -= 1
+    return row[:end]
+
+
+def encode_purchases(purchases: List[Dict[str, Any]]) -> str:
+    """Encode a purchase history into a compact tabular JSON document.
+
+    Every receipt and every item becomes a row of values under a single header,
+    merchant and category names are replaced by indexes into dictionaries,
+    trailing cells holding a default value are dropped and numbers are rounded.
+    A unit price equal to totalPrice / quantity is omitted as well, values
+    that are not numbers, e.g. strings written by the model, are kept as they
+    are.
+
+    Args:
+        purchases: The purchase history, as returned by `get_all_purchases_for_a_user`.
+
+    Returns:
+        str: The encoded purchase history, see `decode_purchases` for the reverse operation.
+    """
+    merchants: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    receipts, items = [], []
+
+    for receipt_index, purchase in enumerate(purchases):
+        merchant = merchants.setdefault(purchase.get("merchantName"), len(merchants))
+        row = [merchant] + [_compact_number(purchase.get(column)) for column in RECEIPT_COLUMNS[1:]]
+        receipts.append(_trim_defaults(row, RECEIPT_COLUMNS, RECEIPT_DEFAULTS))
+
+        for item in purchase.get("items") or []:
+            total_price = _compact_number(item.get("totalPrice"))
+            quantity = _compact_number(item.get("quantity"))
+            unit_price = _compact_number(item.get("unitPrice"))
+            if unit_price is not None and unit_price == _derived_unit_price(total_price, quantity):
+                unit_price = None
+            row = [
+                receipt_index,
+                item.get("name"),
+                categories.setdefault(item.get("category"), len(categories)),
+                total_price,
+                quantity,
+                unit_price,
+                _compact_number(item.get("tax")),
+                bool(item.get("isSubscription")),
+            ]
+            items.append(_trim_defaults(row, ITEM_COLUMNS, ITEM_DEFAULTS))
+
+    document = {
+        "format": FORMAT_NAME,
+        "merchants": list(merchants),
+        "categories": list(categories),
+        "receiptColumns": RECEIPT_COLUMNS,
+        "receiptDefaults": RECEIPT_DEFAULTS,
+        "receipts": receipts,
+        "itemColumns": ITEM_COLUMNS,
+        "itemDefaults": ITEM_DEFAULTS,
+        "items": items,
+    }
+    return json.dumps(document, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode_purchases(encoded: str) -> List[Dict[str, Any]]:
+    """Decode a document produced by `encode_purchases` back into a purchase history.
+
+    Args:
+        encoded: The compact JSON document.
+
+    Returns:
+        List[Dict[str, Any]]: The purchase history, with rounded numbers.
+    """
+    document = json.loads(encoded)
+    merchants, categories = document["merchants"], document["categories"]
+
+    purchases = []
+    for row in document["receipts"]:
+        values = dict(RECEIPT_DEFAULTS)
+        values.update(zip(RECEIPT_COLUMNS, row))
+        values["merchantName"] = merchants[values.pop("merchant")]
+        values["items"] = []
+        purchases.append(values)
+
+    for row in document["items"]:
+        values = dict(ITEM_DEFAULTS)
+        values.update(zip(ITEM_COLUMNS, row))
+        receipt = purchases[values.pop("receipt")]
+        values["category"] = categories[values["category"]]
+        if values["unitPrice"] is None:
+            values["unitPrice"] = _derived_unit_price(values["totalPrice"], values["quantity"])
+        receipt["items"].append(values)
+
+    return purchases
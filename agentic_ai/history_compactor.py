@@ -0,0 +1,193 @@
+# agentic_ai/history_compactor.py
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List
+
+from google.genai import types
+
+# Rough number of characters per token of Gemini models, used to estimate prompt sizes
+CHARS_PER_TOKEN = 4
+
+# Gemini bills every image, whatever its size, as a fixed number of tokens
+INLINE_DATA_TOKENS = 258
+
+# Attachment placeholders are kept verbatim so that the model can still reference the images
+IMAGE_ID_PATTERN = re.compile(r"\[IMAGE-ID [0-9a-f]+\]")
+
+# Function responses smaller than this are cheaper to keep than to summarize
+SUMMARY_MIN_TOKENS = 200
+
+# Text parts of old turns are cut down to this many characters when over budget
+TRUNCATED_TEXT_CHARS = 300
+
+
+def _text_tokens(text: str | None) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def _response_text(response: Dict[str, Any] | None) -> str:
+    return json.dumps(response, default=str, ensure_ascii=False, sort_keys=True) if response else ""
+
+
+def estimate_part_tokens(part: types.Part) -> int:
+    """Estimate the number of prompt tokens of a content part."""
+    if part.inline_data is not None or part.file_data is not None:
+        return INLINE_DATA_TOKENS
+    if part.function_response is not None:
+        return _text_tokens(_response_text(part.function_response.response))
+    if part.function_call is not None:
+        return _text_tokens(part.function_call.name) + _text_tokens(
+            json.dumps(part.function_call.args, default=str, ensure_ascii=False) if part.function_call.args else ""
+        )
+    return _text_tokens(part.text)
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """Estimate the number of prompt tokens of a conversation history."""
+    return sum(estimate_part_tokens(part) for content in contents for part in content.parts or [])
+
+
+def _describe(value: Any) -> str:
+    """Describe the shape of a tool result in a few words."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return f'text starting with "{value[:120]}"'
+    if isinstance(value, list):
+        return f"a list of {len(value)} entries"
+    if isinstance(value, dict):
+        keys = list(value)
+        more = ", ..." if len(keys) > 6 else ""
+        return f"an object with keys {', '.join(map(str, keys[:6]))}{more}"
+    return f"the value {str(value)[:120]}"
+
+
+def _replace_response(part: types.Part, result: str) -> types.Part:
+    """Return a copy of a function response part with a new result, the call ID and name are kept."""
+    response = part.function_response
+    return types.Part(function_response=types.FunctionResponse(id=response.id, name=response.name, response={"result": result}))
+
+
+def _placeholders(text: str) -> str:
+    """Return the attachment placeholders found in a text, deduplicated and space separated."""
+    return " ".join(dict.fromkeys(IMAGE_ID_PATTERN.findall(text)))
+
+
+class HistoryCompactor:
+    """Shrinks the conversation history sent to the model to a token budget.
+
+    The last `keep_recent_turns` user turns, and everything after them, are
+    left untouched apart from deduplication. Older turns are compacted in
+    increasingly lossy steps, stopping as soon as the history fits the budget:
+
+    1. A function response identical to a later one is replaced by a reference to it.
+    2. Large function responses are replaced by a short summary of their shape.
+    3. Thoughts are dropped and long text parts are truncated.
+
+    `[IMAGE-ID ...]` placeholders always survive, so attachments stay addressable.
+
+    Attributes:
+        token_budget: Estimated number of tokens the history should fit in, 0 only deduplicates.
+        keep_recent_turns: Number of most recent user turns never summarized or truncated.
+    """
+
+    def __init__(self, token_budget: int, keep_recent_turns: int = 2):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+
+    def _stale_end(self, contents: List[types.Content]) -> int:
+        """Return the index of the first content of the recent turns."""
+        turns = 0
+        for index in range(len(contents) - 1, -1, -1):
+            content = contents[index]
+            if content.role == "user" and content.parts and content.parts[0].function_response is None:
+                turns += 1
+                if turns >= self.keep_recent_turns:
+                    return index
+        return 0
+
+    def _over_budget(self, tokens: int) -> bool:
+        return bool(self.token_budget) and tokens > self.token_budget
+
+    def compact(self, contents: List[types.Content]) -> Dict[str, int]:
+        """Compact a conversation history in place.
+
+        Args:
+            contents: The contents of the LLM request, oldest first.
+
+        Returns:
+            Dict[str, int]: Estimated tokens before and after, and the number of parts
+                deduplicated, summarized and truncated.
+        """
+        tokens = tokens_before = estimate_tokens(contents)
+        report = {"deduplicated": 0, "summarized": 0, "truncated": 0}
+        stale_end = self._stale_end(contents)
+
+        # Deduplicate function responses, the most recent copy is kept
+        seen = set()
+        for content in reversed(contents):
+            for index, part in enumerate(content.parts or []):
+                if part.function_response is None:
+                    continue
+                text = _response_text(part.function_response.response)
+                if _text_tokens(text) < SUMMARY_MIN_TOKENS // 4:
+                    continue
+                fingerprint = (part.function_response.name, hashlib.sha1(text.encode("utf-8")).digest())
+                if fingerprint not in seen:
+                    seen.add(fingerprint)
+                    continue
+                name = part.function_response.name
+                content.parts[index] = _replace_response(
+                    part, f"[Same result as the later {name} call] {_placeholders(text)}".strip()
+                )
+                tokens -= _text_tokens(text) - estimate_part_tokens(content.parts[index])
+                report["deduplicated"] += 1
+
+        # Summarize the large function responses of old turns
+        for content in contents[:stale_end]:
+            if not self._over_budget(tokens):
+                break
+            for index, part in enumerate(content.parts or []):
+                if part.function_response is None:
+                    continue
+                response = part.function_response.response or {}
+                text = _response_text(response)
+                part_tokens = _text_tokens(text)
+                if part_tokens < SUMMARY_MIN_TOKENS:
+                    continue
+                name = part.function_response.name
+                shape = _describe(response.get("result", response))
+                summary = (
+                    f"[Earlier {name} result of about {part_tokens} tokens, {shape}. "
+                    f"Call {name} again if the details are needed] {_placeholders(text)}"
+                )
+                content.parts[index] = _replace_response(part, summary.strip())
+                tokens -= part_tokens - estimate_part_tokens(content.parts[index])
+                report["summarized"] += 1
+
+        # Drop thoughts and truncate long texts of old turns
+        for content in contents[:stale_end]:
+            if not self._over_budget(tokens):
+                break
+            parts = []
+            for part in content.parts or []:
+                if part.thought:
+                    tokens -= estimate_part_tokens(part)
+                    report["truncated"] += 1
+                    continue
+                if part.text and len(part.text) > TRUNCATED_TEXT_CHARS:
+                    text = f"{part.text[:TRUNCATED_TEXT_CHARS]} [...truncated] {_placeholders(part.text[TRUNCATED_TEXT_CHARS:])}"
+                    tokens -= _text_tokens(part.text) - _text_tokens(text)
+                    part = types.Part(text=text.strip())
+                    report["truncated"] += 1
+                parts.append(part)
+            if parts:
+                content.parts = parts
+            else:
+                # Keep the turn structure, contents without parts are rejected by the API
+                content.parts = [types.Part(text="[...truncated]")]
+
+        return {"tokens_before": tokens_before, "tokens_after": estimate_tokens(contents), **report}
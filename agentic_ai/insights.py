@@ -0,0 +1,318 @@
+# agentic_ai/insights.py
+
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+from agentic_ai.analytics import item_total
+from agentic_ai.purchase_cache import ChangeLog
+from agentic_ai.purchase_time import current_time, format_display_date, parse_purchased_at
+
+# Renewal period used for subscriptions seen only once
+DEFAULT_SUBSCRIPTION_DAYS = 30
+ANNUAL_SUBSCRIPTION_DAYS = 365
+ANNUAL_SUBSCRIPTION_KEYWORDS = ("annual", "yearly", "year")
+
+# Trailing window used to forecast next month's expense
+FORECAST_WINDOW_WEEKS = 13
+FORECAST_DAYS = 30
+
+
+def _to_number(value: Any) -> float:
+    """Convert a receipt value to float, treating missing or invalid values as 0."""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _week_start(value: datetime.date) -> datetime.date:
+    """Return the Monday of the ISO week of a date."""
+    return value - datetime.timedelta(days=value.weekday())
+
+
+def _ordinal(day: int) -> str:
+    """Return the ordinal form of a day of month, e.g. 1st, 2nd, 23rd."""
+    if 11 <= day % 100 <= 13:
+        return f"{day}th"
+    suffix = {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"{day}{suffix}"
+
+
+def _format_run_out(days: int) -> str:
+    """Format the time left before an item runs out, e.g. "4 days" or "1 Week", or "Overdue by 2 days" once past."""
+    if days < 0:
+        return f"Overdue by {_format_run_out(-days)}"
+    if days < 7:
+        return "1 day" if days == 1 else f"{days} days"
+    weeks = days // 7
+    return "1 Week" if weeks == 1 else f"{weeks} Weeks"
+
+
+class ItemStats:
+    """Purchase statistics of a single item name.
+
+    The mean inter-purchase interval is derived from the first and last
+    purchase times and the purchase count, so receipts can be added in any
+    order in O(1).
+
+    Attributes:
+        name: Display name of the item.
+        count: Number of receipts containing the item.
+        first_purchased: Earliest purchase time.
+        last_purchased: Latest purchase time.
+        is_subscription: Whether the item was marked as a subscription.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.first_purchased: datetime.datetime | None = None
+        self.last_purchased: datetime.datetime | None = None
+        self.is_subscription = False
+
+    def add(self, purchased_at: datetime.datetime, is_subscription: bool) -> None:
+        """Record a purchase of the item."""
+        self.count += 1
+        self.is_subscription = self.is_subscription or is_subscription
+        if self.first_purchased is None or purchased_at < self.first_purchased:
+            self.first_purchased = purchased_at
+        if self.last_purchased is None or purchased_at > self.last_purchased:
+            self.last_purchased = purchased_at
+
+    @property
+    def mean_interval_days(self) -> float | None:
+        """Mean number of days between two purchases, None if bought only once."""
+        if self.count < 2:
+            return None
+        return (self.last_purchased - self.first_purchased).total_seconds() / 86400 / (self.count - 1)
+
+    def renewal_days(self) -> int:
+        """Renewal period of a subscription item, in days."""
+        interval = self.mean_interval_days
+        if interval and interval >= 1:
+            return round(interval)
+        if any(keyword in self.name.lower() for keyword in ANNUAL_SUBSCRIPTION_KEYWORDS):
+            return ANNUAL_SUBSCRIPTION_DAYS
+        return DEFAULT_SUBSCRIPTION_DAYS
+
+
+class UserInsights:
+    """Incrementally maintained aggregates behind the "Insights" screen of a user.
+
+    Attributes:
+        items: Purchase statistics keyed by lowercased item name.
+        category_totals: Total spend per category.
+        month_totals: Total spend per (year, month).
+        week_totals: Total spend per ISO week, keyed by the Monday of the week.
+    """
+
+    def __init__(self):
+        self.items: Dict[str, ItemStats] = {}
+        self.category_totals: Dict[str, float] = {}
+        self.month_totals: Dict[tuple[int, int], float] = {}
+        self.week_totals: Dict[datetime.date, float] = {}
+        self._first_purchase: datetime.date | None = None
+        self._lock = threading.Lock()
+
+    def add_receipt(self, receipt: Dict[str, Any]) -> None:
+        """Update the aggregates with a new receipt, in O(items).
+
+        Args:
+            receipt: The receipt data, as stored by `save_attachment_data`.
+        """
+        purchased_at = parse_purchased_at(receipt.get("purchasedAt"))
+        if purchased_at is None:
+            return
+
+        purchase_day = purchased_at.date()
+        month_key = (purchase_day.year, purchase_day.month)
+        week_key = _week_start(purchase_day)
+        total = _to_number(receipt.get("totalAmount"))
+
+        with self._lock:
+            self.month_totals[month_key] = self.month_totals.get(month_key, 0.0) + total
+            self.week_totals[week_key] = self.week_totals.get(week_key, 0.0) + total
+            if self._first_purchase is None or purchase_day < self._first_purchase:
+                self._first_purchase = purchase_day
+
+            for item in receipt.get("items") or []:
+                name = item.get("name") or "Unknown"
+                category = item.get("category") or "Other"
+                # Same amount as the Dashboard's, see `analytics.item_total`
+                self.category_totals[category] = self.category_totals.get(category, 0.0) + item_total(item)
+                stats = self.items.get(name.lower())
+                if stats is None:
+                    stats = self.items[name.lower()] = ItemStats(name)
+                stats.add(purchased_at, bool(item.get("isSubscription")))
+
+    def _expected_expense_next_month(self, today: datetime.date) -> float:
+        """Forecast the next 30 days of spend from the trailing weekly totals."""
+        if self._first_purchase is None:
+            return 0.0
+        window_start = max(today - datetime.timedelta(weeks=FORECAST_WINDOW_WEEKS), self._first_purchase)
+        first_week = _week_start(window_start)
+        spent = sum(total for week, total in self.week_totals.items() if first_week <= week <= today)
+        window_days = max((today - window_start).days + 1, 1)
+        return round(spent / window_days * FORECAST_DAYS, 2)
+
+    def _running_low(self, now: datetime.datetime) -> Dict[str, Any]:
+        """The regularly bought item expected to run out the soonest."""
+        best, best_rank = None, None
+        for stats in self.items.values():
+            interval = stats.mean_interval_days
+            if stats.is_subscription or not interval:
+                continue
+            # In calendar days, 0 when the item runs out today
+            days_left = ((stats.last_purchased + datetime.timedelta(days=interval)).date() - now.date()).days
+            # Prefer items that have not run out yet, then the least overdue ones
+            rank = (days_left < 0, abs(days_left))
+            if best is None or rank < best_rank:
+                best, best_rank, best_days_left = stats, rank, days_left
+
+        if best is None:
+            return {"itemName": None, "expectedRunOutIn": None, "lastPurchased": None}
+
+        return {
+            "itemName": best.name,
+            "expectedRunOutIn": _format_run_out(best_days_left),
+            "lastPurchased": format_display_date(best.last_purchased),
+        }
+
+    def _subscriptions(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        """Next renewal of every subscription, soonest first."""
+        subscriptions = []
+        for stats in self.items.values():
+            if not stats.is_subscription:
+                continue
+            period = datetime.timedelta(days=stats.renewal_days())
+            renews_on = stats.last_purchased + period
+            while renews_on < now:
+                renews_on += period
+            subscriptions.append(
+                {
+                    "subscriptionName": stats.name,
+                    "renewsOn": format_display_date(renews_on),
+                    "daysLeft": (renews_on.date() - now.date()).days,
+                }
+            )
+        return sorted(subscriptions, key=lambda subscription: subscription["daysLeft"])
+
+    def _financial_snapshot(self) -> Dict[str, Any]:
+        """Highest spending category, month and week."""
+        category = max(self.category_totals.items(), key=lambda entry: entry[1], default=(None, 0.0))
+        month = max(self.month_totals.items(), key=lambda entry: entry[1], default=(None, 0.0))
+        week = max(self.week_totals.items(), key=lambda entry: entry[1], default=(None, 0.0))
+
+        month_label = None
+        if month[0]:
+            month_label = f"{datetime.date(month[0][0], month[0][1], 1).strftime('%B')}, {month[0][0]}"
+        week_label = None
+        if week[0]:
+            week_label = f"Week of {week[0].strftime('%B')} {_ordinal(week[0].day)}, {week[0].year}"
+
+        return {
+            "highestSpendingCategory": {"category": category[0], "amount": round(category[1], 2)},
+            "highestSpendingMonth": {"month": month_label, "amount": round(month[1], 2)},
+            "highestSpendingWeek": {"week": week_label, "amount": round(week[1], 2)},
+        }
+
+    def build(self, now: datetime.datetime | None = None) -> Dict[str, Any]:
+        """Build the "Insights" screen data described in prompts/insights.md.
+
+        Args:
+            now: Reference time, defaults to the current time in Asia/Kolkata.
+
+        Returns:
+            Dict[str, Any]: The Insights screen JSON object.
+        """
+        now = now or current_time()
+        with self._lock:
+            return {
+                "expectedExpenseNextMonth": {"amount": self._expected_expense_next_month(now.date())},
+                "shoppingAlerts": {"runningLow": self._running_low(now)},
+                "subscriptions": self._subscriptions(now),
+                "financialSnapshot": self._financial_snapshot(),
+            }
+
+
+class _InsightsEntry:
+    """Aggregates of a single user and their expiry time."""
+
+    __slots__ = ("insights", "expires_at")
+
+    def __init__(self, insights: UserInsights, expires_at: float):
+        self.insights = insights
+        self.expires_at = expires_at
+
+
+class InsightsEngine:
+    """Per-user registry of `UserInsights`.
+
+    The aggregates of a user are built from the full purchase history the first
+    time they are needed, then kept up to date by `record_receipt` on every
+    save, so answering the Insights screen never rescans the history.
+
+    A build racing with `record_receipt` or `invalidate` of the same user may
+    miss that receipt, it answers the request that triggered it but is not
+    kept. Kept aggregates expire after `ttl_seconds`, like the cached
+    histories, which bounds how stale a worker can be when another worker
+    saves a receipt.
+
+    Attributes:
+        loader: Function returning the full purchase history of a user.
+        max_users: Maximum number of users kept in memory, least recently used are dropped.
+        ttl_seconds: Time to live of the aggregates of a user, in seconds.
+    """
+
+    def __init__(self, loader: Callable[[str], List[Dict[str, Any]]], max_users: int = 1000, ttl_seconds: float = 60.0):
+        self.loader = loader
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._users: OrderedDict[str, _InsightsEntry] = OrderedDict()
+        self._changes = ChangeLog(max_users * 4)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> UserInsights:
+        """Return the aggregates of a user, building them from the history on first use or expiry."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._users.move_to_end(user_id)
+                return entry.insights
+            self._users.pop(user_id, None)
+
+        # Taken before loading, a receipt recorded meanwhile keeps this build out of the registry
+        token = self._changes.token()
+        insights = UserInsights()
+        for receipt in self.loader(user_id):
+            insights.add_receipt(receipt)
+
+        with self._lock:
+            if self._changes.changed_since(user_id, token):
+                return insights
+            # Another thread may have built it meanwhile, keep the first one
+            entry = self._users.setdefault(user_id, _InsightsEntry(insights, time.monotonic() + self.ttl_seconds))
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return entry.insights
+
+    def record_receipt(self, user_id: str, receipt: Dict[str, Any]) -> None:
+        """Apply a newly saved receipt to the aggregates of a user, if they are loaded.
+
+        Users that are not loaded yet pick the receipt up from the history on first use.
+        """
+        with self._lock:
+            self._changes.record(user_id)
+            entry = self._users.get(user_id)
+        if entry is not None:
+            entry.insights.add_receipt(receipt)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the aggregates of a user, they are rebuilt on next use."""
+        with self._lock:
+            self._changes.record(user_id)
+            self._users.pop(user_id, None)
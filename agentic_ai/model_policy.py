@@ -0,0 +1,221 @@
+# agentic_ai/model_policy.py
+
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import logger
+from settings import get_settings
+
+SETTINGS = get_settings()
+
+RECEIPT_EXTRACTION = "receipt_extraction"
+DASHBOARD = "dashboard"
+INSIGHTS = "insights"
+SHOPPING_LIST = "shopping_list"
+CHIT_CHAT = "chit_chat"
+FREE_FORM_QUERY = "free_form_query"
+
+# State keys, "temp:" values only live for the current invocation
+_INTENT_STATE_KEY = "temp:model_policy_intent"
+_STARTED_STATE_KEY = "temp:model_policy_started_at"
+
+_GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|ok|okay|cool|great|good (morning|afternoon|evening|night)|bye)\b[\s!.?]*\w*[\s!.?]*$",
+    re.IGNORECASE,
+)
+_SHOPPING_LIST_PATTERN = re.compile(r"shopping list|recipe|ingredient|grocery list", re.IGNORECASE)
+
+# Whole message asking for a screen, e.g. "Dashboard", "Generate data for Insights screen"
+SCREEN_REQUEST_PATTERN = (
+    r"^\s*(?:please\s+)?"
+    r"(?:(?:generate|get|show|give|fetch)\s+(?:me\s+)?(?:the\s+)?(?:data\s+for\s+(?:the\s+)?)?)?"
+    r"[\"']?{screen}[\"']?(?:\s+screen)?(?:\s+data)?\s*[.!]?\s*$"
+)
+_DASHBOARD_PATTERN = re.compile(SCREEN_REQUEST_PATTERN.format(screen="dashboard"), re.IGNORECASE)
+_INSIGHTS_PATTERN = re.compile(SCREEN_REQUEST_PATTERN.format(screen="insights?"), re.IGNORECASE)
+
+
+class KeywordIntentClassifier:
+    """Local classifier based on attachments and keywords, no model call involved.
+
+    Any object with the same `classify` method can be given to `ModelPolicy`
+    instead, e.g. a classifier backed by a small model.
+    """
+
+    def classify(self, text: str, has_attachments: bool) -> str:
+        """Return the intent of a user message.
+
+        Only the screen requests sent by the app, matched as whole messages,
+        are DASHBOARD or INSIGHTS, a question mentioning a screen is a
+        FREE_FORM_QUERY.
+
+        Args:
+            text: The text of the user message
+            has_attachments: Whether the message carries images or videos
+
+        Returns:
+            str: One of the intent constants of this module
+        """
+        if has_attachments:
+            return RECEIPT_EXTRACTION
+        lowered = text.lower()
+        if lowered.lstrip().startswith("add to shopping list:"):
+            return SHOPPING_LIST
+        if _DASHBOARD_PATTERN.match(text):
+            return DASHBOARD
+        if _INSIGHTS_PATTERN.match(text):
+            return INSIGHTS
+        if _GREETING_PATTERN.match(text):
+            return CHIT_CHAT
+        if _SHOPPING_LIST_PATTERN.search(text):
+            return SHOPPING_LIST
+        return FREE_FORM_QUERY
+
+
+class ModelChoice:
+    """Model and thinking budget used for an intent.
+
+    Attributes:
+        thinking_budget: Thinking token budget, 0 disables thinking.
+        model: Model name, None keeps the agent's model.
+    """
+
+    def __init__(self, thinking_budget: int, model: Optional[str] = None):
+        self.thinking_budget = thinking_budget
+        self.model = model
+
+
+def default_choices(light_model: Optional[str] = None) -> Dict[str, ModelChoice]:
+    """Return the default choice per intent, `light_model` serves the intents that need little reasoning."""
+    return {
+        RECEIPT_EXTRACTION: ModelChoice(8096),
+        FREE_FORM_QUERY: ModelChoice(4096),
+        SHOPPING_LIST: ModelChoice(1024, light_model),
+        DASHBOARD: ModelChoice(512, light_model),
+        INSIGHTS: ModelChoice(512, light_model),
+        CHIT_CHAT: ModelChoice(0, light_model),
+    }
+
+
+def _turn_message(llm_request: LlmRequest) -> Optional[types.Content]:
+    """Return the user message that started the current turn."""
+    for content in reversed(llm_request.contents):
+        if content.role == "user" and content.parts and content.parts[0].function_response is None:
+            return content
+    return None
+
+
+class IntentStats:
+    """Latency and token usage of the model calls of one intent."""
+
+    __slots__ = ("calls", "latency_ms", "prompt_tokens", "output_tokens", "thoughts_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.latency_ms = 0.0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.thoughts_tokens = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "avg_latency_ms": self.latency_ms / calls,
+            "avg_prompt_tokens": self.prompt_tokens / calls,
+            "avg_output_tokens": self.output_tokens / calls,
+            "avg_thoughts_tokens": self.thoughts_tokens / calls,
+        }
+
+
+class ModelPolicy:
+    """Picks the model and thinking budget of every model call from the intent of the turn.
+
+    The intent is classified once per invocation, on the first model call, so
+    that the calls following tool responses keep the same settings. Register
+    `before_model` and `after_model` as the agent's model callbacks.
+
+    Attributes:
+        classifier: Object with a `classify(text, has_attachments) -> str` method.
+        choices: Model choice per intent.
+        default: Model choice of the intents missing from `choices`.
+    """
+
+    def __init__(self, classifier, choices: Dict[str, ModelChoice], default: ModelChoice):
+        self.classifier = classifier
+        self.choices = choices
+        self.default = default
+        self._lock = threading.Lock()
+        self._stats: Dict[str, IntentStats] = {}
+
+    def classify(self, llm_request: LlmRequest) -> str:
+        """Classify the turn of a model request."""
+        content = _turn_message(llm_request)
+        if content is None:
+            return FREE_FORM_QUERY
+        text = "".join(part.text for part in content.parts if part.text)
+        has_attachments = any(part.inline_data is not None or part.file_data is not None for part in content.parts)
+        return self.classifier.classify(text, has_attachments)
+
+    def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        intent = callback_context.state.get(_INTENT_STATE_KEY)
+        if intent is None:
+            intent = self.classify(llm_request)
+            callback_context.state[_INTENT_STATE_KEY] = intent
+        choice = self.choices.get(intent, self.default)
+
+        if choice.model:
+            llm_request.model = choice.model
+        llm_request.config = llm_request.config or types.GenerateContentConfig()
+        llm_request.config.thinking_config = types.ThinkingConfig(thinking_budget=choice.thinking_budget)
+        callback_context.state[_STARTED_STATE_KEY] = time.perf_counter()
+
+    def after_model(self, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        started_at = callback_context.state.get(_STARTED_STATE_KEY)
+        intent = callback_context.state.get(_INTENT_STATE_KEY)
+        if started_at is None or intent is None or llm_response.partial:
+            return
+        latency_ms = (time.perf_counter() - started_at) * 1000
+        usage = llm_response.usage_metadata
+        prompt_tokens = (usage and usage.prompt_token_count) or 0
+        output_tokens = (usage and usage.candidates_token_count) or 0
+        thoughts_tokens = (usage and usage.thoughts_token_count) or 0
+
+        with self._lock:
+            stats = self._stats.setdefault(intent, IntentStats())
+            stats.calls += 1
+            stats.latency_ms += latency_ms
+            stats.prompt_tokens += prompt_tokens
+            stats.output_tokens += output_tokens
+            stats.thoughts_tokens += thoughts_tokens
+
+        choice = self.choices.get(intent, self.default)
+        logger.info(
+            "Model call",
+            intent=intent,
+            model=choice.model or "default",
+            thinking_budget=choice.thinking_budget,
+            latency_ms=round(latency_ms, 1),
+            prompt_tokens=prompt_tokens,
+            output_tokens=output_tokens,
+            thoughts_tokens=thoughts_tokens,
+        )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the average latency and token usage per intent, to tune the choices."""
+        with self._lock:
+            return {intent: stats.as_dict() for intent, stats in self._stats.items()}
+
+
+MODEL_POLICY = ModelPolicy(
+    classifier=KeywordIntentClassifier(),
+    choices=default_choices(SETTINGS.LIGHT_MODEL_NAME),
+    default=ModelChoice(8096),
+)
@@ -0,0 +1,358 @@
+# agentic_ai/monthly_rollups.py
+
+"""Per-user, per-month spending rollups, maintained with the receipts.
+
+Every write of a receipt updates, atomically with it, the rollup of its
+month: the receipt count, the total and tax amounts, and the amounts by
+category, merchant and item. Single saves read and rewrite the rollup in a
+transaction, batched writes add their changes as increments so that parallel
+batches do not contend on the same rollups. Questions over N months then
+read N small documents instead of every receipt. Receipts without a parseable
+"purchasedAt" are in no rollup.
+
+The consistency checker rebuilds the rollups from the raw receipts:
+    python -m agentic_ai.monthly_rollups [--user-id USER_ID ...] [--repair]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import math
+from typing import Any, Dict, Iterable, List, Tuple
+
+import logger
+from agentic_ai.purchase_queries import normalize_key
+from agentic_ai.purchase_time import parse_purchased_at, period_keys
+
+# Amounts are rounded after every change, so that adding and removing receipts does not drift
+AMOUNT_DECIMALS = 2
+
+# Difference tolerated by the consistency checker between two amounts, rounding differs with the order of the writes
+AMOUNT_TOLERANCE = 0.011
+
+# Rollup maps: field -> the counter whose entries are dropped when it falls to 0
+BREAKDOWNS = {"byCategory": "items", "byMerchant": "receipts", "byItem": "purchases"}
+
+
+def _to_number(value: Any) -> float:
+    """Convert a receipt value to float, treating missing or invalid values as 0."""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def rollup_month(receipt: Dict[str, Any]) -> str | None:
+    """Return the month of a receipt as YYYY-MM, None if its "purchasedAt" cannot be parsed."""
+    purchased_at = parse_purchased_at(receipt.get("purchasedAt"))
+    return period_keys(purchased_at)["month"] if purchased_at else None
+
+
+def rollup_document_id(user_id: str, month: str) -> str:
+    """Return the deterministic document ID of a user's rollup of a month."""
+    return hashlib.sha256(f"{user_id}\n{month}".encode("utf-8")).hexdigest()[:32]
+
+
+def empty_rollup(user_id: str, month: str) -> Dict[str, Any]:
+    """Return the rollup of a month without receipts."""
+    return {
+        "user_id": user_id,
+        "month": month,
+        "receipts": 0,
+        "totalAmount": 0.0,
+        "taxAmount": 0.0,
+        **{field: {} for field in BREAKDOWNS},
+    }
+
+
+def _add(
+    entries: Dict[str, Dict[str, Any]], name: str, sign: int, count: str, keep_empty: bool, **counters: float
+) -> None:
+    """Add counters to the entry of a name, dropping it when its `count` counter falls to 0 unless `keep_empty`."""
+    key = normalize_key(name)
+    if not key:
+        return
+    entry = entries.setdefault(key, {"name": name.strip(), **{counter: 0 for counter in counters}})
+    for counter, value in counters.items():
+        entry[counter] = round(entry.get(counter, 0) + sign * value, AMOUNT_DECIMALS)
+    if entry[count] <= 0 and not keep_empty:
+        del entries[key]
+
+
+def apply_receipt(rollup: Dict[str, Any], receipt: Dict[str, Any], sign: int = 1, keep_empty: bool = False) -> None:
+    """Add a receipt to a rollup, or remove it when `sign` is -1.
+
+    Args:
+        rollup: The rollup of the receipt's month, updated in place
+        receipt: The receipt data
+        sign: 1 to add the receipt, -1 to remove it
+        keep_empty: Keep the entries whose count falls to 0 or below, for a rollup holding a change
+    """
+    total_amount = _to_number(receipt.get("totalAmount"))
+    rollup["receipts"] += sign
+    rollup["totalAmount"] = round(rollup["totalAmount"] + sign * total_amount, AMOUNT_DECIMALS)
+    rollup["taxAmount"] = round(rollup["taxAmount"] + sign * _to_number(receipt.get("taxAmount")), AMOUNT_DECIMALS)
+    _add(
+        rollup["byMerchant"],
+        str(receipt.get("merchantName") or ""),
+        sign,
+        "receipts",
+        keep_empty,
+        amount=total_amount,
+        receipts=1,
+    )
+
+    categories = set()
+    for item in receipt.get("items") or []:
+        price = _to_number(item.get("totalPrice"))
+        category = str(item.get("category") or "")
+        _add(
+            rollup["byCategory"],
+            category,
+            sign,
+            "items",
+            keep_empty,
+            amount=price,
+            items=1,
+            receipts=int(normalize_key(category) not in categories),
+        )
+        categories.add(normalize_key(category))
+        _add(
+            rollup["byItem"],
+            str(item.get("name") or ""),
+            sign,
+            "purchases",
+            keep_empty,
+            amount=price,
+            quantity=_to_number(item.get("quantity", 1)),
+            purchases=1,
+        )
+
+
+def rollup_changes(
+    writes: Iterable[Tuple[str, Dict[str, Any] | None, Dict[str, Any] | None]],
+) -> Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int]]]:
+    """Group receipt writes by the rollup they change.
+
+    Args:
+        writes: (user ID, previous receipt data or None, new receipt data or None) of every written document
+
+    Returns:
+        Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int]]]: The (receipt, sign) to apply by (user ID, month)
+    """
+    changes: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int]]] = {}
+    for user_id, previous, receipt in writes:
+        for data, sign in ((previous, -1), (receipt, 1)):
+            month = rollup_month(data) if data is not None else None
+            if month is not None:
+                changes.setdefault((user_id, month), []).append((data, sign))
+    return changes
+
+
+def rollup_delta(user_id: str, month: str, receipts: Iterable[Tuple[Dict[str, Any], int]]) -> Dict[str, Any]:
+    """Return the change made to a rollup by adding and removing receipts, to be applied as increments.
+
+    Args:
+        user_id: The ID of the user
+        month: The month of the rollup, YYYY-MM
+        receipts: The (receipt, sign) of `rollup_changes` for this rollup
+
+    Returns:
+        Dict[str, Any]: A rollup of the differences, its counters may be 0 or negative
+    """
+    delta = empty_rollup(user_id, month)
+    for receipt, sign in receipts:
+        apply_receipt(delta, receipt, sign, keep_empty=True)
+    return delta
+
+
+def compact_rollup(rollup: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Round the amounts of a rollup updated by increments and drop its entries left without purchases.
+
+    Returns:
+        Dict[str, Any] | None: The rollup, updated in place, None if no receipt of its month is left
+    """
+    if rollup.get("receipts", 0) <= 0:
+        return None
+    for counter in ("totalAmount", "taxAmount"):
+        rollup[counter] = round(rollup.get(counter, 0.0), AMOUNT_DECIMALS)
+    for field, count in BREAKDOWNS.items():
+        entries = rollup.setdefault(field, {})
+        for key in list(entries):
+            entry = entries[key]
+            if entry.get(count, 0) <= 0:
+                del entries[key]
+                continue
+            for name, value in entry.items():
+                if isinstance(value, float):
+                    entry[name] = round(value, AMOUNT_DECIMALS)
+    return rollup
+
+
+def build_rollups(user_id: str, receipts: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Build the rollups of a user from all their receipts, by month."""
+    rollups: Dict[str, Dict[str, Any]] = {}
+    for receipt in receipts:
+        month = rollup_month(receipt)
+        if month is not None:
+            apply_receipt(rollups.setdefault(month, empty_rollup(user_id, month)), receipt)
+    return rollups
+
+
+def months_between(start_month: str, end_month: str) -> List[str]:
+    """Return the months from `start_month` to `end_month` included, as YYYY-MM."""
+    year, month = map(int, start_month.split("-"))
+    months = []
+    while f"{year:04d}-{month:02d}" <= end_month:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def month_range(start_date: str | None, end_date: str | None) -> Tuple[str | None, str | None] | None:
+    """Return the months covered by a date range, None if it does not start and end on month boundaries.
+
+    Args:
+        start_date: Earliest purchase date, YYYY-MM-DD, None for no bound
+        end_date: Latest purchase date (inclusive), YYYY-MM-DD, None for no bound
+
+    Returns:
+        Tuple[str | None, str | None] | None: The first and last months as YYYY-MM, None for no bound
+    """
+    start_month = end_month = None
+    if start_date:
+        start = parse_purchased_at(start_date)
+        if start is None or len(start_date.strip()) > 10 or start.day != 1:
+            return None
+        start_month = period_keys(start)["month"]
+    if end_date:
+        end = parse_purchased_at(end_date)
+        if end is None or len(end_date.strip()) > 10 or (end.date() + datetime.timedelta(days=1)).day != 1:
+            return None
+        end_month = period_keys(end)["month"]
+    return start_month, end_month
+
+
+def spending_from_rollups(rollups: Iterable[Dict[str, Any]], category: str | None = None) -> List[Dict[str, Any]]:
+    """Monthly spending in the format of `PurchaseRepository.spending_by_period`, from the rollups of the months.
+
+    Args:
+        rollups: The rollups of the months, in any order
+        category: Only count the items of this category, case insensitive
+    """
+    periods = []
+    for rollup in sorted(rollups, key=lambda rollup: rollup["month"]):
+        if category:
+            entry = rollup["byCategory"].get(normalize_key(category))
+            if entry:
+                periods.append({"period": rollup["month"], "amount": entry["amount"], "receipts": entry["receipts"]})
+        elif rollup["receipts"]:
+            periods.append(
+                {"period": rollup["month"], "amount": rollup["totalAmount"], "receipts": rollup["receipts"]}
+            )
+    return periods
+
+
+def summarize_rollups(rollups: Iterable[Dict[str, Any]], top: int = 5) -> Dict[str, Any]:
+    """Merge the rollups of several months into totals and the top categories, merchants and items.
+
+    Args:
+        rollups: The rollups of the months, in any order
+        top: Number of categories, merchants and items to return, by amount
+
+    Returns:
+        Dict[str, Any]: The totals, per month and over all the months
+    """
+    merged = empty_rollup("", "")
+    months = []
+    for rollup in sorted(rollups, key=lambda rollup: rollup["month"]):
+        months.append(
+            {
+                "month": rollup["month"],
+                "amount": rollup["totalAmount"],
+                "taxAmount": rollup["taxAmount"],
+                "receipts": rollup["receipts"],
+            }
+        )
+        for counter in ("receipts", "totalAmount", "taxAmount"):
+            merged[counter] = round(merged[counter] + rollup[counter], AMOUNT_DECIMALS)
+        for field in BREAKDOWNS:
+            for key, entry in rollup[field].items():
+                total = merged[field].setdefault(key, dict(entry, **{name: 0 for name in entry if name != "name"}))
+                for name, value in entry.items():
+                    if name != "name":
+                        total[name] = round(total[name] + value, AMOUNT_DECIMALS)
+
+    def ranked(field: str) -> List[Dict[str, Any]]:
+        return sorted(merged[field].values(), key=lambda entry: entry["amount"], reverse=True)[:top]
+
+    return {
+        "months": months,
+        "totalAmount": merged["totalAmount"],
+        "taxAmount": merged["taxAmount"],
+        "receipts": merged["receipts"],
+        "topCategories": ranked("byCategory"),
+        "topMerchants": ranked("byMerchant"),
+        "topItems": ranked("byItem"),
+    }
+
+
+def _same(expected: Any, actual: Any) -> bool:
+    """Whether two rollup values are equal, amounts within AMOUNT_TOLERANCE.
+
+    Display names are not compared, they are the first spelling written, which depends on the order of the writes.
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        keys = expected.keys() - {"name"}
+        return keys == actual.keys() - {"name"} and all(_same(expected[key], actual[key]) for key in keys)
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, abs_tol=AMOUNT_TOLERANCE)
+    return expected == actual
+
+
+def check_rollups(repository, user_id: str, repair: bool = False) -> Dict[str, Any]:
+    """Compare a user's rollups with the ones built from their receipts, and rebuild them if asked.
+
+    Args:
+        repository: The PurchaseRepository holding the receipts and rollups
+        user_id: The ID of the user
+        repair: Rebuild the rollups, in a transaction, when any month differs
+
+    Returns:
+        Dict[str, Any]: The number of months and the months whose rollup is wrong, missing or stale
+    """
+    expected = build_rollups(user_id, repository.load_history(user_id).values())
+    actual = repository.load_rollups(user_id)
+    mismatched = sorted(
+        month for month in expected.keys() | actual.keys() if not _same(expected.get(month), actual.get(month))
+    )
+    if mismatched:
+        logger.warning("Monthly rollups differ from the receipts", user_id=user_id, months=mismatched)
+        if repair:
+            repository.rebuild_rollups(user_id)
+    return {"user_id": user_id, "months": len(expected), "mismatched": mismatched, "repaired": repair and bool(mismatched)}
+
+
+def main():
+    from agentic_ai.purchase_repository import create_repository
+    from settings import get_settings
+
+    parser = argparse.ArgumentParser(description="Check the monthly rollups against the receipts")
+    parser.add_argument("--user-id", action="append", help="user to check, all the users if not set")
+    parser.add_argument("--repair", action="store_true", help="rebuild the rollups that differ")
+    args = parser.parse_args()
+
+    repository = create_repository(get_settings())
+    reports = [check_rollups(repository, user_id, args.repair) for user_id in args.user_id or repository.user_ids()]
+    print(json.dumps([report for report in reports if report["mismatched"]], indent=2))
+    logger.info(
+        "Monthly rollups checked",
+        users=len(reports),
+        inconsistent_users=sum(1 for report in reports if report["mismatched"]),
+    )
+    logger.stop_async_writer()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# agentic_ai/purchase_cache.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+
+class ChangeLog:
+    """Sequence of the changes of users' purchase histories, to detect a change racing with a load.
+
+    Take a `token` before loading a history, `changed_since` then tells
+    whether a change of this user was recorded in the meantime. Only the
+    last change of `max_users` users is remembered, the older ones count
+    as changed, which only makes the check conservative.
+    """
+
+    def __init__(self, max_users: int = 1024):
+        self.max_users = max_users
+        self._sequence = 0
+        self._changed_at: OrderedDict[str, int] = OrderedDict()
+        self._forgotten_at = 0
+        self._lock = threading.Lock()
+
+    def token(self) -> int:
+        """Return the current position in the sequence, to take before loading a history."""
+        with self._lock:
+            return self._sequence
+
+    def record(self, user_id: str) -> None:
+        """Record a change of the purchase history of a user."""
+        with self._lock:
+            self._sequence += 1
+            self._changed_at[user_id] = self._sequence
+            self._changed_at.move_to_end(user_id)
+            while len(self._changed_at) > self.max_users:
+                _, sequence = self._changed_at.popitem(last=False)
+                self._forgotten_at = max(self._forgotten_at, sequence)
+
+    def changed_since(self, user_id: str, token: int) -> bool:
+        """Tell whether the history of a user may have changed after `token` was taken."""
+        with self._lock:
+            return self._changed_at.get(user_id, self._forgotten_at) > token
+
+
+class _CacheEntry:
+    """Cached purchase history of a single user."""
+
+    __slots__ = ("purchases", "serialized", "expires_at")
+
+    def __init__(self, purchases: List[Dict[str, Any]], serialized: Dict[str, str], expires_at: float):
+        self.purchases = purchases
+        self.serialized = serialized
+        self.expires_at = expires_at
+
+
+class PurchaseHistoryCache:
+    """Size-bounded LRU cache of users' purchase histories.
+
+    Both the deserialized history and its serialized forms are cached, the
+    latter are computed lazily on first request of each encoding. Entries expire after `ttl_seconds`, which
+    bounds how stale a worker can be when another worker saves a receipt.
+
+    Cached lists are shared between callers and must not be mutated.
+
+    A history loaded while a receipt was appended or the user invalidated
+    may miss that change, loaders take a `fetch_token` before querying and
+    `put` refuses the history when the user changed since.
+
+    Attributes:
+        max_users: Maximum number of users kept in the cache.
+        ttl_seconds: Time to live of an entry, in seconds.
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that were not in the cache or expired.
+        evictions: Number of entries dropped because the cache was full.
+        stale_puts: Number of histories refused because the user changed while they were loaded.
+    """
+
+    def __init__(self, max_users: int = 256, ttl_seconds: float = 60.0):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_puts = 0
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._changes = ChangeLog(max_users * 4)
+        self._lock = threading.Lock()
+
+    def _lookup(self, user_id: str) -> _CacheEntry | None:
+        """Return the live entry of a user and count the hit or miss. Must hold the lock."""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[user_id]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def get(self, user_id: str) -> List[Dict[str, Any]] | None:
+        """Return the cached purchase history of a user, or None on a miss."""
+        with self._lock:
+            entry = self._lookup(user_id)
+            return entry.purchases if entry else None
+
+    def get_serialized(
+        self, user_id: str, encoding: str = "json", serializer: Callable[[Any], str] = json.dumps
+    ) -> str | None:
+        """Return the serialized purchase history of a user, or None on a miss.
+
+        Args:
+            user_id: The ID of the user
+            encoding: Name of the serialized form, e.g. "json" or "compact"
+            serializer: Function used to serialize the history the first time this encoding is requested
+
+        Returns:
+            str | None: The serialized history
+        """
+        with self._lock:
+            entry = self._lookup(user_id)
+            if entry is None:
+                return None
+            purchases = entry.purchases
+            serialized = entry.serialized.get(encoding)
+        if serialized is None:
+            # Serialized without the lock, a large history must not block the other users
+            serialized = serializer(purchases)
+            self.add_serialized(user_id, purchases, encoding, serialized)
+        return serialized
+
+    def add_serialized(self, user_id: str, purchases: List[Dict[str, Any]], encoding: str, serialized: str) -> None:
+        """Cache a serialized form of a history, if the history is still the cached one of the user.
+
+        Args:
+            user_id: The ID of the user
+            purchases: The history that was serialized, as returned by `get` or given to `put`
+            encoding: Name of the serialized form
+            serialized: The serialized history
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            # A receipt appended meanwhile replaced the list
+            if entry is not None and entry.purchases is purchases:
+                entry.serialized[encoding] = serialized
+
+    def fetch_token(self) -> int:
+        """Return the token to take before querying a history that will be given to `put`."""
+        return self._changes.token()
+
+    def put(
+        self,
+        user_id: str,
+        purchases: List[Dict[str, Any]],
+        serialized: Dict[str, str] | None = None,
+        token: int | None = None,
+    ) -> bool:
+        """Store the purchase history of a user, evicting the least recently used users if full.
+
+        Args:
+            user_id: The ID of the user
+            purchases: The purchase history of the user
+            serialized: Serialized forms of the history the caller already computed, keyed by encoding
+            token: The `fetch_token` taken before the history was queried, None to store it unconditionally
+
+        Returns:
+            bool: False if the history was refused, a receipt was appended or the user invalidated since `token`
+        """
+        with self._lock:
+            if token is not None and self._changes.changed_since(user_id, token):
+                self.stale_puts += 1
+                return False
+            self._entries[user_id] = _CacheEntry(purchases, dict(serialized or {}), time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def append(self, user_id: str, receipt: Dict[str, Any]) -> None:
+        """Add a newly saved receipt to the cached history of a user, if cached.
+
+        The list is replaced rather than mutated, so histories already handed
+        out to callers do not change under them.
+        """
+        with self._lock:
+            self._changes.record(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            entry.purchases = entry.purchases + [receipt]
+            entry.serialized = {}
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the cached history of a user."""
+        with self._lock:
+            self._changes.record(user_id)
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache counters, for logging and monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_puts": self.stale_puts,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,311 @@
+# agentic_ai/purchase_queries.py
+
+import datetime
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from agentic_ai.purchase_time import LOCAL_TIMEZONE, PERIODS, parse_purchased_at, period_keys
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Item name prefixes indexed in "itemSearchKeys", see `build_index_fields`
+MIN_PREFIX_LENGTH = 3
+MAX_WORD_PREFIX_LENGTH = 10
+MAX_NAME_PREFIX_LENGTH = 20
+
+# Version of the fields of `build_index_fields`, documents stored with an older one are backfilled
+INDEX_VERSION = 2
+
+# Document field holding the bucket of each period, see `purchase_time.period_keys`
+PERIOD_FIELDS = {"day": "purchaseDay", "week": "purchaseWeek", "month": "purchaseMonth"}
+
+if TYPE_CHECKING:
+    from google.cloud import firestore
+
+# Receipt fields that can be requested through the "fields" projection
+RECEIPT_FIELDS = (
+    "merchantName",
+    "purchasedAt",
+    "totalAmount",
+    "currency",
+    "taxAmount",
+    "purchaseNumber",
+    "paymentMethod",
+    "items",
+)
+
+
+def normalize_key(value: str) -> str:
+    """Normalize a merchant, category or item name for exact and prefix matching."""
+    return " ".join(value.lower().split())
+
+
+def _item_search_keys(name: str) -> set[str]:
+    """Prefixes of an item name and of each of its words, used for prefix search."""
+    name = normalize_key(name)
+    keys = {name[:length] for length in range(MIN_PREFIX_LENGTH, min(len(name), MAX_NAME_PREFIX_LENGTH) + 1)}
+    for word in name.split():
+        keys.update(word[:length] for length in range(MIN_PREFIX_LENGTH, min(len(word), MAX_WORD_PREFIX_LENGTH) + 1))
+    return keys
+
+
+def build_index_fields(receipt: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the denormalized fields stored next to a receipt to push query filters down to Firestore.
+
+    "purchasedAt" is parsed once here: the epoch timestamp serves range
+    queries and sorting, the ISO 8601 time is unambiguous, and the day, ISO
+    week and month buckets serve the aggregations. They are all None when
+    "purchasedAt" cannot be parsed.
+
+    Args:
+        receipt: The receipt data, as passed to `save_attachment_data`.
+
+    Returns:
+        Dict[str, Any]: The fields to store at the top level of the receipt document.
+    """
+    purchased_at = parse_purchased_at(receipt.get("purchasedAt"))
+    items = receipt.get("items") or []
+    search_keys = set()
+    for item in items:
+        search_keys.update(_item_search_keys(item.get("name") or ""))
+    periods = period_keys(purchased_at) if purchased_at else {}
+
+    return {
+        "indexVersion": INDEX_VERSION,
+        "purchasedAtTs": int(purchased_at.timestamp()) if purchased_at else None,
+        "purchasedAtIso": purchased_at.isoformat() if purchased_at else None,
+        **{field: periods.get(period) for period, field in PERIOD_FIELDS.items()},
+        "merchantKey": normalize_key(receipt.get("merchantName") or ""),
+        "categoryKeys": sorted({normalize_key(item.get("category") or "") for item in items} - {""}),
+        "itemSearchKeys": sorted(search_keys),
+    }
+
+
+def parse_date_bound(value: str | None, end_of_day: bool) -> int | None:
+    """Convert a date filter to an epoch timestamp, the end date is inclusive."""
+    if not value:
+        return None
+    parsed = parse_purchased_at(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}, expected YYYY-MM-DD")
+    if end_of_day and len(value.strip()) <= 10:
+        parsed = datetime.datetime.combine(parsed.date(), datetime.time.max, tzinfo=LOCAL_TIMEZONE)
+    return int(parsed.timestamp())
+
+
+def item_matches(item: Dict[str, Any], category: str | None, item_prefix: str | None) -> bool:
+    """Whether an item matches the category and item name prefix filters."""
+    if category and normalize_key(item.get("category") or "") != category:
+        return False
+    if item_prefix:
+        name = normalize_key(item.get("name") or "")
+        return name.startswith(item_prefix) or any(word.startswith(item_prefix) for word in name.split())
+    return True
+
+
+def query_purchases(
+    collection: "firestore.CollectionReference",
+    user_id: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    category: str | None = None,
+    merchant: str | None = None,
+    item_prefix: str | None = None,
+    order_by_amount: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    page_token: str | None = None,
+    fields: List[str] | None = None,
+) -> Dict[str, Any]:
+    """Query a page of a user's purchases with the filters evaluated by Firestore.
+
+    Receipts are returned newest first, or by descending total amount when
+    `order_by_amount` is set. When a category or item prefix filter is given,
+    only the matching items of each receipt are returned, with their sum in
+    "matchedAmount".
+
+    Firestore allows a single "array-contains" filter per query, so when both
+    a category and an item prefix are given, the item prefix is only applied
+    to the returned items.
+
+    Args:
+        collection: The Firestore collection holding the receipts
+        user_id: The ID of the user
+        start_date: Earliest purchase date, YYYY-MM-DD
+        end_date: Latest purchase date (inclusive), YYYY-MM-DD
+        category: Item category, case insensitive
+        merchant: Merchant name, case insensitive
+        item_prefix: Prefix of an item name or of one of its words, case insensitive
+        order_by_amount: Order by total amount instead of purchase date
+        page_size: Number of receipts per page
+        page_token: The "next_page_token" of the previous page
+        fields: Receipt fields to return, all of them if not set
+
+    Returns:
+        Dict[str, Any]: {"purchases": List[Dict[str, Any]], "next_page_token": str | None}
+    """
+    # Imported here, google.cloud.firestore is slow to import
+    from google.cloud import firestore
+    from google.cloud.firestore_v1 import FieldFilter
+    from google.cloud.firestore_v1.base_query import And
+
+    category = normalize_key(category) if category else None
+    merchant = normalize_key(merchant) if merchant else None
+    item_prefix = normalize_key(item_prefix) if item_prefix else None
+    if item_prefix and len(item_prefix) < MIN_PREFIX_LENGTH:
+        raise ValueError(f"item_prefix must have at least {MIN_PREFIX_LENGTH} characters")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    fields = [field for field in (fields or RECEIPT_FIELDS) if field in RECEIPT_FIELDS]
+    filter_items = bool(category or item_prefix)
+    if filter_items and "items" not in fields:
+        fields.append("items")
+
+    filters = [FieldFilter("user_id", "==", user_id)]
+    start_ts = parse_date_bound(start_date, end_of_day=False)
+    end_ts = parse_date_bound(end_date, end_of_day=True)
+    if start_ts is not None:
+        filters.append(FieldFilter("purchasedAtTs", ">=", start_ts))
+    if end_ts is not None:
+        filters.append(FieldFilter("purchasedAtTs", "<=", end_ts))
+    if merchant:
+        filters.append(FieldFilter("merchantKey", "==", merchant))
+    if category:
+        filters.append(FieldFilter("categoryKeys", "array_contains", category))
+    elif item_prefix:
+        # Single words are indexed by word prefixes, longer ones by name prefixes
+        max_length = MAX_WORD_PREFIX_LENGTH if " " not in item_prefix else MAX_NAME_PREFIX_LENGTH
+        filters.append(FieldFilter("itemSearchKeys", "array_contains", item_prefix[:max_length]))
+
+    query = collection.where(filter=And(filters=filters))
+    if order_by_amount:
+        query = query.order_by("data.totalAmount", direction=firestore.Query.DESCENDING)
+    else:
+        query = query.order_by("purchasedAtTs", direction=firestore.Query.DESCENDING)
+    query = query.select([f"data.{field}" for field in fields])
+
+    if page_token:
+        cursor = collection.document(page_token).get()
+        if not cursor.exists:
+            raise ValueError("Invalid page_token")
+        query = query.start_after(cursor)
+
+    # Fetch one more document than needed to know whether there is a next page
+    documents = list(query.limit(page_size + 1).stream())
+    next_page_token = documents[page_size - 1].id if len(documents) > page_size else None
+
+    purchases = []
+    for document in documents[:page_size]:
+        data = (document.to_dict() or {}).get("data", {})
+        if filter_items:
+            items = [item for item in data.get("items") or [] if item_matches(item, category, item_prefix)]
+            if not items:
+                continue
+            data["items"] = items
+            data["matchedAmount"] = round(sum(float(item.get("totalPrice") or 0) for item in items), 2)
+        purchases.append(data)
+
+    return {"purchases": purchases, "next_page_token": next_page_token}
+
+
+def spending_by_period(
+    collection: "firestore.CollectionReference",
+    user_id: str,
+    period: str = "month",
+    start_date: str | None = None,
+    end_date: str | None = None,
+    category: str | None = None,
+) -> List[Dict[str, Any]]:
+    """Sum a user's spending per day, ISO week or month with the range filters evaluated by Firestore.
+
+    Only the bucket field and the amounts of the receipts are read. Receipts
+    without a parseable "purchasedAt" are left out.
+
+    Args:
+        collection: The Firestore collection holding the receipts
+        user_id: The ID of the user
+        period: "day", "week" or "month"
+        start_date: Earliest purchase date, YYYY-MM-DD
+        end_date: Latest purchase date (inclusive), YYYY-MM-DD
+        category: Only sum the items of this category, case insensitive
+
+    Returns:
+        List[Dict[str, Any]]: [{"period": str, "amount": float, "receipts": int}] in chronological order,
+            periods are formatted as in `purchase_time.period_keys`
+    """
+    from google.cloud.firestore_v1 import FieldFilter
+    from google.cloud.firestore_v1.base_query import And
+
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    category = normalize_key(category) if category else None
+    field = PERIOD_FIELDS[period]
+
+    filters = [FieldFilter("user_id", "==", user_id)]
+    start_ts = parse_date_bound(start_date, end_of_day=False)
+    end_ts = parse_date_bound(end_date, end_of_day=True)
+    if start_ts is not None:
+        filters.append(FieldFilter("purchasedAtTs", ">=", start_ts))
+    if end_ts is not None:
+        filters.append(FieldFilter("purchasedAtTs", "<=", end_ts))
+    if category:
+        filters.append(FieldFilter("categoryKeys", "array_contains", category))
+    projection = [field, "data.totalAmount", "data.purchasedAt"] + (["data.items"] if category else [])
+    query = collection.where(filter=And(filters=filters)).select(projection)
+
+    totals: Dict[str, List[float]] = {}
+    for document in query.stream():
+        fields = document.to_dict() or {}
+        data = fields.get("data", {})
+        key = fields.get(field)
+        if field not in fields:
+            # Stored before the buckets existed and not backfilled yet
+            purchased_at = parse_purchased_at(data.get("purchasedAt"))
+            key = period_keys(purchased_at)[period] if purchased_at else None
+        if key is None:
+            continue
+        if category:
+            items = [item for item in data.get("items") or [] if item_matches(item, category, None)]
+            amount = sum(float(item.get("totalPrice") or 0) for item in items)
+        else:
+            amount = float(data.get("totalAmount") or 0)
+        total = totals.setdefault(key, [0.0, 0])
+        total[0] += amount
+        total[1] += 1
+
+    return [
+        {"period": key, "amount": round(amount, 2), "receipts": receipts}
+        for key, (amount, receipts) in sorted(totals.items())
+    ]
+
+
+def backfill_index_fields(
+    client: "firestore.Client", collection: "firestore.CollectionReference", batch_size: int = 500
+) -> int:
+    """Add the fields of `build_index_fields` to receipts stored with an older INDEX_VERSION.
+
+    Args:
+        client: The Firestore client
+        collection: The Firestore collection holding the receipts
+        batch_size: Number of documents updated per write batch
+
+    Returns:
+        int: The number of updated documents
+    """
+    updated = 0
+    batch = client.batch()
+    pending = 0
+    for document in collection.select(["indexVersion", "data"]).stream():
+        data = document.to_dict() or {}
+        if data.get("indexVersion", 0) >= INDEX_VERSION or "data" not in data:
+            continue
+        batch.update(document.reference, build_index_fields(data["data"]))
+        pending += 1
+        if pending == batch_size:
+            batch.commit()
+            updated += pending
+            batch, pending = client.batch(), 0
+
+    if pending:
+        batch.commit()
+        updated += pending
+    return updated
@@ -0,0 +1,397 @@
+# agentic_ai/purchase_repository.py
+
+import abc
+import threading
+from typing import Any, Dict, List, Tuple
+
+import tracing
+from agentic_ai.monthly_rollups import (
+    BREAKDOWNS,
+    apply_receipt,
+    build_rollups,
+    compact_rollup,
+    empty_rollup,
+    months_between,
+    rollup_changes,
+    rollup_delta,
+    rollup_document_id,
+    rollup_month,
+)
+from agentic_ai.purchase_queries import DEFAULT_PAGE_SIZE, backfill_index_fields, query_purchases, spending_by_period
+
+FIRESTORE = "firestore"
+SQLITE = "sqlite"
+
+
+class PurchaseRepository(abc.ABC):
+    """Storage of the receipt documents behind the save and query tools.
+
+    A document is a dict with "user_id", the receipt in "data", the fields of
+    `build_index_fields` and, for receipts with a purchase key, "purchaseKey"
+    and "imageFingerprints". Document IDs are chosen by the callers, so that
+    writing the same receipt twice is idempotent.
+
+    Writes update the monthly rollups of the receipts' users atomically with
+    the receipts, see `monthly_rollups`.
+    """
+
+    @abc.abstractmethod
+    def create(self, document_id: str, document: Dict[str, Any]) -> bool:
+        """Store a new document, return False if a document with this ID already exists."""
+
+    @abc.abstractmethod
+    def write_batch(self, documents: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store (document ID, document) pairs atomically, replacing the documents that exist.
+
+        The image fingerprints of a replaced document are kept when the new
+        document has none, e.g. when an import rewrites a receipt saved from a
+        photo, so that later uploads of the photo are still recognized.
+        """
+
+    @abc.abstractmethod
+    def load_rollups(
+        self, user_id: str, start_month: str | None = None, end_month: str | None = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return the monthly rollups of a user between two months included, YYYY-MM, by month."""
+
+    @abc.abstractmethod
+    def rebuild_rollups(self, user_id: str) -> int:
+        """Rebuild the monthly rollups of a user from their receipts in a transaction, return their number."""
+
+    @abc.abstractmethod
+    def user_ids(self) -> List[str]:
+        """Return the IDs of the users having receipts."""
+
+    @abc.abstractmethod
+    def load_history(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return the receipts data of a user, by document ID."""
+
+    @abc.abstractmethod
+    def load_fingerprints(self, user_id: str) -> List[Tuple[str, str]]:
+        """Return the (perceptual hash, purchase key) pairs of the images of a user's receipts."""
+
+    @abc.abstractmethod
+    def query(
+        self,
+        user_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        merchant: str | None = None,
+        item_prefix: str | None = None,
+        order_by_amount: bool = False,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: str | None = None,
+        fields: List[str] | None = None,
+    ) -> Dict[str, Any]:
+        """Query a page of a user's purchases, see `purchase_queries.query_purchases` for the arguments.
+
+        Returns:
+            Dict[str, Any]: {"purchases": List[Dict[str, Any]], "next_page_token": str | None}
+        """
+
+    @abc.abstractmethod
+    def spending_by_period(
+        self,
+        user_id: str,
+        period: str = "month",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Sum a user's spending per period, see `purchase_queries.spending_by_period` for the arguments.
+
+        Returns:
+            List[Dict[str, Any]]: [{"period": str, "amount": float, "receipts": int}] in chronological order
+        """
+
+    @abc.abstractmethod
+    def backfill_index_fields(self, batch_size: int = 500) -> int:
+        """Recompute the index fields of the documents stored with an older INDEX_VERSION, return their number."""
+
+    def is_transient_error(self, error: Exception) -> bool:
+        """Whether a failed write may succeed when tried again."""
+        return False
+
+
+# Rollups of a month range are read by document ID up to this many months, with a query beyond
+MAX_ROLLUP_READS = 120
+
+# Attempts of a batch whose documents are changed by other writers between its read and its commit
+MAX_BATCH_ATTEMPTS = 5
+
+# Fields of a stored receipt kept when a write replaces it with a document that has none, see `write_batch`
+KEPT_FIELDS = ("imageFingerprints",)
+
+
+def _rollup_increments(delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the fields merging the change of a rollup into its document with Firestore increments."""
+    from google.cloud import firestore
+
+    fields = {"user_id": delta["user_id"], "month": delta["month"]}
+    for counter in ("receipts", "totalAmount", "taxAmount"):
+        fields[counter] = firestore.Increment(delta[counter])
+    for field in BREAKDOWNS:
+        # An empty map would replace the stored one
+        if delta[field]:
+            fields[field] = {
+                key: {name: value if name == "name" else firestore.Increment(value) for name, value in entry.items()}
+                for key, entry in delta[field].items()
+            }
+    return fields
+
+
+class FirestorePurchaseRepository(PurchaseRepository):
+    """Receipts stored as documents of a Firestore collection.
+
+    The client is created on first use, google.cloud.firestore is slow to
+    import and not needed before the first database access.
+
+    Attributes:
+        project_id: Google Cloud project of the "(default)" database.
+        collection_name: Name of the receipts collection.
+        rollup_collection_name: Name of the monthly rollups collection, defaults to the receipts one
+            followed by "-monthly-rollups".
+    """
+
+    def __init__(
+        self, project_id: str, collection_name: str, rollup_collection_name: str | None = None, client=None
+    ):
+        self.project_id = project_id
+        self.collection_name = collection_name
+        self.rollup_collection_name = rollup_collection_name or f"{collection_name}-monthly-rollups"
+        self._client = client
+        self._collection = client.collection(collection_name) if client is not None else None
+        self._rollup_collection = client.collection(self.rollup_collection_name) if client is not None else None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The Firestore client, created on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import firestore
+
+                    client = firestore.Client(project=self.project_id)  # Will use "(default)" database
+                    self._collection = client.collection(self.collection_name)
+                    self._rollup_collection = client.collection(self.rollup_collection_name)
+                    self._client = client
+        return self._client
+
+    @property
+    def collection(self):
+        """The Firestore collection holding the receipts."""
+        if self._collection is None:
+            self.client
+        return self._collection
+
+    @property
+    def rollup_collection(self):
+        """The Firestore collection holding the monthly rollups."""
+        if self._rollup_collection is None:
+            self.client
+        return self._rollup_collection
+
+    def _create_with_rollup(self, transaction, document_id: str, document: Dict[str, Any]) -> bool:
+        """Create a receipt document and update the rollup of its month in a transaction, see `create`."""
+        reference = self.collection.document(document_id)
+        if next(iter(transaction.get_all([reference]))).exists:
+            return False
+        month = rollup_month(document["data"])
+        if month is not None:
+            rollup_reference = self.rollup_collection.document(rollup_document_id(document["user_id"], month))
+            snapshot = next(iter(transaction.get_all([rollup_reference])))
+            rollup = (compact_rollup(snapshot.to_dict()) if snapshot.exists else None) or empty_rollup(
+                document["user_id"], month
+            )
+            apply_receipt(rollup, document["data"])
+            transaction.set(rollup_reference, rollup)
+        transaction.set(reference, document)
+        return True
+
+    def _commit_batch(self, documents: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Write receipt documents in a batch with the increments of their rollups, see `write_batch`."""
+        from google.cloud import firestore
+
+        references = {document_id: self.collection.document(document_id) for document_id, _ in documents}
+        snapshots = {snapshot.id: snapshot for snapshot in self.client.get_all(list(references.values()))}
+        stored = {document_id: snapshot.to_dict() for document_id, snapshot in snapshots.items() if snapshot.exists}
+
+        # A document written twice in the batch replaces its first write
+        writes, latest = [], {}
+        for document_id, document in documents:
+            previous = latest.get(document_id, (stored.get(document_id) or {}).get("data"))
+            writes.append((document["user_id"], previous, document["data"]))
+            latest[document_id] = document["data"]
+
+        batch = self.client.batch()
+        for document_id, document in dict(documents).items():
+            if document_id in stored:
+                # Fails if another writer changed the document since it was read, the increments would be wrong
+                fields = {
+                    field: firestore.DELETE_FIELD
+                    for field in stored[document_id]
+                    if field not in document and field not in KEPT_FIELDS
+                }
+                batch.update(
+                    references[document_id],
+                    {**document, **fields},
+                    option=self.client.write_option(last_update_time=snapshots[document_id].update_time),
+                )
+            else:
+                # Fails if another writer created the document since it was read
+                batch.create(references[document_id], document)
+        for (user_id, month), receipts in rollup_changes(writes).items():
+            increments = _rollup_increments(rollup_delta(user_id, month, receipts))
+            batch.set(self.rollup_collection.document(rollup_document_id(user_id, month)), increments, merge=True)
+        batch.commit()
+
+    def create(self, document_id: str, document: Dict[str, Any]) -> bool:
+        from google.cloud import firestore
+
+        with tracing.span("firestore.create"):
+            return firestore.transactional(self._create_with_rollup)(self.client.transaction(), document_id, document)
+
+    def write_batch(self, documents: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store (document ID, document) pairs atomically, replacing the documents that exist.
+
+        The image fingerprints of a replaced document are kept when the new
+        document has none. The documents are written in a batch rather than a transaction, and the
+        changes of the rollups are applied as increments, so that parallel
+        batches of the same user do not contend on their rollup documents. Every
+        write is conditioned on the document being unchanged since it was read,
+        the batch is read and committed again when another writer got there first.
+        """
+        from google.api_core import exceptions
+
+        with tracing.span("firestore.commit", documents=len(documents)) as span:
+            for attempt in range(1, MAX_BATCH_ATTEMPTS + 1):
+                try:
+                    self._commit_batch(documents)
+                    break
+                except (exceptions.AlreadyExists, exceptions.FailedPrecondition):
+                    if attempt == MAX_BATCH_ATTEMPTS:
+                        raise
+            span.set(attempts=attempt)
+
+    def load_rollups(
+        self, user_id: str, start_month: str | None = None, end_month: str | None = None
+    ) -> Dict[str, Dict[str, Any]]:
+        from google.cloud.firestore_v1 import FieldFilter
+
+        months = months_between(start_month, end_month) if start_month and end_month else []
+        with tracing.span("firestore.load_rollups") as span:
+            if months and len(months) <= MAX_ROLLUP_READS:
+                references = [self.rollup_collection.document(rollup_document_id(user_id, month)) for month in months]
+                snapshots = self.client.get_all(references)
+            else:
+                snapshots = self.rollup_collection.where(filter=FieldFilter("user_id", "==", user_id)).stream()
+            rollups = {}
+            for snapshot in snapshots:
+                rollup = compact_rollup(snapshot.to_dict()) if snapshot.exists else None
+                if rollup and (start_month or "") <= rollup["month"] <= (end_month or "9999-12"):
+                    rollups[rollup["month"]] = rollup
+            span.set(documents=len(rollups))
+        return rollups
+
+    def rebuild_rollups(self, user_id: str) -> int:
+        from google.cloud import firestore
+        from google.cloud.firestore_v1 import FieldFilter
+
+        user_filter = FieldFilter("user_id", "==", user_id)
+
+        @firestore.transactional
+        def rebuild(transaction) -> int:
+            receipts = [
+                snapshot.to_dict()["data"]
+                for snapshot in transaction.get(self.collection.where(filter=user_filter).select(["data"]))
+            ]
+            stored = list(transaction.get(self.rollup_collection.where(filter=user_filter).select(["month"])))
+            rollups = build_rollups(user_id, receipts)
+            for snapshot in stored:
+                if snapshot.to_dict().get("month") not in rollups:
+                    transaction.delete(snapshot.reference)
+            for month, rollup in rollups.items():
+                transaction.set(self.rollup_collection.document(rollup_document_id(user_id, month)), rollup)
+            return len(rollups)
+
+        with tracing.span("firestore.rebuild_rollups") as span:
+            months = rebuild(self.client.transaction())
+            span.set(months=months)
+        return months
+
+    def user_ids(self) -> List[str]:
+        return sorted({snapshot.get("user_id") for snapshot in self.collection.select(["user_id"]).stream()})
+
+    def load_history(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        from google.cloud.firestore_v1 import FieldFilter
+
+        query = self.collection.where(filter=FieldFilter("user_id", "==", user_id))
+        with tracing.span("firestore.query", collection=self.collection_name) as span:
+            history = {document.id: document.to_dict()["data"] for document in query.stream()}
+            span.set(documents=len(history))
+        return history
+
+    def load_fingerprints(self, user_id: str) -> List[Tuple[str, str]]:
+        from google.cloud.firestore_v1 import FieldFilter
+
+        query = self.collection.where(filter=FieldFilter("user_id", "==", user_id))
+        with tracing.span("firestore.query_fingerprints") as span:
+            pairs = []
+            for document in query.select(["purchaseKey", "imageFingerprints"]).stream():
+                fields = document.to_dict()
+                pairs.extend(
+                    (image_hash, fields["purchaseKey"]) for image_hash in fields.get("imageFingerprints") or []
+                )
+            span.set(images=len(pairs))
+        return pairs
+
+    def query(self, user_id: str, **filters) -> Dict[str, Any]:
+        with tracing.span("firestore.query_purchases") as span:
+            result = query_purchases(self.collection, user_id, **filters)
+            span.set(documents=len(result["purchases"]))
+        return result
+
+    def spending_by_period(self, user_id: str, **filters) -> List[Dict[str, Any]]:
+        with tracing.span("firestore.spending_by_period") as span:
+            periods = spending_by_period(self.collection, user_id, **filters)
+            span.set(periods=len(periods))
+        return periods
+
+    def backfill_index_fields(self, batch_size: int = 500) -> int:
+        return backfill_index_fields(self.client, self.collection, batch_size)
+
+    def is_transient_error(self, error: Exception) -> bool:
+        from google.api_core import exceptions
+
+        return isinstance(
+            error,
+            (
+                exceptions.Aborted,
+                exceptions.DeadlineExceeded,
+                exceptions.InternalServerError,
+                exceptions.ResourceExhausted,
+                exceptions.ServiceUnavailable,
+            ),
+        )
+
+
+def create_repository(settings) -> PurchaseRepository:
+    """Create the repository selected by PURCHASE_REPOSITORY.
+
+    Args:
+        settings: The application settings
+
+    Returns:
+        PurchaseRepository: The Firestore or SQLite repository
+    """
+    if settings.PURCHASE_REPOSITORY == FIRESTORE:
+        return FirestorePurchaseRepository(
+            settings.GCLOUD_PROJECT_ID, settings.DB_COLLECTION_NAME, settings.DB_ROLLUP_COLLECTION_NAME
+        )
+    if settings.PURCHASE_REPOSITORY == SQLITE:
+        from agentic_ai.sqlite_repository import SQLitePurchaseRepository
+
+        return SQLitePurchaseRepository(settings.SQLITE_DATABASE_PATH)
+    raise ValueError(f"Unknown PURCHASE_REPOSITORY {settings.PURCHASE_REPOSITORY}, expected {FIRESTORE} or {SQLITE}")
@@ -0,0 +1,108 @@
+# agentic_ai/purchase_time.py
+
+import datetime
+import re
+from zoneinfo import ZoneInfo
+
+# All screens are rendered for users in India, see prompts/screens.md
+LOCAL_TIMEZONE = ZoneInfo("Asia/Kolkata")
+
+# Formats seen in the wild for "purchasedAt". The extraction prompt asks for
+# DD-MM-YYYY, the tool docstrings for YYYY-MM-DD, so both are accepted.
+PURCHASED_AT_FORMATS = (
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d-%m-%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+)
+
+# Fast path for the two documented formats, strptime is comparatively slow
+_DAY_FIRST_PATTERN = re.compile(r"(\d{2})-(\d{2})-(\d{4})(?:[ T](\d{2}):(\d{2})(?::(\d{2}))?)?$")
+_YEAR_FIRST_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2}))?)?$")
+
+
+def _parse_fast(value: str) -> datetime.datetime | None:
+    """Parse the documented formats without strptime, None if the value does not match."""
+    match = _DAY_FIRST_PATTERN.match(value)
+    if match:
+        day, month, year, hour, minute, second = match.groups()
+    else:
+        match = _YEAR_FIRST_PATTERN.match(value)
+        if not match:
+            return None
+        year, month, day, hour, minute, second = match.groups()
+
+    try:
+        return datetime.datetime(
+            int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+            tzinfo=LOCAL_TIMEZONE,
+        )
+    except ValueError:
+        return None
+
+
+def parse_purchased_at(value: str | None) -> datetime.datetime | None:
+    """Parse a free-form "purchasedAt" string into a timezone aware datetime.
+
+    Args:
+        value: The raw "purchasedAt" value of a receipt.
+
+    Returns:
+        datetime.datetime | None: The purchase time in Asia/Kolkata, or None if the value cannot be parsed.
+    """
+    if not value or not isinstance(value, str):
+        return None
+
+    value = value.strip()
+    parsed = _parse_fast(value)
+    if parsed:
+        return parsed
+
+    for fmt in PURCHASED_AT_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=LOCAL_TIMEZONE)
+
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=LOCAL_TIMEZONE)
+    return parsed.astimezone(LOCAL_TIMEZONE)
+
+
+def current_time() -> datetime.datetime:
+    """Return the current time in the users' timezone."""
+    return datetime.datetime.now(LOCAL_TIMEZONE)
+
+
+def format_display_date(value: datetime.datetime | datetime.date) -> str:
+    """Format a date the way the UI expects it, e.g. "July 5, 2025"."""
+    return f"{value.strftime('%B')} {value.day}, {value.year}"
+
+
+# Time buckets of the receipts, stored with them so that aggregations group on them instead of parsing dates
+PERIODS = ("day", "week", "month")
+
+
+def period_keys(value: datetime.datetime) -> dict[str, str]:
+    """Return the day, ISO week and month buckets of a purchase time, in its local timezone.
+
+    The keys sort chronologically, e.g. {"day": "2025-07-05", "week": "2025-W27", "month": "2025-07"}.
+    """
+    iso_year, iso_week, _ = value.isocalendar()
+    return {
+        "day": value.strftime("%Y-%m-%d"),
+        "week": f"{iso_year}-W{iso_week:02d}",
+        "month": value.strftime("%Y-%m"),
+    }
@@ -0,0 +1,262 @@
+# agentic_ai/receipt_dedup.py
+
+import hashlib
+import io
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from PIL import Image, ImageOps
+
+import logger
+from agentic_ai.purchase_time import parse_purchased_at
+
+# Perceptual hashes of the attachments of the current turn, read by save_attachment_data
+FINGERPRINTS_STATE_KEY = "temp:receipt_fingerprints"
+
+# Side of the difference hash grid, hashes have HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 16
+
+# Maximum number of differing bits for an upload to be the same image as a saved one, only
+# re-uploads and re-encodings of a photo are this close, a new photo of a receipt goes through
+# extraction and is caught by its purchase key in save_attachment_data
+MAX_HASH_DISTANCE = 4
+
+# Hashes with fewer set or unset bits than this carry too little detail to tell receipts apart
+MIN_HASH_DETAIL = 24
+
+
+def perceptual_hash(image_bytes: bytes) -> Optional[str]:
+    """Return the 256-bit difference hash of an image as hex digits.
+
+    The image is oriented, reduced to 17x16 grey pixels and every pixel is
+    compared with its right neighbour, so the hash survives re-encoding,
+    resizing and small exposure changes.
+
+    Returns:
+        Optional[str]: The hash, None if the image cannot be decoded or is too uniform to be fingerprinted
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            # Let the JPEG decoder downscale while decoding, much faster than a full decode. Kept 32 times
+            # the grid, coarser drafts round differently from a full decode and flip bits of re-encoded copies
+            image.draft("L", ((HASH_SIZE + 1) * 32, HASH_SIZE * 32))
+            pixels = (
+                ImageOps.exif_transpose(image)
+                .convert("L")
+                .resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX)
+                .tobytes()
+            )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for column in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    set_bits = bits.bit_count()
+    if min(set_bits, HASH_SIZE * HASH_SIZE - set_bits) < MIN_HASH_DETAIL:
+        return None
+    return f"{bits:0{HASH_SIZE * HASH_SIZE // 4}x}"
+
+
+def hash_distance(first: str, second: str) -> int:
+    """Return the number of differing bits between two perceptual hashes."""
+    return (int(first, 16) ^ int(second, 16)).bit_count()
+
+
+def _to_amount(value: Any) -> Optional[float]:
+    """Convert a total to float, None if it is missing or not a number, model output may hold "280" strings."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    return amount if math.isfinite(amount) else None
+
+
+def purchase_key(receipt: Dict[str, Any]) -> Optional[str]:
+    """Return the identity of a receipt from its merchant, number, date and total, None if too incomplete.
+
+    Values are normalized, e.g. "01-06-2025 19:30" and "2025-06-01 19:30:00"
+    give the same key, so do totals of "280" and 280.
+    """
+    purchased_at = parse_purchased_at(receipt.get("purchasedAt"))
+    total_amount = _to_amount(receipt.get("totalAmount"))
+    if purchased_at is None or total_amount is None:
+        return None
+    merchant = " ".join(str(receipt.get("merchantName") or "").lower().split())
+    number = str(receipt.get("purchaseNumber") or "").strip().lower()
+    return f"{merchant}|{number}|{purchased_at.isoformat()}|{round(total_amount, 2)}"
+
+
+def purchase_document_id(user_id: str, key: str) -> str:
+    """Return the deterministic document ID of a receipt, the same receipt is always written to the same document."""
+    return hashlib.sha256(f"{user_id}\n{key}".encode("utf-8")).hexdigest()[:32]
+
+
+class _UserFingerprints:
+    """Purchase keys and image hashes of the receipts saved by a user."""
+
+    __slots__ = ("receipts", "image_hashes")
+
+    def __init__(self):
+        self.receipts: Dict[str, Dict[str, Any]] = {}  # Purchase key -> receipt
+        self.image_hashes: List[Tuple[str, str]] = []  # (perceptual hash, purchase key)
+
+
+class ReceiptFingerprintIndex:
+    """Per-user index of the receipts already saved, by purchase key and by image perceptual hash.
+
+    A user's index is built from the stored receipts the first time it is
+    needed, then kept up to date by `record` on every save.
+
+    Attributes:
+        loader: Function returning the saved receipts of a user and the (perceptual hash, purchase key)
+            pairs of their images.
+        max_users: Maximum number of users kept in memory, least recently used are dropped.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]],
+        max_users: int = 1000,
+    ):
+        self.loader = loader
+        self.max_users = max_users
+        self.duplicate_images = 0
+        self.duplicate_saves = 0
+        self._users: OrderedDict[str, _UserFingerprints] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id: str) -> _UserFingerprints:
+        with self._lock:
+            fingerprints = self._users.get(user_id)
+            if fingerprints is not None:
+                self._users.move_to_end(user_id)
+                return fingerprints
+
+        receipts, image_hashes = self.loader(user_id)
+        fingerprints = _UserFingerprints()
+        for receipt in receipts:
+            key = purchase_key(receipt)
+            if key is not None:
+                fingerprints.receipts[key] = receipt
+        fingerprints.image_hashes = [(image_hash, key) for image_hash, key in image_hashes if key in fingerprints.receipts]
+
+        with self._lock:
+            # Another thread may have built it meanwhile, keep the first one
+            fingerprints = self._users.setdefault(user_id, fingerprints)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return fingerprints
+
+    def find_image(self, user_id: str, image_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the saved receipt the same image was extracted into, None if there is none.
+
+        Only an exact or near-exact hash (at most MAX_HASH_DISTANCE bits apart) matches.
+        """
+        fingerprints = self._get(user_id)
+        with self._lock:
+            best_key, best_distance = None, MAX_HASH_DISTANCE + 1
+            for known_hash, key in fingerprints.image_hashes:
+                distance = hash_distance(known_hash, image_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                return None
+            self.duplicate_images += 1
+            return fingerprints.receipts[best_key]
+
+    def contains(self, user_id: str, key: str) -> bool:
+        """Tell whether a receipt with this purchase key was already saved."""
+        fingerprints = self._get(user_id)
+        with self._lock:
+            if key in fingerprints.receipts:
+                self.duplicate_saves += 1
+                return True
+        return False
+
+    def record(self, user_id: str, key: str, receipt: Dict[str, Any], image_hashes: List[str]) -> None:
+        """Record a saved receipt and the perceptual hashes of the images it was extracted from."""
+        with self._lock:
+            fingerprints = self._users.get(user_id)
+            if fingerprints is None:
+                # Picked up from the stored receipts on first use
+                return
+            fingerprints.receipts[key] = receipt
+            fingerprints.image_hashes.extend((image_hash, key) for image_hash in image_hashes)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the index of a user, it is rebuilt from the stored receipts on next use."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the index counters, for logging and monitoring."""
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "duplicate_images": self.duplicate_images,
+                "duplicate_saves": self.duplicate_saves,
+            }
+
+
+class DuplicateReceiptFilter:
+    """Before-model callback skipping the extraction of receipts that were already saved.
+
+    On the first model call of a turn with attachments, the perceptual hash of
+    every image is computed and kept in the turn state for save_attachment_data.
+    When every image is a re-upload of an already saved receipt's image, the
+    saved receipts are returned right away, marked as duplicates, instead of
+    calling the model. Other photos of a saved receipt are extracted as usual
+    and save_attachment_data recognizes them by their purchase key.
+
+    Attributes:
+        index: The receipts already saved.
+        wallet_token: Function returning the wallet pass token of a receipt.
+    """
+
+    def __init__(self, index: ReceiptFingerprintIndex, wallet_token: Callable[[Dict[str, Any]], str]):
+        self.index = index
+        self.wallet_token = wallet_token
+
+    def __call__(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        if not llm_request.contents:
+            return None
+        content = llm_request.contents[-1]
+        if content.role != "user" or not content.parts or content.parts[0].function_response is not None:
+            return None
+        images = [
+            part.inline_data.data
+            for part in content.parts
+            if part.inline_data is not None and (part.inline_data.mime_type or "").startswith("image/")
+        ]
+        if not images:
+            return None
+
+        image_hashes = [perceptual_hash(image) for image in images]
+        callback_context.state[FINGERPRINTS_STATE_KEY] = [image_hash for image_hash in image_hashes if image_hash]
+        if not all(image_hashes):
+            return None
+
+        user_id = callback_context._invocation_context.user_id
+        duplicates = []
+        for image_hash in image_hashes:
+            receipt = self.index.find_image(user_id, image_hash)
+            if receipt is None:
+                return None
+            duplicates.append(receipt)
+
+        logger.info("Duplicate receipt upload, extraction skipped", images=len(images))
+        responses = [{**receipt, "wallet_token": self.wallet_token(receipt), "duplicate": True} for receipt in duplicates]
+        text = json.dumps(responses[0] if len(responses) == 1 else responses, indent=2)
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
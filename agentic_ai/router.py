@@ -0,0 +1,165 @@
+# agentic_ai/router.py
+
+import re
+import threading
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import logger
+import tracing
+from agentic_ai.model_policy import SCREEN_REQUEST_PATTERN
+from agentic_ai.tools import (
+    generate_wallet_pass_url_for_shopping_list,
+    get_dashboard_data,
+    get_insights_data,
+)
+
+# Header of the wallet passes created for "ADD TO SHOPPING LIST:" requests
+SHOPPING_LIST_CATEGORY = "Shopping"
+
+
+def _route_shopping_list(callback_context: CallbackContext, match: re.Match) -> Optional[str]:
+    item_names = [name.strip() for name in re.split(r"[,;\n]", match.group(1)) if name.strip()]
+    if not item_names:
+        return None
+    return generate_wallet_pass_url_for_shopping_list(SHOPPING_LIST_CATEGORY, item_names, callback_context)
+
+
+def _route_dashboard(callback_context: CallbackContext, match: re.Match) -> Optional[str]:
+    return get_dashboard_data(callback_context)
+
+
+def _route_insights(callback_context: CallbackContext, match: re.Match) -> Optional[str]:
+    return get_insights_data(callback_context)
+
+
+class Route:
+    """A fixed-format intent answered without calling the model.
+
+    Attributes:
+        name: Name of the intent, used in logs and statistics.
+        pattern: Regular expression the whole user message must match.
+        handler: Function called with the callback context and the match, returns the
+            response text or None to let the model answer.
+    """
+
+    def __init__(self, name: str, pattern: str, handler: Callable[[CallbackContext, re.Match], Optional[str]]):
+        self.name = name
+        self.pattern = re.compile(pattern, re.IGNORECASE | re.DOTALL)
+        self.handler = handler
+
+
+DEFAULT_ROUTES = [
+    Route("shopping_list", r"^\s*ADD TO SHOPPING LIST:(.*)$", _route_shopping_list),
+    Route("dashboard", SCREEN_REQUEST_PATTERN.format(screen="dashboard"), _route_dashboard),
+    Route("insights", SCREEN_REQUEST_PATTERN.format(screen="insights?"), _route_insights),
+]
+
+
+def _user_message_text(llm_request: LlmRequest) -> Optional[str]:
+    """Return the text of the new user message, None when the request is not the first model call of a text-only turn."""
+    if not llm_request.contents:
+        return None
+    content = llm_request.contents[-1]
+    if content.role != "user" or not content.parts:
+        return None
+    texts = []
+    for part in content.parts:
+        if part.function_response is not None or part.inline_data is not None or part.file_data is not None:
+            return None
+        if part.text:
+            texts.append(part.text)
+    return "".join(texts)
+
+
+class IntentRouter:
+    """Before-model callback answering fixed-format requests by running their tool directly.
+
+    Requests that match no route, or whose handler gives up, go to the model
+    as before. A failing handler is logged and falls back to the model too.
+    """
+
+    def __init__(self, routes: List[Route]):
+        self.routes = routes
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {route.name: 0 for route in routes}
+        self._counters["model"] = 0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def __call__(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        text = _user_message_text(llm_request)
+        if text is None:
+            return None
+
+        for route in self.routes:
+            match = route.pattern.match(text)
+            if match is None:
+                continue
+            with tracing.span(f"router.{route.name}") as span:
+                try:
+                    response_text = route.handler(callback_context, match)
+                except Exception as e:
+                    logger.error(f"Route {route.name} failed, falling back to the model: {e}")
+                    break
+                if response_text is None:
+                    break
+                span.set(response_bytes=len(response_text))
+            self._count(route.name)
+            logger.info("Request routed", intent=route.name, invocation_id=callback_context.invocation_id)
+            return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=response_text)]))
+
+        self._count("model")
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        """Return the number of requests per route and the share answered without the model."""
+        with self._lock:
+            counters = dict(self._counters)
+        total = sum(counters.values())
+        counters["hit_ratio"] = (total - counters["model"]) / total if total else 0.0
+        return counters
+
+
+INTENT_ROUTER = IntentRouter(DEFAULT_ROUTES)
+
+
+class IntentRouterAgent(BaseAgent):
+    """Root agent delegating every turn to the sub-agent of its intent, without a model call.
+
+    Each sub-agent only carries the prompt section and tools of its intent,
+    which keeps the system instruction of every model call small.
+
+    Attributes:
+        classifier: Object with a `classify(text, has_attachments) -> str` method.
+        intent_agents: Name of the sub-agent per intent.
+        default_agent: Name of the sub-agent of the intents missing from `intent_agents`.
+    """
+
+    classifier: Any
+    intent_agents: Dict[str, str]
+    default_agent: str
+
+    def route(self, content: Optional[types.Content]) -> BaseAgent:
+        """Return the sub-agent answering a user message."""
+        parts = (content.parts or []) if content else []
+        text = "".join(part.text for part in parts if part.text)
+        has_attachments = any(part.inline_data is not None or part.file_data is not None for part in parts)
+        intent = self.classifier.classify(text, has_attachments)
+        agent = self.find_sub_agent(self.intent_agents.get(intent, self.default_agent))
+        logger.info("Turn routed", intent=intent, agent=agent.name)
+        return agent
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        agent = self.route(ctx.user_content)
+        async for event in agent.run_async(ctx):
+            yield event
@@ -0,0 +1,140 @@
+# agentic_ai/screen_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+DASHBOARD = "dashboard"
+INSIGHTS = "insights"
+
+
+class DataVersions:
+    """Per-user counter of purchase history changes.
+
+    Bumped on every save, so anything derived from a history can be keyed by
+    the version it was computed from. Counters live in this process only,
+    `ScreenResponseCache` bounds the staleness across workers with a TTL.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> int:
+        """Return the current data version of a user."""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> int:
+        """Record a change of the purchase history of a user, return the new version."""
+        with self._lock:
+            version = self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return version
+
+
+class _ScreenEntry:
+    """Cached screen response, valid for one data version and date bucket."""
+
+    __slots__ = ("version", "date_bucket", "response", "expires_at")
+
+    def __init__(self, version: int, date_bucket: str, response: str, expires_at: float):
+        self.version = version
+        self.date_bucket = date_bucket
+        self.response = response
+        self.expires_at = expires_at
+
+
+class ScreenResponseCache:
+    """LRU cache of the JSON responses of the Dashboard and Insights screens.
+
+    A response is served for a (user, screen) only while the data version and
+    the date bucket it was computed for are current: a new receipt or a new
+    day makes it stale. At most one response is kept per user and screen, so
+    stale versions never pile up.
+
+    Attributes:
+        max_entries: Maximum number of cached responses.
+        max_bytes: Maximum total size of the cached responses, in characters.
+        ttl_seconds: Time to live of a response, bounds staleness when another worker saves a receipt.
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that were not in the cache, stale or expired.
+        evictions: Number of responses dropped because the cache was full.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Tuple[str, str], _ScreenEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Drop an entry. Must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.response)
+
+    def get(self, user_id: str, screen: str, version: int, date_bucket: str) -> str | None:
+        """Return the cached response of a screen, or None on a miss.
+
+        Args:
+            user_id: The ID of the user
+            screen: The screen, DASHBOARD or INSIGHTS
+            version: The current data version of the user
+            date_bucket: The current local date, e.g. "2025-07-27"
+
+        Returns:
+            str | None: The JSON response of the screen
+        """
+        key = (user_id, screen)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry.version != version or entry.date_bucket != date_bucket or entry.expires_at <= time.monotonic()
+            ):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.response
+
+    def put(self, user_id: str, screen: str, version: int, date_bucket: str, response: str) -> None:
+        """Store the response of a screen, evicting the least recently used responses when over a bound."""
+        if len(response) > self.max_bytes:
+            return
+        key = (user_id, screen)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _ScreenEntry(version, date_bucket, response, time.monotonic() + self.ttl_seconds)
+            self._bytes += len(response)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.response)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the cached responses of a user."""
+        with self._lock:
+            for screen in (DASHBOARD, INSIGHTS):
+                self._remove((user_id, screen))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache counters, for logging and monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,84 @@
+# agentic_ai/single_flight.py
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """An in-flight computation and its outcome."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same key into one.
+
+    The first caller of a key runs the function, callers arriving while it
+    runs wait for it and receive the same result, or the same exception.
+    Nothing is cached: once the computation ends, the next caller starts a
+    new one.
+
+    Attributes:
+        name: Name used in the statistics.
+        calls: Number of computations actually run.
+        shared: Number of callers that received the result of another caller's computation.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Run `function` for `key`, or wait for the run already in flight for it.
+
+        Args:
+            key: Identifies the computation, e.g. ("history", user_id)
+            function: Computes the result, called without arguments
+
+        Returns:
+            Any: The result of the computation
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the counters, for logging and monitoring."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,479 @@
+# agentic_ai/sqlite_repository.py
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Tuple
+
+import tracing
+from agentic_ai.monthly_rollups import apply_receipt, build_rollups, empty_rollup, rollup_changes
+from agentic_ai.purchase_queries import (
+    DEFAULT_PAGE_SIZE,
+    INDEX_VERSION,
+    MAX_PAGE_SIZE,
+    MIN_PREFIX_LENGTH,
+    PERIOD_FIELDS,
+    RECEIPT_FIELDS,
+    build_index_fields,
+    normalize_key,
+    parse_date_bound,
+)
+from agentic_ai.purchase_time import PERIODS
+from agentic_ai.purchase_repository import PurchaseRepository
+
+# Sort keys of the receipts without a parseable date or amount, after all the others in descending order
+UNKNOWN_TIMESTAMP = -1
+UNKNOWN_AMOUNT = float("-inf")
+
+# Columns of the time buckets, by period, see `purchase_time.period_keys`
+PERIOD_COLUMNS = {"day": "purchase_day", "week": "purchase_week", "month": "purchase_month"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    purchased_at_ts INTEGER NOT NULL,
+    merchant_key TEXT NOT NULL,
+    total_amount REAL NOT NULL,
+    purchase_key TEXT,
+    image_fingerprints TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS receipts_by_date ON receipts (user_id, purchased_at_ts DESC, id DESC);
+CREATE INDEX IF NOT EXISTS receipts_by_amount ON receipts (user_id, total_amount DESC, id DESC);
+CREATE INDEX IF NOT EXISTS receipts_by_merchant ON receipts (user_id, merchant_key, purchased_at_ts DESC);
+
+CREATE TABLE IF NOT EXISTS receipt_items (
+    receipt_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    purchased_at_ts INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    category_key TEXT NOT NULL,
+    quantity REAL,
+    unit_price REAL,
+    total_price REAL,
+    is_subscription INTEGER,
+    tax REAL,
+    PRIMARY KEY (receipt_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_by_category ON receipt_items (user_id, category_key, purchased_at_ts);
+CREATE INDEX IF NOT EXISTS items_by_name ON receipt_items (user_id, name_key);
+"""
+
+# Columns added with INDEX_VERSION 2, by ALTER TABLE so that older databases get them too, see `backfill_index_fields`
+MIGRATIONS = {
+    "index_version": "INTEGER NOT NULL DEFAULT 0",
+    "purchase_day": "TEXT",
+    "purchase_week": "TEXT",
+    "purchase_month": "TEXT",
+}
+PERIOD_INDEXES = """
+CREATE INDEX IF NOT EXISTS receipts_by_day ON receipts (user_id, purchase_day);
+CREATE INDEX IF NOT EXISTS receipts_by_week ON receipts (user_id, purchase_week);
+CREATE INDEX IF NOT EXISTS receipts_by_month ON receipts (user_id, purchase_month);
+"""
+
+ROLLUPS_SCHEMA = """
+CREATE TABLE monthly_rollups (
+    user_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, month)
+) WITHOUT ROWID;
+"""
+
+
+def _number(value: Any) -> float | None:
+    """Convert a receipt amount to a float, None if it is not a number."""
+    try:
+        return float(value) if value is not None and not isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SQLitePurchaseRepository(PurchaseRepository):
+    """Receipts stored in a local SQLite database, for local runs, load tests and benchmarks.
+
+    Receipts are kept as JSON next to the columns they are filtered and sorted
+    on, and their items are normalized into their own table so that item
+    filters and amounts are evaluated in SQL. The monthly rollups are JSON
+    too, updated in the transaction writing the receipts. The database is in
+    WAL mode, every thread has its own connection, and readers never wait for
+    writers.
+
+    Attributes:
+        path: File of the database, ":memory:" gives a private in-memory database, used by one thread at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._memory_lock = threading.Lock()
+        self._memory_connection = None
+        if path == ":memory:":
+            self._memory_connection = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(receipts)")}
+            for column, definition in MIGRATIONS.items():
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE receipts ADD COLUMN {column} {definition}")
+            connection.executescript(PERIOD_INDEXES)
+        with self._transaction() as cursor:
+            if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'monthly_rollups'").fetchone():
+                # Databases created before the rollups get them built from their receipts
+                cursor.execute(ROLLUPS_SCHEMA)
+                user_ids = [row[0] for row in cursor.execute("SELECT DISTINCT user_id FROM receipts")]
+                for user_id in user_ids:
+                    self._rebuild_rollups(cursor, user_id)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yield the connection of the calling thread."""
+        if self._memory_connection is not None:
+            with self._memory_lock:
+                yield self._memory_connection
+            return
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        yield connection
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Yield a cursor in a write transaction, committed on exit, rolled back on error."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection.cursor()
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    @staticmethod
+    def _write(
+        cursor: sqlite3.Cursor, document_id: str, document: Dict[str, Any], replace: bool
+    ) -> Dict[str, Any] | None:
+        """Write a receipt and its items, return the receipt data it replaced, if any."""
+        previous = None
+        image_fingerprints = json.dumps(document["imageFingerprints"]) if document.get("imageFingerprints") else None
+        if replace:
+            row = cursor.execute(
+                "SELECT data, image_fingerprints FROM receipts WHERE id = ?", (document_id,)
+            ).fetchone()
+            if row:
+                previous = json.loads(row[0])
+                # Kept when the new document has none, see `PurchaseRepository.write_batch`
+                image_fingerprints = image_fingerprints or row[1]
+        data = document["data"]
+        index = document if document.get("indexVersion", 0) >= INDEX_VERSION else build_index_fields(data)
+        purchased_at_ts = UNKNOWN_TIMESTAMP if index["purchasedAtTs"] is None else index["purchasedAtTs"]
+        total_amount = _number(data.get("totalAmount"))
+
+        cursor.execute(
+            f"INSERT {'OR REPLACE ' if replace else ''}INTO receipts (id, user_id, purchased_at_ts, merchant_key,"
+            " total_amount, purchase_key, image_fingerprints, data, index_version, purchase_day, purchase_week,"
+            " purchase_month) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                document_id,
+                document["user_id"],
+                purchased_at_ts,
+                normalize_key(data.get("merchantName") or ""),
+                UNKNOWN_AMOUNT if total_amount is None else total_amount,
+                document.get("purchaseKey"),
+                image_fingerprints,
+                json.dumps(data, separators=(",", ":")),
+                INDEX_VERSION,
+                *(index[PERIOD_FIELDS[period]] for period in PERIODS),
+            ),
+        )
+        if replace:
+            cursor.execute("DELETE FROM receipt_items WHERE receipt_id = ?", (document_id,))
+        cursor.executemany(
+            "INSERT INTO receipt_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    document_id,
+                    position,
+                    document["user_id"],
+                    purchased_at_ts,
+                    str(item.get("name") or ""),
+                    normalize_key(str(item.get("name") or "")),
+                    normalize_key(str(item.get("category") or "")),
+                    _number(item.get("quantity")),
+                    _number(item.get("unitPrice")),
+                    _number(item.get("totalPrice")),
+                    None if item.get("isSubscription") is None else int(bool(item.get("isSubscription"))),
+                    _number(item.get("tax")),
+                )
+                for position, item in enumerate(data.get("items") or [])
+            ],
+        )
+        return previous
+
+    @staticmethod
+    def _update_rollups(cursor: sqlite3.Cursor, writes: List[Tuple[str, Dict | None, Dict | None]]) -> None:
+        """Apply receipt writes to the monthly rollups, see `monthly_rollups.rollup_changes`."""
+        for (user_id, month), receipts in rollup_changes(writes).items():
+            row = cursor.execute(
+                "SELECT data FROM monthly_rollups WHERE user_id = ? AND month = ?", (user_id, month)
+            ).fetchone()
+            rollup = json.loads(row[0]) if row else empty_rollup(user_id, month)
+            for receipt, sign in receipts:
+                apply_receipt(rollup, receipt, sign)
+            if rollup["receipts"] > 0:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO monthly_rollups VALUES (?, ?, ?)",
+                    (user_id, month, json.dumps(rollup, separators=(",", ":"))),
+                )
+            else:
+                cursor.execute("DELETE FROM monthly_rollups WHERE user_id = ? AND month = ?", (user_id, month))
+
+    @staticmethod
+    def _rebuild_rollups(cursor: sqlite3.Cursor, user_id: str) -> int:
+        """Replace the monthly rollups of a user with the ones built from their receipts."""
+        rows = cursor.execute("SELECT data FROM receipts WHERE user_id = ?", (user_id,)).fetchall()
+        receipts = [json.loads(data) for data, in rows]
+        rollups = build_rollups(user_id, receipts)
+        cursor.execute("DELETE FROM monthly_rollups WHERE user_id = ?", (user_id,))
+        cursor.executemany(
+            "INSERT INTO monthly_rollups VALUES (?, ?, ?)",
+            [(user_id, month, json.dumps(rollup, separators=(",", ":"))) for month, rollup in rollups.items()],
+        )
+        return len(rollups)
+
+    def create(self, document_id: str, document: Dict[str, Any]) -> bool:
+        with tracing.span("sqlite.create"):
+            try:
+                with self._transaction() as cursor:
+                    self._write(cursor, document_id, document, replace=False)
+                    self._update_rollups(cursor, [(document["user_id"], None, document["data"])])
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def write_batch(self, documents: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with tracing.span("sqlite.commit", documents=len(documents)), self._transaction() as cursor:
+            writes = []
+            for document_id, document in documents:
+                previous = self._write(cursor, document_id, document, replace=True)
+                writes.append((document["user_id"], previous, document["data"]))
+            self._update_rollups(cursor, writes)
+
+    def load_rollups(
+        self, user_id: str, start_month: str | None = None, end_month: str | None = None
+    ) -> Dict[str, Dict[str, Any]]:
+        with tracing.span("sqlite.load_rollups") as span, self._connect() as connection:
+            rows = connection.execute(
+                "SELECT month, data FROM monthly_rollups WHERE user_id = ? AND month BETWEEN ? AND ?",
+                (user_id, start_month or "", end_month or "9999-12"),
+            ).fetchall()
+            span.set(documents=len(rows))
+        return {month: json.loads(data) for month, data in rows}
+
+    def rebuild_rollups(self, user_id: str) -> int:
+        with tracing.span("sqlite.rebuild_rollups") as span, self._transaction() as cursor:
+            months = self._rebuild_rollups(cursor, user_id)
+            span.set(months=months)
+        return months
+
+    def user_ids(self) -> List[str]:
+        with self._connect() as connection:
+            return [row[0] for row in connection.execute("SELECT DISTINCT user_id FROM receipts ORDER BY user_id")]
+
+    def load_history(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        with tracing.span("sqlite.query") as span, self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, data FROM receipts WHERE user_id = ? ORDER BY rowid", (user_id,)
+            ).fetchall()
+            span.set(documents=len(rows))
+        return {document_id: json.loads(data) for document_id, data in rows}
+
+    def load_fingerprints(self, user_id: str) -> List[Tuple[str, str]]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT purchase_key, image_fingerprints FROM receipts"
+                " WHERE user_id = ? AND image_fingerprints IS NOT NULL",
+                (user_id,),
+            ).fetchall()
+        return [(image_hash, key) for key, hashes in rows for image_hash in json.loads(hashes)]
+
+    def query(
+        self,
+        user_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        merchant: str | None = None,
+        item_prefix: str | None = None,
+        order_by_amount: bool = False,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: str | None = None,
+        fields: List[str] | None = None,
+    ) -> Dict[str, Any]:
+        category = normalize_key(category) if category else None
+        merchant = normalize_key(merchant) if merchant else None
+        item_prefix = normalize_key(item_prefix) if item_prefix else None
+        if item_prefix and len(item_prefix) < MIN_PREFIX_LENGTH:
+            raise ValueError(f"item_prefix must have at least {MIN_PREFIX_LENGTH} characters")
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        fields = [field for field in (fields or RECEIPT_FIELDS) if field in RECEIPT_FIELDS]
+        filter_items = bool(category or item_prefix)
+
+        conditions, parameters = ["r.user_id = ?"], [user_id]
+        start_ts = parse_date_bound(start_date, end_of_day=False)
+        end_ts = parse_date_bound(end_date, end_of_day=True)
+        if start_ts is not None:
+            conditions.append("r.purchased_at_ts >= ?")
+            parameters.append(start_ts)
+        if end_ts is not None:
+            conditions.append("r.purchased_at_ts BETWEEN 0 AND ?")
+            parameters.append(end_ts)
+        if merchant:
+            conditions.append("r.merchant_key = ?")
+            parameters.append(merchant)
+
+        # Conditions on the items, both the category and the name prefix apply to the same item
+        item_conditions, item_parameters = [], []
+        if category:
+            item_conditions.append("i.category_key = ?")
+            item_parameters.append(category)
+        if item_prefix:
+            pattern = _escape_like(item_prefix)
+            item_conditions.append("(i.name_key LIKE ? ESCAPE '\\' OR i.name_key LIKE ? ESCAPE '\\')")
+            item_parameters += [f"{pattern}%", f"% {pattern}%"]
+        if filter_items:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM receipt_items i WHERE i.receipt_id = r.id AND "
+                + " AND ".join(item_conditions)
+                + ")"
+            )
+            parameters += item_parameters
+
+        sort_column = "r.total_amount" if order_by_amount else "r.purchased_at_ts"
+        with self._connect() as connection:
+            if page_token:
+                cursor = connection.execute(
+                    f"SELECT {sort_column} FROM receipts r WHERE r.id = ? AND r.user_id = ?", (page_token, user_id)
+                ).fetchone()
+                if cursor is None:
+                    raise ValueError("Invalid page_token")
+                conditions.append(f"({sort_column} < ? OR ({sort_column} = ? AND r.id < ?))")
+                parameters += [cursor[0], cursor[0], page_token]
+
+            with tracing.span("sqlite.query_purchases") as span:
+                # Fetch one more receipt than needed to know whether there is a next page
+                rows = connection.execute(
+                    f"SELECT r.id, r.data FROM receipts r WHERE {' AND '.join(conditions)}"
+                    f" ORDER BY {sort_column} DESC, r.id DESC LIMIT ?",
+                    parameters + [page_size + 1],
+                ).fetchall()
+                next_page_token = rows[page_size - 1][0] if len(rows) > page_size else None
+                rows = rows[:page_size]
+
+                matched: Dict[str, Tuple[set, float]] = {}
+                if filter_items and rows:
+                    # The matching items and their total, aggregated by SQLite
+                    placeholders = ", ".join("?" * len(rows))
+                    for receipt_id, positions, amount in connection.execute(
+                        "SELECT i.receipt_id, GROUP_CONCAT(i.position), ROUND(TOTAL(i.total_price), 2)"
+                        f" FROM receipt_items i WHERE i.receipt_id IN ({placeholders}) AND "
+                        + " AND ".join(item_conditions)
+                        + " GROUP BY i.receipt_id",
+                        [row[0] for row in rows] + item_parameters,
+                    ):
+                        matched[receipt_id] = ({int(position) for position in positions.split(",")}, amount)
+                span.set(documents=len(rows))
+
+        purchases = []
+        for receipt_id, data in rows:
+            data = json.loads(data)
+            purchase = {field: data[field] for field in fields if field in data}
+            if filter_items:
+                positions, amount = matched.get(receipt_id, (set(), 0.0))
+                purchase["items"] = [item for position, item in enumerate(data.get("items") or []) if position in positions]
+                purchase["matchedAmount"] = amount
+            purchases.append(purchase)
+
+        return {"purchases": purchases, "next_page_token": next_page_token}
+
+    def spending_by_period(
+        self,
+        user_id: str,
+        period: str = "month",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        column = PERIOD_COLUMNS[period]
+        category = normalize_key(category) if category else None
+
+        conditions, parameters = ["r.user_id = ?", f"r.{column} IS NOT NULL"], [user_id]
+        start_ts = parse_date_bound(start_date, end_of_day=False)
+        end_ts = parse_date_bound(end_date, end_of_day=True)
+        if start_ts is not None:
+            conditions.append("r.purchased_at_ts >= ?")
+            parameters.append(start_ts)
+        if end_ts is not None:
+            conditions.append("r.purchased_at_ts <= ?")
+            parameters.append(end_ts)
+
+        if category:
+            # The amount of the items of the category, summed from the items table
+            sql = (
+                f"SELECT r.{column}, ROUND(TOTAL(i.total_price), 2), COUNT(DISTINCT r.id)"
+                " FROM receipt_items i JOIN receipts r ON r.id = i.receipt_id"
+                f" WHERE i.user_id = ? AND i.category_key = ? AND {' AND '.join(conditions)}"
+            )
+            parameters = [user_id, category] + parameters
+        else:
+            sql = (
+                f"SELECT r.{column}, ROUND(TOTAL(IIF(r.total_amount = ?, 0, r.total_amount)), 2), COUNT(*)"
+                f" FROM receipts r WHERE {' AND '.join(conditions)}"
+            )
+            parameters = [UNKNOWN_AMOUNT] + parameters
+
+        with tracing.span("sqlite.spending_by_period") as span, self._connect() as connection:
+            rows = connection.execute(f"{sql} GROUP BY 1 ORDER BY 1", parameters).fetchall()
+            span.set(periods=len(rows))
+        return [{"period": key, "amount": amount, "receipts": receipts} for key, amount, receipts in rows]
+
+    def backfill_index_fields(self, batch_size: int = 500) -> int:
+        updated = 0
+        while True:
+            # The receipt data is unchanged, so are the rollups
+            with self._transaction() as cursor:
+                rows = cursor.execute(
+                    "SELECT id, user_id, purchase_key, image_fingerprints, data FROM receipts"
+                    " WHERE index_version < ? LIMIT ?",
+                    (INDEX_VERSION, batch_size),
+                ).fetchall()
+                for document_id, user_id, key, image_fingerprints, data in rows:
+                    document = {"user_id": user_id, "data": json.loads(data), "purchaseKey": key}
+                    if image_fingerprints:
+                        document["imageFingerprints"] = json.loads(image_fingerprints)
+                    self._write(cursor, document_id, document, replace=True)
+            if not rows:
+                return updated
+            updated += len(rows)
+
+    def is_transient_error(self, error: Exception) -> bool:
+        # "database is locked" when another process holds the write lock for too long
+        return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
@@ -1,23 +1,227 @@
 # expense_manager_agent/tools.py
 
-import datetime
-from typing import Dict, List, Any
-from google.cloud import firestore
-from google.cloud.firestore_v1.vector import Vector
-from google.cloud.firestore_v1 import FieldFilter
-from google.cloud.firestore_v1.base_query import And
-from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+import atexit
+import uuid
+from typing import Callable, Dict, List, Any
 from settings import get_settings
-from google import genai
+import logger
+import tracing
 from google.adk.tools import ToolContext
-import time
 import json
 
+from agentic_ai.analytics import build_dashboard
+from agentic_ai.compact_format import encode_purchases
+from agentic_ai.insights import InsightsEngine
+from agentic_ai.monthly_rollups import month_range, spending_from_rollups, summarize_rollups
+from agentic_ai.purchase_cache import PurchaseHistoryCache
+from agentic_ai.purchase_queries import build_index_fields
+from agentic_ai.purchase_repository import create_repository
+from agentic_ai.purchase_time import current_time
+from agentic_ai.receipt_dedup import (
+    FINGERPRINTS_STATE_KEY,
+    DuplicateReceiptFilter,
+    ReceiptFingerprintIndex,
+    purchase_document_id,
+    purchase_key,
+)
+from agentic_ai.screen_cache import DASHBOARD, INSIGHTS, DataVersions, ScreenResponseCache
+from agentic_ai.single_flight import SingleFlight
 from agentic_ai.wallet_pass_service.wallet_pass_service import get_generic_pass_token
+from agentic_ai.write_journal import JournalEntry, WriteBehindJournal
 
 SETTINGS = get_settings()
-DB_CLIENT = firestore.Client(project=SETTINGS.GCLOUD_PROJECT_ID)  # Will use "(default)" database
-COLLECTION = DB_CLIENT.collection(SETTINGS.DB_COLLECTION_NAME)
+PURCHASE_CACHE = PurchaseHistoryCache(
+    max_users=SETTINGS.PURCHASE_CACHE_MAX_USERS, ttl_seconds=SETTINGS.PURCHASE_CACHE_TTL_SECONDS
+)
+
+# Firestore, or SQLite for local runs and benchmarks, see PURCHASE_REPOSITORY in settings
+PURCHASE_REPOSITORY = create_repository(SETTINGS)
+
+
+def _query_user_purchases(user_id: str) -> List[Dict[str, Any]]:
+    """Query all the purchases stored for a user from the repository.
+
+    Args:
+        user_id: The ID of the user
+
+    Returns:
+        List[Dict[str, Any]]: The receipts data of the user
+    """
+    documents = PURCHASE_REPOSITORY.load_history(user_id)
+    purchases = list(documents.values())
+
+    # Receipts saved in write-behind mode may not be in the repository yet
+    if WRITE_JOURNAL is not None:
+        purchases += [
+            document["data"]
+            for id, document in WRITE_JOURNAL.recent_writes(user_id).items()
+            if id not in documents
+        ]
+    return purchases
+
+
+def _write_journaled(entries: List[JournalEntry]) -> None:
+    """Write a batch of journaled receipts to the repository, see WRITE_JOURNAL."""
+    PURCHASE_REPOSITORY.write_batch([(entry.id, entry.document) for entry in entries])
+
+
+def _read_own_writes(user_id: str) -> None:
+    """Flush the receipts journaled for a user before querying the repository, see WRITE_JOURNAL."""
+    if WRITE_JOURNAL is not None and not WRITE_JOURNAL.wait_flushed(
+        user_id, timeout=SETTINGS.WRITE_BEHIND_READ_TIMEOUT_SECONDS
+    ):
+        logger.warning("Journaled receipts not flushed in time, the query may miss them", user_id=user_id)
+
+
+# In write-behind mode receipts are acknowledged once journaled locally and stored in the background
+WRITE_JOURNAL = None
+if SETTINGS.WRITE_BEHIND_ENABLED:
+    WRITE_JOURNAL = WriteBehindJournal(
+        directory=SETTINGS.WRITE_BEHIND_JOURNAL_DIR,
+        flush=_write_journaled,
+        batch_size=SETTINGS.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval=SETTINGS.WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+    )
+    WRITE_JOURNAL.start()
+    atexit.register(WRITE_JOURNAL.stop)
+
+
+# Concurrent requests of a user share one history query and one computation per screen
+HISTORY_FLIGHTS = SingleFlight("purchase_history")
+SCREEN_FLIGHTS = SingleFlight("screens")
+
+
+def _fetch_user_purchases(user_id: str) -> List[Dict[str, Any]]:
+    """Query all the purchases of a user and cache them, concurrent callers share a single query.
+
+    Only callers seeing the same data version share a query, a request
+    arriving after a save never gets the history of a query started before it.
+
+    Args:
+        user_id: The ID of the user
+
+    Returns:
+        List[Dict[str, Any]]: The receipts data of the user, must not be modified
+    """
+
+    def fetch() -> List[Dict[str, Any]]:
+        # Taken before the query, a receipt saved meanwhile keeps this history out of the cache
+        token = PURCHASE_CACHE.fetch_token()
+        purchases = _query_user_purchases(user_id)
+        PURCHASE_CACHE.put(user_id, purchases, token=token)
+        return purchases
+
+    return HISTORY_FLIGHTS.do((user_id, DATA_VERSIONS.get(user_id)), fetch)
+
+
+def _load_user_purchases(user_id: str) -> List[Dict[str, Any]]:
+    """Load all the purchases stored for a user, from the cache when possible.
+
+    Args:
+        user_id: The ID of the user
+
+    Returns:
+        List[Dict[str, Any]]: The receipts data of the user, must not be modified
+    """
+    purchases = PURCHASE_CACHE.get(user_id)
+    if purchases is None:
+        purchases = _fetch_user_purchases(user_id)
+    return purchases
+
+
+# Encodings supported by get_all_purchases_for_a_user
+SERIALIZERS = {"json": json.dumps, "compact": encode_purchases}
+
+# Insights aggregates are built per user, kept up to date on every save and rebuilt after the purchase cache TTL
+INSIGHTS_ENGINE = InsightsEngine(loader=_load_user_purchases, ttl_seconds=SETTINGS.PURCHASE_CACHE_TTL_SECONDS)
+
+# Screen responses only change when a receipt is saved or the day changes
+DATA_VERSIONS = DataVersions()
+SCREEN_CACHE = ScreenResponseCache(
+    max_entries=SETTINGS.SCREEN_CACHE_MAX_ENTRIES,
+    max_bytes=SETTINGS.SCREEN_CACHE_MAX_BYTES,
+    ttl_seconds=SETTINGS.SCREEN_CACHE_TTL_SECONDS,
+)
+
+
+def _get_screen_response(user_id: str, screen: str, build: Callable[[], Dict[str, Any]]) -> tuple[str, bool]:
+    """Return the JSON response of a screen, from the cache when the user's data did not change today.
+
+    Args:
+        user_id: The ID of the user
+        screen: The screen, DASHBOARD or INSIGHTS
+        build: Function computing the screen data on a miss
+
+    Returns:
+        tuple[str, bool]: The JSON response and whether it came from the cache
+    """
+    # Read the version first, a save racing with `build` then leaves a stale entry that is never served
+    version = DATA_VERSIONS.get(user_id)
+    date_bucket = current_time().date().isoformat()
+    serialized = SCREEN_CACHE.get(user_id, screen, version, date_bucket)
+    if serialized is not None:
+        return serialized, True
+
+    def compute() -> str:
+        serialized = json.dumps(build())
+        SCREEN_CACHE.put(user_id, screen, version, date_bucket, serialized)
+        return serialized
+
+    # Requests arriving while the screen is computed wait for it instead of computing it again
+    return SCREEN_FLIGHTS.do((user_id, screen, version, date_bucket), compute), False
+
+
+def _receipt_wallet_token(json_data: Dict[str, Any]) -> str:
+    """Return the Google wallet pass token of a receipt."""
+    title, header, text_modules = "Merchant", "", []
+    if json_data.get("merchantName"):
+        title = json_data["merchantName"]
+
+    if json_data.get("totalAmount"):
+        header = str(json_data["totalAmount"])
+
+    for item in json_data.get("items") or []:
+        text_modules.append(
+            {"header": item.get("name"), "body": str(item.get("totalPrice")), "id": "text_module_id"}
+        )
+
+    return get_generic_pass_token(title, header, text_modules)
+
+
+def _store_receipt(user_id: str, json_data: Dict[str, Any], key: str | None, image_hashes: List[str]) -> bool:
+    """Write a receipt to the repository, return False if it was already stored.
+
+    Receipts with a purchase key are written to a document derived from it,
+    so that saving the same receipt twice, even from two workers, stores it once.
+    In write-behind mode the receipt is only journaled, and the check against
+    the repository is left to the in-memory index.
+    """
+    document = {"user_id": user_id, "data": json_data, **build_index_fields(json_data)}
+    if key is not None:
+        document.update(purchaseKey=key, imageFingerprints=image_hashes)
+
+    # Receipts without a purchase key cannot be recognized, they get a new ID
+    document_id = purchase_document_id(user_id, key) if key is not None else uuid.uuid4().hex
+    if WRITE_JOURNAL is not None:
+        with tracing.span("journal.append"):
+            WRITE_JOURNAL.append(user_id, document_id, document)
+        return True
+    return PURCHASE_REPOSITORY.create(document_id, document)
+
+
+# Receipts already saved, to skip the extraction of duplicate uploads and make saves idempotent
+RECEIPT_INDEX = ReceiptFingerprintIndex(
+    loader=lambda user_id: (_load_user_purchases(user_id), PURCHASE_REPOSITORY.load_fingerprints(user_id))
+)
+DUPLICATE_RECEIPT_FILTER = DuplicateReceiptFilter(RECEIPT_INDEX, wallet_token=_receipt_wallet_token)
+
+
+def invalidate_user_data(user_id: str) -> None:
+    """Drop everything cached from a user's purchase history, after it was changed outside the tools."""
+    PURCHASE_CACHE.invalidate(user_id)
+    INSIGHTS_ENGINE.invalidate(user_id)
+    RECEIPT_INDEX.invalidate(user_id)
+    DATA_VERSIONS.bump(user_id)
 
 
 def save_attachment_data(
@@ -53,44 +257,47 @@ def save_attachment_data(
         tool_context (ToolContext): The tool context containing user and session information.
     Returns:
         dict: {'wallet_token': str} // Google wallet token, needs to be sent to user.
+            Contains 'duplicate': True when the receipt was already saved, it is not stored again.
 
     Raises:
         Exception: If the operation failed or input is invalid.
     """
-    start_time = time.time()
-    try:
-        # Validate JSON structure
-        if not isinstance(json_data, dict):
-            raise ValueError("json_data must be a dictionary")
+    with tracing.span("tool.save_attachment_data") as span:
+        try:
+            # Validate JSON structure
+            if not isinstance(json_data, dict):
+                raise ValueError("json_data must be a dictionary")
 
-        user_id = tool_context._invocation_context.user_id
-        COLLECTION.add({"user_id": user_id, "data": json_data})
+            user_id = tool_context._invocation_context.user_id
+            span.set(items=len(json_data.get("items") or []))
 
-        title, header, text_modules = "Merchant", "", []
-        if json_data.get("merchantName"):
-            title = json_data["merchantName"]
+            # Saves are idempotent, a receipt already stored only gets its wallet token back
+            key = purchase_key(json_data)
+            if key is not None and RECEIPT_INDEX.contains(user_id, key):
+                span.set(duplicate=True)
+                return {"wallet_token": _receipt_wallet_token(json_data), "duplicate": True}
 
-        if json_data.get("totalAmount"):
-            header = str(json_data["totalAmount"])
+            # Images are only linked to the receipt when the turn has a single one
+            image_hashes = tool_context.state.get(FINGERPRINTS_STATE_KEY) or []
+            image_hashes = image_hashes if len(image_hashes) == 1 else []
+            if not _store_receipt(user_id, json_data, key, image_hashes):
+                span.set(duplicate=True)
+                return {"wallet_token": _receipt_wallet_token(json_data), "duplicate": True}
 
-        for item in json_data.get("items") or []:
-            text_modules.append(
-                {"header": item.get("name"), "body": str(item.get("totalPrice")), "id": "text_module_id"}
-            )
-
-        generic_pass_token = get_generic_pass_token(title, header, text_modules)
+            PURCHASE_CACHE.append(user_id, json_data)
+            INSIGHTS_ENGINE.record_receipt(user_id, json_data)
+            if key is not None:
+                RECEIPT_INDEX.record(user_id, key, json_data, image_hashes)
+            DATA_VERSIONS.bump(user_id)
 
-        end_time = time.time()
-        print(f"TIME TAKEN TO SAVE DOCUMENT: {end_time - start_time} seconds")
-        return {"wallet_token": generic_pass_token}
-    except Exception as e:
-        end_time = time.time()
-        print(f"TIME TAKEN TO SAVE DOCUMENT (---ERROR---): {end_time - start_time} seconds")
-        raise Exception(f"Failed to store document: {str(e)}")
+            return {"wallet_token": _receipt_wallet_token(json_data)}
+        except Exception as e:
+            raise Exception(f"Failed to store document: {str(e)}")
 
 
 def get_all_purchases_for_a_user(
     tool_context: ToolContext,
+    output_format: str = "json",
 ) -> str:
     """
     This function returns all the purchases and its details for a user.
@@ -98,6 +305,12 @@ def get_all_purchases_for_a_user(
 
     Args:
         tool_context (ToolContext): The tool context containing user and session information.
+        output_format (str): "json" (default) for the structure below, or "compact" for a much smaller tabular
+            encoding of the same data: "receipts" and "items" are lists of rows whose values follow
+            "receiptColumns" and "itemColumns", "merchant" and "category" values are indexes into the
+            "merchants" and "categories" lists, an item's "receipt" value is the index of its receipt row,
+            missing trailing values take the value in "receiptDefaults" / "itemDefaults" and a missing
+            unitPrice equals totalPrice / quantity.
 
     Returns:
         JSON string with following structure (List[Dict[str, Any]]): A list of dictionaries containing document information, where each dictionary has the following structure:
@@ -124,37 +337,313 @@ def get_all_purchases_for_a_user(
     Raises:
         Exception: If the search failed or input is invalid.
     """
-    start_time = time.time()
-    try:
-        # Start with the base collection reference
-        query = COLLECTION
-        user_id = tool_context._invocation_context.user_id
-
-        # Build the composite query by properly chaining conditions
-        # Notes that this demo assume 1 user only,
-        # need to refactor the query for multiple user
-        filters = [
-            FieldFilter("user_id", "==", user_id),
-        ]
+    with tracing.span("tool.get_all_purchases_for_a_user") as span:
+        try:
+            if output_format not in SERIALIZERS:
+                raise ValueError(f"output_format must be one of {', '.join(SERIALIZERS)}")
+            serializer = SERIALIZERS[output_format]
+
+            user_id = tool_context._invocation_context.user_id
+            serialized, final_results = PURCHASE_CACHE.get_serialized(user_id, output_format, serializer), None
+            if serialized is None:
+                final_results = _fetch_user_purchases(user_id)
+                # stringify the final_results, cached so that other callers reuse it
+                serialized = serializer(final_results)
+                PURCHASE_CACHE.add_serialized(user_id, final_results, output_format, serialized)
+            span.set(output_format=output_format, cache_hit=final_results is None, response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error filtering receipts: {str(e)}")
+
 
-        # Apply the filters
-        composite_filter = And(filters=filters)
-        query = query.where(filter=composite_filter)
+def search_purchases(
+    tool_context: ToolContext,
+    start_date: str = "",
+    end_date: str = "",
+    category: str = "",
+    merchant: str = "",
+    item_name_prefix: str = "",
+    page_token: str = "",
+) -> str:
+    """
+    This function searches the purchases of a user, newest first, and returns one page of results.
+    Prefer it over `get_all_purchases_for_a_user` whenever the question is about a time period, a category,
+    a merchant or specific items. All filters are optional and combined with AND.
+    When category or item_name_prefix is given, only the matching items of each purchase are returned,
+    together with their sum in "matchedAmount".
 
-        # Execute the query and collect results
-        final_results = []
-        for doc in query.stream():
-            data = doc.to_dict()
-            final_results.append(data["data"])
-        end_time = time.time()
-        print(f"TIME TAKEN TO GET ALL PURCHASES FOR A USER: {end_time - start_time} seconds")
+    Args:
+        tool_context (ToolContext): The tool context containing user and session information.
+        start_date (str): Earliest purchase date, YYYY-MM-DD
+        end_date (str): Latest purchase date (inclusive), YYYY-MM-DD
+        category (str): Item category, e.g. "Snacks"
+        merchant (str): Merchant name, e.g. "Reliance Smart"
+        item_name_prefix (str): Beginning of an item name or of one of its words, at least 3 characters, e.g. "milk"
+        page_token (str): "next_page_token" of the previous call, to get the next page
 
-        # stringify the final_results
-        return json.dumps(final_results)
-    except Exception as e:
-        end_time = time.time()
-        print(f"TIME TAKEN TO GET ALL PURCHASES FOR A USER (---ERROR---): {end_time - start_time} seconds")
-        raise Exception(f"Error filtering receipts: {str(e)}")
+    Returns:
+        JSON string with following structure (Dict[str, Any]):
+            {
+            "purchases": [ ... ], // same structure as the purchases of `get_all_purchases_for_a_user`
+            "next_page_token": "String" // null when there are no more results
+        }
+    Raises:
+        Exception: If the search failed or input is invalid.
+    """
+    with tracing.span("tool.search_purchases") as span:
+        try:
+            user_id = tool_context._invocation_context.user_id
+            _read_own_writes(user_id)
+            result = PURCHASE_REPOSITORY.query(
+                user_id,
+                start_date=start_date or None,
+                end_date=end_date or None,
+                category=category or None,
+                merchant=merchant or None,
+                item_prefix=item_name_prefix or None,
+                page_token=page_token or None,
+            )
+            serialized = json.dumps(result)
+            span.set(response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error searching purchases: {str(e)}")
+
+
+def get_top_purchases_by_amount(
+    tool_context: ToolContext,
+    limit: int = 5,
+    start_date: str = "",
+    end_date: str = "",
+    category: str = "",
+) -> str:
+    """
+    This function returns the most expensive purchases of a user, by total amount, in descending order.
+
+    Args:
+        tool_context (ToolContext): The tool context containing user and session information.
+        limit (int): Number of purchases to return, 100 max
+        start_date (str): Earliest purchase date, YYYY-MM-DD
+        end_date (str): Latest purchase date (inclusive), YYYY-MM-DD
+        category (str): Only consider purchases containing items of this category
+
+    Returns:
+        JSON string with following structure (Dict[str, Any]):
+            {
+            "purchases": [ ... ], // same structure as the purchases of `get_all_purchases_for_a_user`
+            "next_page_token": "String"
+        }
+    Raises:
+        Exception: If the search failed or input is invalid.
+    """
+    with tracing.span("tool.get_top_purchases_by_amount") as span:
+        try:
+            user_id = tool_context._invocation_context.user_id
+            _read_own_writes(user_id)
+            result = PURCHASE_REPOSITORY.query(
+                user_id,
+                start_date=start_date or None,
+                end_date=end_date or None,
+                category=category or None,
+                order_by_amount=True,
+                page_size=limit,
+            )
+            serialized = json.dumps(result)
+            span.set(response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error getting top purchases: {str(e)}")
+
+
+def get_spending_by_period(
+    tool_context: ToolContext,
+    period: str = "month",
+    start_date: str = "",
+    end_date: str = "",
+    category: str = "",
+) -> str:
+    """
+    This function returns the total spending of a user per day, week or month, oldest first.
+    Prefer it for questions such as "highest spending month" or "how much did I spend on snacks each week".
+    Periods without purchases are omitted. Monthly totals over whole months are the fastest, give start_date
+    as the first day of a month and end_date as the last day of a month.
+
+    Args:
+        tool_context (ToolContext): The tool context containing user and session information.
+        period (str): "day", "week" or "month"
+        start_date (str): Earliest purchase date, YYYY-MM-DD
+        end_date (str): Latest purchase date (inclusive), YYYY-MM-DD
+        category (str): Only count the items of this category, e.g. "Snacks"
+
+    Returns:
+        JSON string with following structure (Dict[str, Any]):
+            {
+            "periods": [
+                {
+                    "period": "String", // YYYY-MM-DD for a day, YYYY-Www for an ISO week, YYYY-MM for a month
+                    "amount": "Number",
+                    "receipts": "Number"
+                }
+            ]
+        }
+    Raises:
+        Exception: If the aggregation failed or input is invalid.
+    """
+    with tracing.span("tool.get_spending_by_period") as span:
+        try:
+            user_id = tool_context._invocation_context.user_id
+            _read_own_writes(user_id)
+            months = month_range(start_date, end_date) if period == "month" else None
+            if months is not None:
+                # Whole months are read from the monthly rollups, one small document per month
+                rollups = PURCHASE_REPOSITORY.load_rollups(user_id, *months)
+                periods = spending_from_rollups(rollups.values(), category=category or None)
+            else:
+                periods = PURCHASE_REPOSITORY.spending_by_period(
+                    user_id,
+                    period=period,
+                    start_date=start_date or None,
+                    end_date=end_date or None,
+                    category=category or None,
+                )
+            serialized = json.dumps({"periods": periods})
+            span.set(period=period, rollups=months is not None, response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error getting spending by period: {str(e)}")
+
+
+def get_monthly_spending_summary(
+    tool_context: ToolContext,
+    start_month: str = "",
+    end_month: str = "",
+    top: int = 5,
+) -> str:
+    """
+    This function returns the spending of a user over a range of months: the totals of every month and of
+    the whole range, and the categories, merchants and items the user spent the most on.
+    Prefer it for questions such as "top categories", "where did I spend the most in the last 3 months" or
+    "how much tax did I pay this year". It reads one small summary per month, never the receipts.
+
+    Args:
+        tool_context (ToolContext): The tool context containing user and session information.
+        start_month (str): First month, YYYY-MM, from the first purchase if empty
+        end_month (str): Last month (inclusive), YYYY-MM, up to the last purchase if empty
+        top (int): Number of categories, merchants and items to return
+
+    Returns:
+        JSON string with following structure (Dict[str, Any]):
+            {
+            "months": [{"month": "String", "amount": "Number", "taxAmount": "Number", "receipts": "Number"}],
+            "totalAmount": "Number",
+            "taxAmount": "Number",
+            "receipts": "Number",
+            "topCategories": [{"name": "String", "amount": "Number", "items": "Number", "receipts": "Number"}],
+            "topMerchants": [{"name": "String", "amount": "Number", "receipts": "Number"}],
+            "topItems": [{"name": "String", "amount": "Number", "quantity": "Number", "purchases": "Number"}]
+        }
+    Raises:
+        Exception: If the summary failed or input is invalid.
+    """
+    with tracing.span("tool.get_monthly_spending_summary") as span:
+        try:
+            for month in (start_month, end_month):
+                if month and (len(month) != 7 or month_range(f"{month}-01", None) is None):
+                    raise ValueError(f"Invalid month: {month}, expected YYYY-MM")
+            user_id = tool_context._invocation_context.user_id
+            _read_own_writes(user_id)
+            rollups = PURCHASE_REPOSITORY.load_rollups(user_id, start_month or None, end_month or None)
+            serialized = json.dumps(summarize_rollups(rollups.values(), top=max(1, top)))
+            span.set(months=len(rollups), response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error getting the monthly spending summary: {str(e)}")
+
+
+def get_dashboard_data(
+    tool_context: ToolContext,
+) -> str:
+    """
+    This function computes the complete "Dashboard" screen data for a user from the purchase history.
+    The returned JSON already follows the Dashboard screen schema and must be sent to the user as is.
+
+    Args:
+        tool_context (ToolContext): The tool context containing user and session information.
+
+    Returns:
+        JSON string with following structure (Dict[str, Any]):
+            {
+            "totalMonthlyExpense": "Number",
+            "monthlyExpenseGraph": [{"month": "String", "amount": "Number"}],
+            "recentSpending": [{"name": "String", "purchaseDate": "String", "amount": "Number", "category": "String"}],
+            "topSpendingCategories": [
+                {
+                    "category": "String",
+                    "amount": "Number",
+                    "items": [{"name": "String", "amount": "Number"}],
+                    "saveMore": [
+                        {
+                            "name": "String",
+                            "cheaperPrice": "Number",
+                            "cheaperMerchantName": "String",
+                            "higherPrice": "Number",
+                            "higherMerchantName": "String",
+                            "savings": "String"
+                        }
+                    ]
+                }
+            ]
+        }
+    Raises:
+        Exception: If the computation failed.
+    """
+    with tracing.span("tool.get_dashboard_data") as span:
+        try:
+            user_id = tool_context._invocation_context.user_id
+            serialized, cache_hit = _get_screen_response(
+                user_id, DASHBOARD, lambda: build_dashboard(_load_user_purchases(user_id))
+            )
+            span.set(cache_hit=cache_hit, response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error computing dashboard data: {str(e)}")
+
+
+def get_insights_data(
+    tool_context: ToolContext,
+) -> str:
+    """
+    This function returns the complete "Insights" screen data for a user.
+    The returned JSON already follows the Insights screen schema and must be sent to the user as is.
+
+    Args:
+        tool_context (ToolContext): The tool context containing user and session information.
+
+    Returns:
+        JSON string with following structure (Dict[str, Any]):
+            {
+            "expectedExpenseNextMonth": {"amount": "Number"},
+            "shoppingAlerts": {
+                "runningLow": {"itemName": "String", "expectedRunOutIn": "String", "lastPurchased": "String"}
+            },
+            "subscriptions": [{"subscriptionName": "String", "renewsOn": "String", "daysLeft": "Number"}],
+            "financialSnapshot": {
+                "highestSpendingCategory": {"category": "String", "amount": "Number"},
+                "highestSpendingMonth": {"month": "String", "amount": "Number"},
+                "highestSpendingWeek": {"week": "String", "amount": "Number"}
+            }
+        }
+    Raises:
+        Exception: If the computation failed.
+    """
+    with tracing.span("tool.get_insights_data") as span:
+        try:
+            user_id = tool_context._invocation_context.user_id
+            serialized, cache_hit = _get_screen_response(user_id, INSIGHTS, lambda: INSIGHTS_ENGINE.get(user_id).build())
+            span.set(cache_hit=cache_hit, response_bytes=len(serialized))
+            return serialized
+        except Exception as e:
+            raise Exception(f"Error computing insights data: {str(e)}")
 
 
 def generate_wallet_pass_url_for_shopping_list(
@@ -173,36 +662,15 @@ def generate_wallet_pass_url_for_shopping_list(
     Returns:
         str: URL of the google wallet pass.
     """
-    start_time = time.time()
-    try:
-        title = "Shopping List"
-        header = category
-        text_modules = [{"header": item_name, "body": '1', "id": "text_module_id"} for item_name in item_names]
-        generic_pass_token = get_generic_pass_token(title, header, text_modules)
-        end_time = time.time()
-        print(f"TIME TAKEN TO GENERATE WALLET TOKEN FOR SHOPPING LIST: {end_time - start_time} seconds")
-        return f"https://pay.google.com/gp/v/save/{generic_pass_token}"
-
-
-    except Exception as e:
-        end_time = time.time()
-        print(f"TIME TAKEN TO GENERATE WALLET TOKEN FOR SHOPPING LIST (---ERROR---): {end_time - start_time} seconds")
-        raise Exception(f"Error generating wallet token for shopping list: {str(e)}")
-    pass
-
-# def save_all_the_demo_transactions(
-#     tool_context: ToolContext,
-# ) -> str:
-#     """
-#     This function saves all the demo transactions to the database.
-#     """
-#     import json
-#     try:
-#         with open("agentic_ai/datasetv2.json", "r") as file:
-#             data = json.load(file)
-#             for item in data:
-#                 COLLECTION.add({"user_id": tool_context._invocation_context.user_id, "data": item})
-#         return "All the demo transactions have been saved to the database."
-#     except Exception as e:
-#         print('got error in save all the demo transactions ------------')
-#         raise Exception(f"Error saving demo transactions: {str(e)}")
+    with tracing.span("tool.generate_wallet_pass_url_for_shopping_list") as span:
+        try:
+            title = "Shopping List"
+            header = category
+            text_modules = [{"header": item_name, "body": '1', "id": "text_module_id"} for item_name in item_names]
+            generic_pass_token = get_generic_pass_token(title, header, text_modules)
+            span.set(items=len(item_names))
+            return f"https://pay.google.com/gp/v/save/{generic_pass_token}"
+
+
+        except Exception as e:
+            raise Exception(f"Error generating wallet token for shopping list: {str(e)}")
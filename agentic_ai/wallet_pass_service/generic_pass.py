@@ -1,9 +1,9 @@
 import json
 import os
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from google.oauth2.service_account import Credentials
 from google.auth import jwt, crypt
 
@@ -12,6 +12,20 @@ from google.auth import jwt, crypt
 ISSUER_ID = "3388000000022958565"  # RECEIVED FROM GOOGLE WALLET API DASHBOARD
 CLASS_SUFFIX = "generic"  # -> class ID of a generic pass sclass in Google Walled API Dashboard
 
+# Signer of the current process pool worker, see `_init_signing_worker`
+_WORKER_SIGNER = None
+
+
+def _init_signing_worker(key_file_path: str):
+    """Load the private key once per process pool worker."""
+    global _WORKER_SIGNER
+    _WORKER_SIGNER = crypt.RSASigner.from_service_account_file(key_file_path)
+
+
+def _sign_claims(claims: dict) -> str:
+    """Sign JWT claims in a process pool worker."""
+    return jwt.encode(_WORKER_SIGNER, claims).decode("utf-8")
+
 
 class GenericPass:
     """Demo class for creating and managing Generic passes in Google Wallet.
@@ -25,6 +39,9 @@ class GenericPass:
     def __init__(self):
         # get the current directory path and then join it with steady-habitat-467108-n7-6e6567eec883.json
         self.key_file_path = os.path.join(os.path.dirname(__file__), "steady-habitat-467108-n7-6e6567eec883.json")
+        self._signer = None
+        self._client = None
+        self._lock = threading.Lock()
         # Set up authenticated client
         self.auth()
 
@@ -32,31 +49,47 @@ class GenericPass:
 
     # [START auth]
     def auth(self):
-        """Create authenticated HTTP client using a service account file."""
+        """Load the service account credentials, the HTTP client is created on first use."""
         self.credentials = Credentials.from_service_account_file(
             self.key_file_path, scopes=["https://www.googleapis.com/auth/wallet_object.issuer"]
         )
 
-        self.client = build("walletobjects", "v1", credentials=self.credentials)
+    @property
+    def client(self):
+        """Authenticated Google Wallet API client, built on first use.
+
+        Building the discovery client is slow and signing passes does not need it.
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from googleapiclient.discovery import build
+
+                    self._client = build("walletobjects", "v1", credentials=self.credentials)
+        return self._client
 
     # [END auth]
 
-    # [START jwtNew]
-    def create_jwt_new_objects(self, object_suffix: str, title: str, header: str, text_modules: list) -> str:
-        """Generate a signed JWT that creates a new pass class and object.
+    @property
+    def signer(self) -> crypt.RSASigner:
+        """RSA signer of the service account, the private key is read and parsed once."""
+        if self._signer is None:
+            with self._lock:
+                if self._signer is None:
+                    self._signer = crypt.RSASigner.from_service_account_file(self.key_file_path)
+        return self._signer
 
-        When the user opens the "Add to Google Wallet" URL and saves the pass to
-        their wallet, the pass class and object defined in the JWT are
-        created. This allows you to create multiple pass classes and objects in
-        one API call when the user saves the pass to their wallet.
+    def build_claims(self, object_suffix: str, title: str, header: str, text_modules: list) -> dict:
+        """Build the JWT claims that create a new pass class and object.
 
         Args:
             object_suffix (str): Developer-defined unique ID for the pass object.
-
+            title (str): Card title of the pass.
+            header (str): Header of the pass.
+            text_modules (list): Text modules shown on the pass.
 
         Returns:
-            str: JWT token
-
+            dict: JWT claims
         """
 
         # See link below for more information on required properties
@@ -76,7 +109,7 @@ class GenericPass:
         }
 
         # Create the JWT claims
-        claims = {
+        return {
             "iss": self.credentials.service_account_email,
             "aud": "google",
             "origins": ["www.example.com"],
@@ -88,10 +121,50 @@ class GenericPass:
             },
         }
 
+    # [START jwtNew]
+    def create_jwt_new_objects(self, object_suffix: str, title: str, header: str, text_modules: list) -> str:
+        """Generate a signed JWT that creates a new pass class and object.
+
+        When the user opens the "Add to Google Wallet" URL and saves the pass to
+        their wallet, the pass class and object defined in the JWT are
+        created. This allows you to create multiple pass classes and objects in
+        one API call when the user saves the pass to their wallet.
+
+        Args:
+            object_suffix (str): Developer-defined unique ID for the pass object.
+
+
+        Returns:
+            str: JWT token
+
+        """
+        claims = self.build_claims(object_suffix, title, header, text_modules)
+
         # The service account credentials are used to sign the JWT
-        signer = crypt.RSASigner.from_service_account_file(self.key_file_path)
-        token = jwt.encode(signer, claims).decode("utf-8")
+        token = jwt.encode(self.signer, claims).decode("utf-8")
 
         return token
 
     # [END jwtNew]
+
+    def create_jwts_new_objects(self, passes: list[dict], processes: int = 0) -> list[str]:
+        """Generate signed JWTs for many passes at once.
+
+        Args:
+            passes (list[dict]): One dict per pass with the "object_suffix", "title",
+                "header" and "text_modules" arguments of `create_jwt_new_objects`.
+            processes (int): Number of worker processes used to sign the JWTs, RSA
+                signing is CPU bound. Signs in the current process when lower than 2.
+
+        Returns:
+            list[str]: JWT tokens, in the order of `passes`
+        """
+        all_claims = [self.build_claims(**new_pass) for new_pass in passes]
+        if processes < 2 or len(all_claims) < processes:
+            return [jwt.encode(self.signer, claims).decode("utf-8") for claims in all_claims]
+
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_signing_worker, initargs=(self.key_file_path,)
+        ) as executor:
+            chunk_size = max(1, len(all_claims) // (processes * 4))
+            return list(executor.map(_sign_claims, all_claims, chunksize=chunk_size))
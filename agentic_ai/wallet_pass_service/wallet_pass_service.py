@@ -1,14 +1,39 @@
 """Google Wallet pass service for creating and managing generic passes."""
 
+import threading
 import uuid
 from agentic_ai.wallet_pass_service.generic_pass import GenericPass
 
-# Create a demo class instance
-# Creates the authenticated HTTP client
-generic_pass = GenericPass()
+# The demo class instance is created on first use, see `get_generic_pass`
+_generic_pass = None
+_generic_pass_lock = threading.Lock()
+
+
+def get_generic_pass() -> GenericPass:
+    """Return the shared GenericPass instance, loading the credentials on first use."""
+    global _generic_pass
+    if _generic_pass is None:
+        with _generic_pass_lock:
+            if _generic_pass is None:
+                _generic_pass = GenericPass()
+    return _generic_pass
 
 
 def get_generic_pass_token(title: str, header: str, text_modules: list) -> str:
     """Get a generic pass token for a given title, header, and text modules."""
     object_suffix = str(uuid.uuid4())
-    return generic_pass.create_jwt_new_objects(object_suffix=object_suffix, title=title, header=header, text_modules=text_modules)
+    return get_generic_pass().create_jwt_new_objects(object_suffix=object_suffix, title=title, header=header, text_modules=text_modules)
+
+
+def get_generic_pass_tokens(passes: list[tuple[str, str, list]], processes: int = 0) -> list[str]:
+    """Get generic pass tokens for many (title, header, text modules) tuples, e.g. for bulk imports.
+
+    Set `processes` to sign the tokens on a process pool of that size.
+    """
+    return get_generic_pass().create_jwts_new_objects(
+        [
+            {"object_suffix": str(uuid.uuid4()), "title": title, "header": header, "text_modules": text_modules}
+            for title, header, text_modules in passes
+        ],
+        processes=processes,
+    )
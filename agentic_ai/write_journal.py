@@ -0,0 +1,383 @@
+# agentic_ai/write_journal.py
+
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+import logger
+
+# Flushed entries stay readable this long, so that a history query racing with a flush never misses them
+RECENT_SECONDS = 60.0
+
+# Backoff between the attempts to flush a failing entry, doubled on every failure
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+
+
+class JournalEntry:
+    """A document write, acknowledged once it is in the journal."""
+
+    __slots__ = ("id", "user_id", "document", "flushed_at")
+
+    def __init__(self, id: str, user_id: str, document: Dict[str, Any]):
+        self.id = id
+        self.user_id = user_id
+        self.document = document
+        self.flushed_at: float | None = None
+
+
+class WriteBehindJournal:
+    """Append-only local journal of the document writes, flushed to the database in the background.
+
+    `append` returns once the write is fsynced to the journal. A background
+    thread hands the pending writes to `flush` in batches, in order, and
+    retries with backoff until the database accepts them. A failing batch is
+    split until the failing entry is alone, the other entries are flushed
+    meanwhile, and an entry failing again once the database accepted other
+    writes is moved to the dead-letter file and logged. Flushed writes are
+    recorded in the journal too, and on start every write that was not
+    flushed is replayed, so nothing acknowledged is lost when the process dies.
+    Writes must be idempotent, e.g. set() on a known document ID, as a write
+    may be flushed again after a crash.
+
+    Every process uses its own journal file in `directory`, locked while it
+    runs. On start, the journals left by processes that are gone are replayed
+    as well, whatever the number of processes is now.
+
+    Attributes:
+        directory: Directory of the journal files, defaults to a directory in the system temp dir.
+        flush: Function writing a batch of entries to the database, raising on failure.
+        batch_size: Maximum number of entries per flush.
+        flush_interval: Seconds between two flushes when writes trickle in.
+        max_journal_bytes: Size above which the journal is rewritten with the pending entries only.
+        dead_letter_path: File the writes refused by the database are appended to, as JSON lines.
+    """
+
+    def __init__(
+        self,
+        directory: str | None,
+        flush: Callable[[List[JournalEntry]], None],
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_journal_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "agentic-ai-write-journal")
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_journal_bytes = max_journal_bytes
+        self.dead_letter_path = os.path.join(self.directory, "dead-letter.jsonl")
+        self.appended = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+        self.replayed = 0
+        self._entries: OrderedDict[str, JournalEntry] = OrderedDict()  # Pending, then recently flushed
+        self._pending = 0
+        self._file = None
+        self._path: str | None = None
+        self._journal_bytes = 0
+        self._lock = threading.Lock()
+        self._flushed_condition = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _read_journal(file) -> OrderedDict[str, JournalEntry]:
+        """Return the entries of a journal that were not flushed, in order."""
+        entries: OrderedDict[str, JournalEntry] = OrderedDict()
+        file.seek(0)
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a journal may be cut short by a crash, it was never acknowledged
+                continue
+            if record.get("op") == "put":
+                entries.pop(record["id"], None)
+                entries[record["id"]] = JournalEntry(record["id"], record["user_id"], record["document"])
+            elif record.get("op") in ("flushed", "dead_lettered"):
+                for id in record["ids"]:
+                    entries.pop(id, None)
+        return entries
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        """Append records to the journal and make them durable. Must hold the lock."""
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._journal_bytes += len(data)
+
+    def _rewrite(self) -> None:
+        """Replace the journal with the pending entries only. Must hold the lock.
+
+        The new journal is written and locked aside, then renamed over the old
+        one, so that a crash at any point leaves one of them complete.
+        """
+        path = self._path
+        file = open(path + ".tmp", "w+b")
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        previous, self._file, self._journal_bytes = self._file, file, 0
+        pending = [entry for entry in self._entries.values() if entry.flushed_at is None]
+        self._write(
+            [{"op": "put", "id": entry.id, "user_id": entry.user_id, "document": entry.document} for entry in pending]
+        )
+        os.replace(path + ".tmp", path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        previous.close()
+
+    def start(self) -> None:
+        """Open a journal, replay the writes left by previous processes and start the flusher."""
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        replayed: OrderedDict[str, JournalEntry] = OrderedDict()
+        orphans = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "journal-*.jsonl"))):
+            file = open(path, "r+b")
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # In use by a running process
+                file.close()
+                continue
+            if os.fstat(file.fileno()).st_ino != os.stat(path).st_ino:
+                # Replaced by its process meanwhile, which is still running
+                file.close()
+                continue
+            replayed.update(self._read_journal(file))
+            if self._file is None:
+                self._file, self._path = file, path
+            else:
+                orphans.append(file)
+
+        if self._file is None:
+            index = 0
+            while True:
+                path = os.path.join(self.directory, f"journal-{index}.jsonl")
+                try:
+                    file = open(path, "x+b")
+                except FileExistsError:
+                    index += 1
+                    continue
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._file, self._path = file, path
+                break
+
+        with self._lock:
+            self._entries = replayed
+            self._pending = self.replayed = len(replayed)
+            # Own the replayed writes before the journals they came from are emptied
+            self._rewrite()
+        for file in orphans:
+            file.truncate(0)
+            os.fsync(file.fileno())
+            file.close()
+        if replayed:
+            logger.info("Replaying journaled writes", entries=len(replayed))
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="write-journal", daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush the pending writes, within `timeout` seconds, and stop the flusher.
+
+        Writes still pending are kept in the journal and replayed on next start.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopped.set()
+        self._wake.set()
+        thread.join(timeout)
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+    def append(self, user_id: str, id: str, document: Dict[str, Any]) -> None:
+        """Journal the write of a document, return once it is durable.
+
+        Args:
+            user_id: The ID of the user owning the document
+            id: The document ID, writing the same ID again replaces the document
+            document: The document to write
+        """
+        entry = JournalEntry(id, user_id, document)
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("The write journal is not started")
+            self._write([{"op": "put", "id": id, "user_id": user_id, "document": document}])
+            previous = self._entries.pop(id, None)
+            if previous is None or previous.flushed_at is not None:
+                self._pending += 1
+            self._entries[id] = entry
+            self.appended += 1
+            if self._pending >= self.batch_size:
+                self._wake.set()
+
+    def recent_writes(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return the documents of a user that are pending or were flushed in the last RECENT_SECONDS, by ID.
+
+        Merge them into the result of a database query, by document ID, to read
+        the user's own writes.
+        """
+        with self._lock:
+            return {id: entry.document for id, entry in self._entries.items() if entry.user_id == user_id}
+
+    def wait_flushed(self, user_id: str, timeout: float = 5.0) -> bool:
+        """Flush the pending writes of a user now and wait for them, return False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while any(entry.user_id == user_id and entry.flushed_at is None for entry in self._entries.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._wake.set()
+                self._flushed_condition.wait(remaining)
+        return True
+
+    def _dead_letter(self, entry: JournalEntry, error: Exception) -> None:
+        """Move an entry the database refuses to the dead-letter file, so that it no longer blocks the journal."""
+        record = {
+            "id": entry.id,
+            "user_id": entry.user_id,
+            "document": entry.document,
+            "error": str(error),
+            "failed_at": time.time(),
+        }
+        with open(self.dead_letter_path, "ab") as file:
+            file.write((json.dumps(record, separators=(",", ":"), default=str) + "\n").encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+        logger.error(
+            f"Journaled write refused by the database, moved to {self.dead_letter_path}: {error}",
+            id=entry.id,
+            user_id=entry.user_id,
+        )
+        with self._lock:
+            if self._file is None:
+                # Stopped meanwhile, the next start replays the entry
+                return
+            self.dead_lettered += 1
+            # An entry replaced by a newer write of the same ID is not pending anymore
+            if self._entries.get(entry.id) is entry:
+                del self._entries[entry.id]
+                self._pending -= 1
+                self._write([{"op": "dead_lettered", "ids": [entry.id]}])
+            self._flushed_condition.notify_all()
+
+    def _run(self) -> None:
+        failures = 0
+        limit = self.batch_size
+        # Entries that failed alone, by ID, retried alone once the database accepted other writes
+        suspects: OrderedDict[str, JournalEntry] = OrderedDict()
+        confirming = False
+        while True:
+            if failures:
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (failures - 1))
+                if self._stopped.wait(delay):
+                    return
+            elif not self._stopped.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+
+            now = time.monotonic()
+            with self._lock:
+                # Forget the entries flushed long enough ago
+                while self._entries:
+                    entry = next(iter(self._entries.values()))
+                    if entry.flushed_at is None or now - entry.flushed_at < RECENT_SECONDS:
+                        break
+                    self._entries.popitem(last=False)
+                for id, suspect in list(suspects.items()):
+                    # Replaced by a newer write of the same ID
+                    if self._entries.get(id) is not suspect:
+                        del suspects[id]
+                pending = [entry for entry in self._entries.values() if entry.flushed_at is None]
+            if suspects and (confirming or len(suspects) == len(pending)):
+                batch = [next(iter(suspects.values()))]
+            else:
+                batch = [entry for entry in pending if entry.id not in suspects][:limit]
+            if not batch:
+                failures = 0
+                if self._stopped.is_set():
+                    return
+                continue
+
+            try:
+                self.flush(batch)
+            except Exception as e:
+                with self._lock:
+                    self.failed_flushes += 1
+                if confirming and not self._stopped.is_set():
+                    # Other writes succeeded since this entry failed alone, the entry is the cause
+                    del suspects[batch[0].id]
+                    confirming = bool(suspects)
+                    self._dead_letter(batch[0], e)
+                    self._wake.set()
+                    continue
+                if len(batch) > 1:
+                    # Retried right away in halves, to flush the entries around the one the database refuses
+                    limit = (len(batch) + 1) // 2
+                    self._wake.set()
+                else:
+                    failures += 1
+                    suspects[batch[0].id] = batch[0]
+                logger.error(f"Failed to flush {len(batch)} journaled writes, retrying: {e}")
+                if self._stopped.is_set():
+                    # Kept in the journal, replayed on next start
+                    return
+                continue
+
+            failures = 0
+            limit = self.batch_size
+            suspects.pop(batch[0].id, None)
+            confirming = bool(suspects)
+            flushed_at = time.monotonic()
+            with self._lock:
+                if self._file is None:
+                    # Stopped while flushing, the next start replays the batch
+                    return
+                flushed_ids = []
+                for entry in batch:
+                    # An entry replaced by a newer write of the same ID is still pending
+                    if self._entries.get(entry.id) is entry:
+                        entry.flushed_at = flushed_at
+                        self._pending -= 1
+                        flushed_ids.append(entry.id)
+                self.flushed += len(flushed_ids)
+                if self._pending == 0 or self._journal_bytes > self.max_journal_bytes:
+                    self._rewrite()
+                else:
+                    self._write([{"op": "flushed", "ids": flushed_ids}])
+                self._flushed_condition.notify_all()
+            if self._pending:
+                self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the journal counters, for logging and monitoring."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "appended": self.appended,
+                "flushed": self.flushed,
+                "failed_flushes": self.failed_flushes,
+                "dead_lettered": self.dead_lettered,
+                "replayed": self.replayed,
+                "journal_bytes": self._journal_bytes,
+            }
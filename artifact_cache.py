@@ -0,0 +1,298 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import base64
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Image hash IDs are hex digests, anything else is never used as a file name
+_HASH_PATTERN = re.compile(r"[0-9a-f]{6,64}")
+
+
+class _MemoryEntry:
+    """Cached artifact held in memory."""
+
+    __slots__ = ("data", "mime_type", "encoded")
+
+    def __init__(self, data: bytes, mime_type: str):
+        self.data = data
+        self.mime_type = mime_type
+        self.encoded: str | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data) + (len(self.encoded) if self.encoded else 0)
+
+
+class ArtifactCache:
+    """Two-tier, content-addressed cache of image artifacts.
+
+    Artifacts are keyed by user and image hash ID. The first tier is an
+    in-memory LRU bounded by bytes, which also keeps the base64 form of the
+    images so that rendering the same attachment again is nearly free. The
+    second tier is a directory of files, read through mmap and evicted least
+    recently used first when over its byte budget.
+
+    Attributes:
+        directory: Directory of the on-disk tier.
+        max_memory_bytes: Byte budget of the in-memory tier.
+        max_disk_bytes: Byte budget of the on-disk tier, 0 disables it.
+    """
+
+    def __init__(self, directory: str | None, max_memory_bytes: int, max_disk_bytes: int):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "agentic-ai-artifact-cache")
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, _MemoryEntry] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] | None = None  # File name -> size, loaded on first use
+        self._disk_bytes = 0
+        self._writing: set[str] = set()  # Files being written to the on-disk tier
+        self._removing: set[str] = set()  # Evicted files being deleted from the on-disk tier
+        self._disk_writes = 0  # Files added to the on-disk index, tells a reader whether a file may be new
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._bytes_served = 0
+
+    @staticmethod
+    def _key(user_id: str, image_hash: str) -> str | None:
+        """Return the cache key of an artifact, None if the hash ID is not a valid hex digest."""
+        if not _HASH_PATTERN.fullmatch(image_hash):
+            return None
+        user_key = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:16]
+        return f"{user_key}-{image_hash}"
+
+    def _disk_index(self) -> OrderedDict[str, int]:
+        """Return the index of the on-disk tier, scanning the directory on first use, without holding the lock."""
+        with self._lock:
+            if self._disk is not None:
+                return self._disk
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        with self._lock:
+            # Another thread may have scanned it meanwhile, keep the first one
+            if self._disk is None:
+                self._disk = OrderedDict((name, size) for _, name, size in sorted(files))
+                self._disk_bytes = sum(self._disk.values())
+            return self._disk
+
+    def _remember(self, key: str, entry: _MemoryEntry) -> None:
+        """Add an entry to the in-memory tier and evict over budget. Must hold the lock."""
+        previous = self._memory.pop(key, None)
+        if previous:
+            self._memory_bytes -= previous.size
+        if entry.size > self.max_memory_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        self._evict_memory()
+
+    def _evict_memory(self) -> None:
+        """Drop least recently used entries until the in-memory tier fits its budget. Must hold the lock."""
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+
+    def _read_file(self, key: str) -> _MemoryEntry | None:
+        """Read an artifact file of the on-disk tier, None if it is missing or corrupted. Called without the lock."""
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # File layout: mime type, newline, raw bytes
+                separator = mapped.find(b"\n")
+                if separator < 0:
+                    return None
+                mime_type = mapped[:separator].decode("utf-8")
+                data = mapped[separator + 1 :]
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return _MemoryEntry(data, mime_type)
+
+    def _write_file(self, key: str, data: bytes, mime_type: str) -> None:
+        """Write an artifact file of the on-disk tier atomically, through a temporary file. Called without the lock."""
+        path = os.path.join(self.directory, key)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                file.write(mime_type.encode("utf-8") + b"\n")
+                file.write(data)
+            os.replace(temporary_path, path)
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _remove_files(directory: str, names: list) -> None:
+        """Delete evicted files of the on-disk tier. Called without the lock."""
+        for name in names:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _get_entry(self, key: str) -> _MemoryEntry | None:
+        """Look an artifact up in both tiers, promoting disk hits to memory.
+
+        Only the index lookups hold the lock, the file is read without it.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return entry
+        try:
+            disk = self._disk_index() if self.max_disk_bytes else None
+        except OSError:
+            disk = None
+        with self._lock:
+            on_disk = disk is not None and key in disk
+            disk_writes = self._disk_writes
+
+        entry = self._read_file(key) if on_disk else None
+        with self._lock:
+            if entry is None:
+                # Unless the file may have been written again since the lookup
+                if on_disk and self._disk_writes == disk_writes:
+                    self._disk_bytes -= disk.pop(key, 0)
+                self._misses += 1
+                return None
+            if key in disk:
+                disk.move_to_end(key)
+            self._disk_hits += 1
+            self._remember(key, entry)
+            return entry
+
+    def get(self, user_id: str, image_hash: str) -> tuple[bytes, str] | None:
+        """Return the (bytes, mime type) of a cached artifact, or None on a miss."""
+        key = self._key(user_id, image_hash)
+        if key is None:
+            return None
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._bytes_served += len(entry.data)
+        return entry.data, entry.mime_type
+
+    def get_base64(self, user_id: str, image_hash: str) -> tuple[str, str] | None:
+        """Return the (base64 encoded data, mime type) of a cached artifact, or None on a miss."""
+        key = self._key(user_id, image_hash)
+        if key is None:
+            return None
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        encoded = entry.encoded
+        if encoded is None:
+            encoded = base64.b64encode(entry.data).decode("utf-8")
+        with self._lock:
+            if entry.encoded is None:
+                entry.encoded = encoded
+                if self._memory.get(key) is entry:
+                    # Account for the encoded form, which may push other entries out
+                    self._memory_bytes += len(encoded)
+                    self._evict_memory()
+            self._bytes_served += len(entry.data)
+        return encoded, entry.mime_type
+
+    def put(self, user_id: str, image_hash: str, data: bytes, mime_type: str, encoded: str | None = None) -> None:
+        """Store an artifact in both tiers.
+
+        The file of the on-disk tier is written without holding the lock, only
+        the index and the LRU bookkeeping are updated under it.
+
+        Args:
+            user_id: The ID of the user
+            image_hash: The hash identifier of the image
+            data: The raw image bytes
+            mime_type: MIME type of the image
+            encoded: The base64 form of the image, if the caller already computed it
+        """
+        key = self._key(user_id, image_hash)
+        if key is None:
+            return
+        with self._lock:
+            if key not in self._memory:
+                entry = _MemoryEntry(data, mime_type)
+                entry.encoded = encoded
+                self._remember(key, entry)
+        size = len(mime_type) + 1 + len(data)
+        if not self.max_disk_bytes or size > self.max_disk_bytes:
+            return
+
+        try:
+            disk = self._disk_index()
+            with self._lock:
+                # A file being deleted would be deleted after it is written again, it is left to the memory tier
+                if key in disk or key in self._writing or key in self._removing:
+                    if key in disk:
+                        disk.move_to_end(key)
+                    return
+                self._writing.add(key)
+            try:
+                self._write_file(key, data, mime_type)
+            finally:
+                with self._lock:
+                    self._writing.discard(key)
+        except OSError:
+            # The disk tier is best effort, the memory tier still serves the artifact
+            return
+
+        evicted = []
+        with self._lock:
+            disk[key] = size
+            self._disk_bytes += size
+            self._disk_writes += 1
+            while self._disk_bytes > self.max_disk_bytes:
+                name, evicted_size = disk.popitem(last=False)
+                self._disk_bytes -= evicted_size
+                evicted.append(name)
+            self._removing.update(evicted)
+        try:
+            self._remove_files(self.directory, evicted)
+        finally:
+            with self._lock:
+                self._removing.difference_update(evicted)
+
+    def stats(self) -> dict:
+        """Return the cache counters, for logging and monitoring."""
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": (self._memory_hits + self._disk_hits) / lookups if lookups else 0.0,
+                "bytes_served": self._bytes_served,
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,201 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import atexit
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from enum import Enum
+
+import logger
+
+_BLOOM_MAGIC = b"AIBF"
+_BLOOM_HEADER = struct.Struct(">4sQI")  # magic, number of bits, number of hashes
+
+
+class BloomFilter:
+    """Fixed size Bloom filter over strings.
+
+    Attributes:
+        size: Number of bits.
+        hash_count: Number of bit positions set per item.
+    """
+
+    def __init__(self, size: int, hash_count: int, bits: bytearray | None = None):
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, expected_items: int, false_positive_rate: float) -> "BloomFilter":
+        """Create a filter sized for `expected_items` at the given false positive rate."""
+        size = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(size / expected_items * math.log(2)))
+        return cls(size, hash_count)
+
+    def _positions(self, item: str):
+        """Bit positions of an item, using double hashing over one SHA-256 digest."""
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:16], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def to_bytes(self) -> bytes:
+        return _BLOOM_HEADER.pack(_BLOOM_MAGIC, self.size, self.hash_count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, size, hash_count = _BLOOM_HEADER.unpack_from(data)
+        bits = bytearray(data[_BLOOM_HEADER.size :])
+        if magic != _BLOOM_MAGIC or len(bits) != (size + 7) // 8:
+            raise ValueError("Not a Bloom filter file")
+        return cls(size, hash_count, bits)
+
+
+class ArtifactPresence(Enum):
+    """Answer of `KnownArtifactIndex.lookup`."""
+
+    KNOWN = "known"  # Uploaded, no need to contact GCS
+    POSSIBLE = "possible"  # Maybe uploaded, GCS must be asked
+    ABSENT = "absent"  # Never uploaded, upload without asking GCS, only answered by an authoritative index
+
+
+class KnownArtifactIndex:
+    """Index of the artifacts already stored in GCS, consulted before any GCS round-trip.
+
+    An exact, bounded in-process set answers for artifacts seen by this
+    worker. A Bloom filter summary, persisted to disk, covers artifacts seen
+    before a restart, a positive answer still has to be confirmed by GCS.
+
+    The filter only holds the artifacts stored by this process and the ones
+    it loaded at startup, other workers writing the same bucket are not in
+    it. A miss is therefore only trusted, and the existence check skipped,
+    when the index is authoritative, i.e. this process is the only writer of
+    the artifacts and its file survives restarts. Otherwise a miss is
+    POSSIBLE like a hit.
+
+    Attributes:
+        path: File the Bloom filter is persisted to.
+        persist_every: Number of new artifacts between two writes of the file.
+        authoritative: Whether every stored artifact went through this index, so that a miss means absent.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        expected_items: int = 200_000,
+        false_positive_rate: float = 0.01,
+        max_known: int = 100_000,
+        persist_every: int = 50,
+        authoritative: bool = False,
+    ):
+        self.path = path or os.path.join(tempfile.gettempdir(), "agentic-ai-artifact-index.bloom")
+        self.persist_every = persist_every
+        self.authoritative = authoritative
+        self._max_known = max_known
+        self._known: OrderedDict[str, None] = OrderedDict()
+        self._bloom = self._load(expected_items, false_positive_rate)
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "known_hits": 0,
+            "absent": 0,
+            "possible": 0,
+            "false_positives": 0,
+        }
+        atexit.register(self.persist)
+
+    def _load(self, expected_items: int, false_positive_rate: float) -> BloomFilter:
+        """Load the persisted Bloom filter, or create an empty one."""
+        try:
+            with open(self.path, "rb") as file:
+                return BloomFilter.from_bytes(file.read())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable artifact index {self.path}: {e}")
+        return BloomFilter.for_capacity(expected_items, false_positive_rate)
+
+    @staticmethod
+    def _key(app_name: str, user_id: str, session_id: str, filename: str) -> str:
+        return f"{app_name}/{user_id}/{session_id}/{filename}"
+
+    def lookup(self, app_name: str, user_id: str, session_id: str, filename: str) -> ArtifactPresence:
+        """Tell whether an artifact is known to be stored, possibly stored or never stored."""
+        key = self._key(app_name, user_id, session_id, filename)
+        with self._lock:
+            if key in self._known:
+                self._known.move_to_end(key)
+                self._counters["known_hits"] += 1
+                return ArtifactPresence.KNOWN
+            if key in self._bloom or not self.authoritative:
+                self._counters["possible"] += 1
+                return ArtifactPresence.POSSIBLE
+            self._counters["absent"] += 1
+            return ArtifactPresence.ABSENT
+
+    def add(self, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        """Record an artifact as stored in GCS."""
+        key = self._key(app_name, user_id, session_id, filename)
+        with self._lock:
+            self._known[key] = None
+            self._known.move_to_end(key)
+            while len(self._known) > self._max_known:
+                self._known.popitem(last=False)
+            if key not in self._bloom:
+                self._bloom.add(key)
+                self._unsaved += 1
+            should_persist = self._unsaved >= self.persist_every
+        if should_persist:
+            self.persist()
+
+    def record_false_positive(self) -> None:
+        """Count a POSSIBLE answer that GCS did not confirm, misses of a non authoritative index included."""
+        with self._lock:
+            self._counters["false_positives"] += 1
+
+    def persist(self) -> None:
+        """Write the Bloom filter to disk, atomically."""
+        with self._lock:
+            if not self._unsaved:
+                return
+            data = self._bloom.to_bytes()
+            self._unsaved = 0
+        temporary_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(temporary_path, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to persist artifact index {self.path}: {e}")
+
+    def stats(self) -> dict:
+        """Return the index counters, known and absent answers each skip the list_versions round-trip."""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["round_trips_avoided"] = counters["known_hits"] + counters["absent"]
+        return counters
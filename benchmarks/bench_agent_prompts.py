@@ -0,0 +1,103 @@
+"""Compare the per-call input of the intent sub-agents with a single agent holding the whole prompt.
+
+A stub model records the system instruction and tool declarations of every
+request instead of calling Gemini, so the script also checks that each
+sample message reaches the expected sub-agent.
+
+Usage:
+    python -m benchmarks.bench_agent_prompts
+"""
+
+import asyncio
+import sys
+
+from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from agentic_ai import agent as agent_module
+from agentic_ai.history_compactor import CHARS_PER_TOKEN
+
+# Sample messages and the sub-agent expected to answer them
+SAMPLES = [
+    ([types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=b"receipt")), types.Part(text="[IMAGE-ID 0123456789ab]")], "extraction_agent"),
+    ([types.Part(text="Dashboard")], "dashboard_agent"),
+    ([types.Part(text='Generate data for "Insights" screen')], "insights_agent"),
+    ([types.Part(text="Why is groceries the top category on my dashboard?")], "query_agent"),
+    ([types.Part(text="User Query: how much did I spend on snacks in June?")], "query_agent"),
+    ([types.Part(text="Give me a recipe for paneer butter masala")], "shopping_list_agent"),
+    ([types.Part(text="hello")], "query_agent"),
+]
+
+
+class StubModel(BaseLlm):
+    """Model answering "ok" and recording the size of every request."""
+
+    model: str = "stub"
+    requests: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        config = llm_request.config
+        tools = "".join(tool.model_dump_json(exclude_none=True) for tool in config.tools or [])
+        self.requests.append((str(config.system_instruction or ""), tools))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="ok")]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=0, candidates_token_count=1),
+        )
+
+
+def _tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+async def _run(root_agent, stub: StubModel) -> list:
+    """Send every sample to a fresh session, return (author, instruction tokens, tool tokens) per sample."""
+    runner = InMemoryRunner(agent=root_agent, app_name="bench")
+    results = []
+    for parts, _ in SAMPLES:
+        session = await runner.session_service.create_session(app_name="bench", user_id="bench-user")
+        stub.requests.clear()
+        author = None
+        async for event in runner.run_async(
+            user_id="bench-user", session_id=session.id, new_message=types.Content(role="user", parts=parts)
+        ):
+            author = event.author
+        instruction, tools = stub.requests[0]
+        results.append((author, _tokens(instruction), _tokens(tools)))
+    return results
+
+
+def main():
+    stub = StubModel()
+    for sub_agent in agent_module.root_agent.sub_agents:
+        sub_agent.model = stub
+        # Keep the router callback out, the fixed-format shortcuts would skip the model
+        sub_agent.before_model_callback = sub_agent.before_model_callback[1:]
+
+    single_agent = Agent(
+        name="single_agent",
+        model=stub,
+        instruction=agent_module.load_prompt("extraction", "screens", "insights", "dashboard", "query", "shopping_list"),
+        tools=sorted({tool for sub_agent in agent_module.root_agent.sub_agents for tool in sub_agent.tools}, key=lambda tool: tool.__name__),
+    )
+
+    routed = asyncio.run(_run(agent_module.root_agent, stub))
+    single = asyncio.run(_run(single_agent, stub))
+
+    failures = 0
+    print(f"{'message':<44}{'agent':<22}{'tokens':>8}{'single':>8}")
+    for (parts, expected), (author, instruction, tools), (_, single_instruction, single_tools) in zip(SAMPLES, routed, single):
+        text = "".join(part.text for part in parts if part.text)[:40]
+        flag = "" if author == expected else f"  <- expected {expected}"
+        failures += author != expected
+        print(f"{text:<44}{author:<22}{instruction + tools:>8}{single_instruction + single_tools:>8}{flag}")
+
+    if failures:
+        print(f"{failures} message(s) routed to the wrong agent")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
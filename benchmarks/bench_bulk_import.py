@@ -0,0 +1,80 @@
+"""Benchmark the bulk import of receipts against a fake Firestore with a per round-trip latency.
+
+Compares one add() per receipt, as the old demo loader did, with the batched
+import, checks that the import survives transient commit failures and that
+the rollups incremented by the parallel batches match the receipts, and
+imports the same file into the local SQLite repository.
+
+Usage:
+    python -m benchmarks.bench_bulk_import [--scale 100] [--latency 0.05] [--failure-rate 0.1]
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+from agentic_ai.bulk_import import import_receipts
+from agentic_ai.monthly_rollups import check_rollups
+from agentic_ai.purchase_repository import FirestorePurchaseRepository
+from agentic_ai.sqlite_repository import SQLitePurchaseRepository
+from benchmarks.fakes import FakeFirestore
+from benchmarks.synthetic import make_history
+
+USER_ID = "bench-user"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100, help="copies of the 44 demo receipts")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per Firestore round-trip")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="fraction of the commits failing")
+    args = parser.parse_args()
+
+    history = make_history(args.scale)
+    for index, receipt in enumerate(history):
+        # Every copy is a distinct receipt, not a re-import of the same one
+        receipt["purchaseNumber"] = f"{receipt.get('purchaseNumber')}-{index}"
+    jsonl = "".join(json.dumps(receipt) + "\n" for receipt in history)
+    history.append({"merchantName": "Broken", "purchasedAt": "yesterday", "totalAmount": "n/a"})
+    json_array = json.dumps(history)
+
+    # One round-trip per receipt, measured on a sample and extrapolated
+    sample = history[:100]
+    collection = FakeFirestore(latency=args.latency).collection("receipts")
+    start_time = time.perf_counter()
+    for receipt in sample:
+        collection.add({"user_id": USER_ID, "data": receipt})
+    per_receipt = (time.perf_counter() - start_time) / len(sample)
+    print(f"add() per receipt: {1 / per_receipt:>8.0f} receipts/s (~{per_receipt * len(history):.0f} s for {len(history)})")
+
+    for name, text, failure_rate in (
+        ("JSONL", jsonl, 0.0),
+        ("JSON array", json_array, 0.0),
+        ("JSONL, failing commits", jsonl, args.failure_rate),
+    ):
+        firestore = FakeFirestore(latency=args.latency, failure_rate=failure_rate)
+        repository = FirestorePurchaseRepository("bench", "receipts", client=firestore)
+        report = import_receipts(io.StringIO(text), USER_ID, repository=repository, progress_interval=3600)
+        print(
+            f"{name + ':':<24}{report['receipts_per_second']:>8.0f} receipts/s, imported {report['imported']}, "
+            f"invalid {report['invalid']}, failed {report['failed']}, retries {report['retries']}, "
+            f"stored {len(repository.collection.documents)}, rollups {len(repository.rollup_collection.documents)}, "
+            f"inconsistent rollups {len(check_rollups(repository, USER_ID)['mismatched'])}, "
+            f"round-trips {firestore.round_trips}"
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        repository = SQLitePurchaseRepository(os.path.join(directory, "purchases.db"))
+        report = import_receipts(io.StringIO(jsonl), USER_ID, repository=repository, progress_interval=3600)
+        print(
+            f"{'JSONL into SQLite:':<24}{report['receipts_per_second']:>8.0f} receipts/s, "
+            f"imported {report['imported']}, stored {len(repository.load_history(USER_ID))}, "
+            f"inconsistent rollups {len(check_rollups(repository, USER_ID)['mismatched'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
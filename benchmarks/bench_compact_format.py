@@ -0,0 +1,48 @@
+"""Compare the size of the plain JSON and compact purchase history encodings.
+
+Token counts are approximated with a word/punctuation split, which tracks
+the model tokenizer closely enough to compare encodings.
+
+Usage:
+    python -m benchmarks.bench_compact_format
+"""
+
+import json
+import re
+import time
+
+from agentic_ai.compact_format import encode_purchases
+from benchmarks.synthetic import load_dataset, make_history
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def approximate_tokens(text: str) -> int:
+    """Approximate the number of model tokens of a text."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def main():
+    datasets = [("datasetv2.json", load_dataset())]
+    for scale in (10, 100):
+        datasets.append((f"synthetic x{scale}", make_history(scale)))
+
+    print(
+        f"{'dataset':<18}{'json bytes':>12}{'compact':>10}{'saved':>8}"
+        f"{'json tokens':>13}{'compact':>10}{'saved':>8}{'encode ms':>11}"
+    )
+    for name, purchases in datasets:
+        plain = json.dumps(purchases)
+        start_time = time.perf_counter()
+        compact = encode_purchases(purchases)
+        encode_ms = (time.perf_counter() - start_time) * 1000
+
+        plain_tokens, compact_tokens = approximate_tokens(plain), approximate_tokens(compact)
+        print(
+            f"{name:<18}{len(plain):>12}{len(compact):>10}{1 - len(compact) / len(plain):>8.0%}"
+            f"{plain_tokens:>13}{compact_tokens:>10}{1 - compact_tokens / plain_tokens:>8.0%}{encode_ms:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
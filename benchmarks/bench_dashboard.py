@@ -0,0 +1,42 @@
+"""Benchmark the local Dashboard analytics against the demo and synthetic datasets.
+
+Usage:
+    python -m benchmarks.bench_dashboard
+"""
+
+import json
+import time
+
+from agentic_ai.analytics import PurchaseColumns, build_dashboard
+from benchmarks.synthetic import load_dataset, make_history
+
+REPEAT = 5
+
+
+def _best_of(function, repeat: int = REPEAT) -> float:
+    """Return the best wall time of `repeat` runs, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings) * 1000
+
+
+def main():
+    datasets = [("datasetv2.json", load_dataset())]
+    for scale in (10, 100, 1000):
+        datasets.append((f"synthetic x{scale}", make_history(scale)))
+
+    print(f"{'dataset':<20}{'receipts':>10}{'columns ms':>14}{'aggregate ms':>16}{'total ms':>12}{'json bytes':>12}")
+    for name, purchases in datasets:
+        columns = PurchaseColumns(purchases)
+        build_ms = _best_of(lambda: PurchaseColumns(purchases))
+        aggregate_ms = _best_of(lambda: build_dashboard(columns))
+        total_ms = _best_of(lambda: build_dashboard(purchases))
+        size = len(json.dumps(build_dashboard(columns)))
+        print(f"{name:<20}{len(purchases):>10}{build_ms:>14.2f}{aggregate_ms:>16.2f}{total_ms:>12.2f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
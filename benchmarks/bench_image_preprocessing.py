@@ -0,0 +1,76 @@
+"""Benchmark the preprocessing of uploaded receipt images.
+
+Renders demo receipts as phone photos and page scans, preprocesses them and
+reports the bytes saved and the latency saved once the upload to GCS and to
+the model at the given bandwidth is accounted for. Also compares the
+throughput of a serial loop with the worker pool.
+
+Usage:
+    python -m benchmarks.bench_image_preprocessing [--images 8] [--mbps 20] [--max-dimension 2048] [--format WEBP]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import load_dataset, render_receipt_image
+from image_preprocessing import ImagePreprocessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=8, help="number of images of each kind")
+    parser.add_argument("--mbps", type=float, default=20.0, help="upload bandwidth, in megabits per second")
+    parser.add_argument("--max-dimension", type=int, default=2048)
+    parser.add_argument("--format", default="WEBP", choices=("WEBP", "JPEG"))
+    parser.add_argument("--quality", type=int, default=85)
+    args = parser.parse_args()
+
+    preprocessor = ImagePreprocessor(
+        max_dimension=args.max_dimension, output_format=args.format, quality=args.quality
+    )
+    dataset = load_dataset()
+    bytes_per_second = args.mbps * 1_000_000 / 8
+    # Every image is uploaded twice, to GCS and inline to the model
+    uploads = 2
+
+    print(f"{'kind':>6}{'in KB':>10}{'out KB':>10}{'saved':>8}{'process ms':>12}{'upload ms saved':>17}")
+    all_images = []
+    for kind in ("photo", "scan"):
+        images = [
+            (render_receipt_image(dataset[index % len(dataset)], kind, seed=index), "image/jpeg" if kind == "photo" else "image/png")
+            for index in range(args.images)
+        ]
+        all_images += images
+        bytes_in = bytes_out = 0
+        process_seconds = 0.0
+        for data, mime_type in images:
+            start_time = time.perf_counter()
+            processed, _ = preprocessor.process(data, mime_type)
+            process_seconds += time.perf_counter() - start_time
+            bytes_in += len(data)
+            bytes_out += len(processed)
+
+        count = len(images)
+        upload_saved = uploads * (bytes_in - bytes_out) / bytes_per_second
+        print(
+            f"{kind:>6}{bytes_in / count / 1024:>10.0f}{bytes_out / count / 1024:>10.0f}"
+            f"{1 - bytes_out / bytes_in:>8.0%}{process_seconds / count * 1000:>12.1f}"
+            f"{(upload_saved - process_seconds) / count * 1000:>17.1f}"
+        )
+
+    start_time = time.perf_counter()
+    for data, mime_type in all_images:
+        preprocessor.process(data, mime_type)
+    serial_ms = (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(all_images)) as callers:
+        list(callers.map(lambda image: preprocessor.run(*image), all_images))
+    pool_ms = (time.perf_counter() - start_time) * 1000
+    print(f"\n{len(all_images)} images on {os.cpu_count()} CPUs: serial {serial_ms:.0f} ms, worker pool {pool_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
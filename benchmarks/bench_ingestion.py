@@ -0,0 +1,66 @@
+"""Benchmark the ingestion of chat attachments, serial loop against the upload pool.
+
+Every run uses freshly generated images so that neither the artifact cache nor
+the artifact index short-circuits the uploads.
+
+Usage:
+    python -m benchmarks.bench_ingestion [--latency 0.08] [--image-kb 400]
+"""
+
+import argparse
+import base64
+import os
+import time
+
+from benchmarks.fakes import FakeArtifactService
+from schema import ChatRequest, ImageData
+from utils import format_user_request_to_adk_content_and_store_artifacts, store_uploaded_image_as_artifact
+
+APP_NAME = "expense_manager_app"
+FILE_COUNTS = (1, 5, 20)
+
+
+def _make_request(file_count: int, image_bytes: int) -> ChatRequest:
+    files = [
+        ImageData(serialized_image=base64.b64encode(os.urandom(image_bytes)).decode("utf-8"), mime_type="image/jpeg")
+        for _ in range(file_count)
+    ]
+    return ChatRequest(text="Store these receipts", files=files, session_id="bench-session", user_id="bench-user")
+
+
+def _serial(request: ChatRequest, artifact_service: FakeArtifactService) -> None:
+    """The ingestion loop as it was before the upload pool."""
+    for data in request.files:
+        store_uploaded_image_as_artifact(
+            artifact_service=artifact_service,
+            app_name=APP_NAME,
+            user_id=request.user_id,
+            session_id=request.session_id,
+            image_data=data,
+        )
+
+
+def _parallel(request: ChatRequest, artifact_service: FakeArtifactService) -> None:
+    format_user_request_to_adk_content_and_store_artifacts(request, APP_NAME, artifact_service)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.08, help="seconds per artifact service call")
+    parser.add_argument("--image-kb", type=int, default=400, help="size of every attachment")
+    args = parser.parse_args()
+
+    print(f"{'files':>6}{'serial ms':>12}{'pool ms':>12}{'speedup':>10}")
+    for file_count in FILE_COUNTS:
+        timings = []
+        for ingest in (_serial, _parallel):
+            request = _make_request(file_count, args.image_kb * 1024)
+            start_time = time.perf_counter()
+            ingest(request, FakeArtifactService(latency=args.latency))
+            timings.append((time.perf_counter() - start_time) * 1000)
+        serial_ms, pool_ms = timings
+        print(f"{file_count:>6}{serial_ms:>12.1f}{pool_ms:>12.1f}{serial_ms / pool_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark the cost of logging for the request thread, synchronous handler against the async writer.
+
+The handler stream is replaced by a sink that sleeps on every write, to
+emulate a log collector applying backpressure on stdout.
+
+Usage:
+    python -m benchmarks.bench_logging [--entries 20000] [--write-latency-us 20]
+"""
+
+import argparse
+import time
+
+import logger
+
+ENTRY = {
+    "user_id": "user-123",
+    "session_id": "session-456",
+    "span": "tool.get_dashboard_data",
+    "duration_ms": 12.345,
+    "attributes": {"response_bytes": 2048},
+}
+
+
+class SlowSink:
+    """Stream that sleeps on every write and counts the written lines."""
+
+    def __init__(self, write_latency: float):
+        self.write_latency = write_latency
+        self.lines = 0
+
+    def write(self, text: str) -> None:
+        time.sleep(self.write_latency)
+        self.lines += text.count("\n")
+
+    def flush(self) -> None:
+        pass
+
+
+def _run(entries: int, write_latency: float, use_async: bool, max_queue: int) -> dict:
+    sink = SlowSink(write_latency)
+    logger.stop_async_writer()
+    logger.handler.setStream(sink)
+    if use_async:
+        logger.start_async_writer(max_queue)
+
+    latencies = []
+    start_time = time.perf_counter()
+    for index in range(entries):
+        call_start = time.perf_counter()
+        logger.info("Benchmark entry", index=index, **ENTRY)
+        latencies.append(time.perf_counter() - call_start)
+    caller_seconds = time.perf_counter() - start_time
+    writer = logger.stop_async_writer()
+    total_seconds = time.perf_counter() - start_time
+
+    latencies.sort()
+    return {
+        "caller_rate": entries / caller_seconds,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "total_seconds": total_seconds,
+        # The async writer also writes the drop warnings, only the benchmark entries are counted
+        "written": writer.written if writer is not None else sink.lines,
+        "dropped": writer.dropped if writer is not None else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--write-latency-us", type=float, default=20)
+    args = parser.parse_args()
+
+    stream = logger.handler.stream
+    rows = [
+        ("sync handler", False, 0),
+        ("async, queue 10000", True, 10000),
+        ("async, queue 1000", True, 1000),
+    ]
+    results = [(name, _run(args.entries, args.write_latency_us / 1e6, use_async, size)) for name, use_async, size in rows]
+    logger.handler.setStream(stream)
+
+    print(f"{'mode':<22}{'calls/s':>12}{'p99 us':>10}{'drain s':>10}{'written':>10}{'dropped':>10}")
+    for name, result in results:
+        print(
+            f"{name:<22}{result['caller_rate']:>12.0f}{result['p99_us']:>10.1f}{result['total_seconds']:>10.2f}"
+            f"{result['written']:>10}{result['dropped']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark the monthly spending questions answered from the rollups against a full scan of the receipts.
+
+Stores a synthetic history in a local SQLite repository, then times a 6 month
+summary read from the rollups and the same summary built from every receipt,
+as the tools did through get_all_purchases_for_a_user. Also times the saves,
+which now update the rollup of their month in the same transaction.
+
+Usage:
+    python -m benchmarks.bench_monthly_rollups [--scale 100] [--runs 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from agentic_ai.monthly_rollups import build_rollups, check_rollups, summarize_rollups
+from agentic_ai.purchase_queries import build_index_fields
+from agentic_ai.purchase_time import current_time, period_keys
+from agentic_ai.sqlite_repository import SQLitePurchaseRepository
+from benchmarks.synthetic import make_history
+
+USER_ID = "bench-user"
+MONTHS = 6
+
+
+def _timed(function, runs: int) -> tuple[float, object]:
+    """Return the mean milliseconds of `runs` calls and the last result."""
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        result = function()
+    return (time.perf_counter() - start_time) / runs * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100, help="copies of the 44 demo receipts")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    history = make_history(args.scale)
+    for index, receipt in enumerate(history):
+        receipt["purchaseNumber"] = f"{receipt.get('purchaseNumber')}-{index}"
+
+    end_month = period_keys(current_time())["month"]
+    year, month = map(int, end_month.split("-"))
+    month -= MONTHS - 1
+    if month < 1:
+        year, month = year - 1, month + 12
+    start_month = f"{year:04d}-{month:02d}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        repository = SQLitePurchaseRepository(os.path.join(directory, "purchases.db"))
+        start_time = time.perf_counter()
+        for index, receipt in enumerate(history):
+            repository.create(f"receipt-{index}", {"user_id": USER_ID, "data": receipt, **build_index_fields(receipt)})
+        save_ms = (time.perf_counter() - start_time) / len(history) * 1000
+
+        def from_rollups():
+            return summarize_rollups(repository.load_rollups(USER_ID, start_month, end_month).values())
+
+        def from_receipts():
+            rollups = build_rollups(USER_ID, repository.load_history(USER_ID).values())
+            return summarize_rollups(rollup for month, rollup in rollups.items() if start_month <= month <= end_month)
+
+        rollups_ms, expected = _timed(from_rollups, args.runs)
+        scan_ms, actual = _timed(from_receipts, args.runs)
+        consistent = not check_rollups(repository, USER_ID)["mismatched"]
+
+    print(f"receipts: {len(history)}, save with rollup update: {save_ms:.2f} ms")
+    print(f"{MONTHS} month summary from rollups:  {rollups_ms:8.2f} ms")
+    print(f"{MONTHS} month summary from receipts: {scan_ms:8.2f} ms ({scan_ms / rollups_ms:.0f}x)")
+    print(f"same totals: {expected['totalAmount'] == actual['totalAmount']}, rollups consistent: {consistent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Fire concurrent screen and history requests for one user against a slow fake Firestore.
+
+Checks that the concurrent requests share one history query and one
+computation per screen, and reports the wall time with and without
+coalescing.
+
+Usage:
+    python -m benchmarks.bench_single_flight [--concurrency 8] [--query-latency 0.5]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agentic_ai import tools
+from agentic_ai.single_flight import SingleFlight
+from benchmarks.synthetic import make_history
+
+
+class _InvocationContext:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+
+
+class _ToolContext:
+    """Minimal stand-in of the ADK tool context, the tools only read the user ID."""
+
+    def __init__(self, user_id: str):
+        self._invocation_context = _InvocationContext(user_id)
+
+
+def _run(concurrency: int, user_id: str) -> float:
+    """Fire `concurrency` rounds of Dashboard, Insights and history requests at once, return the wall time."""
+    context = _ToolContext(user_id)
+    requests = [tools.get_dashboard_data, tools.get_insights_data, tools.get_all_purchases_for_a_user] * concurrency
+    barrier = threading.Barrier(len(requests))
+
+    def call(tool):
+        barrier.wait()
+        return tool(context)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        list(executor.map(call, requests))
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--query-latency", type=float, default=0.5, help="seconds per Firestore history query")
+    args = parser.parse_args()
+
+    history = make_history(10)
+    queries = []
+
+    def slow_query(user_id):
+        queries.append(user_id)
+        time.sleep(args.query_latency)
+        return history
+
+    tools._query_user_purchases = slow_query
+
+    results = {}
+    for name, coalesce in (("without coalescing", False), ("single-flight", True)):
+        queries.clear()
+        if not coalesce:
+            # A flight that never matches, every caller runs its own computation
+            tools.HISTORY_FLIGHTS.do = lambda key, function: function()
+            tools.SCREEN_FLIGHTS.do = lambda key, function: function()
+        else:
+            tools.HISTORY_FLIGHTS = SingleFlight("purchase_history")
+            tools.SCREEN_FLIGHTS = SingleFlight("screens")
+        user_id = f"bench-user-{name}"
+        seconds = _run(args.concurrency, user_id)
+        results[name] = (seconds, len(queries))
+        print(f"{name:<20} {3 * args.concurrency} requests  {len(queries):>3} history queries  {seconds * 1000:>8.0f} ms")
+
+    print(tools.HISTORY_FLIGHTS.stats())
+    print(tools.SCREEN_FLIGHTS.stats())
+    if results["single-flight"][1] != 1:
+        print("Expected a single history query with single-flight")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
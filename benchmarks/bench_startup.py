@@ -0,0 +1,62 @@
+"""Measure import-to-ready time of the agent in a fresh interpreter.
+
+"Ready" means the agent and the request helpers are importable, which is
+all a cold instance needs before serving its first request. With
+--with-clients the storage, Firestore and wallet clients are created too,
+which is what the first request that touches them pays.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--with-clients]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = """
+import json, time
+start_time = time.perf_counter()
+from agentic_ai.agent import root_agent
+import utils
+ready = time.perf_counter() - start_time
+clients = 0.0
+if {with_clients}:
+    start_time = time.perf_counter()
+    from agentic_ai.tools import PURCHASE_REPOSITORY
+    from agentic_ai.wallet_pass_service.wallet_pass_service import get_generic_pass
+    PURCHASE_REPOSITORY.collection
+    get_generic_pass().client
+    utils.get_gcs_bucket()
+    clients = time.perf_counter() - start_time
+print(json.dumps({{"ready": ready, "clients": clients}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--with-clients", action="store_true")
+    args = parser.parse_args()
+
+    script = STARTUP_SCRIPT.format(with_clients=args.with_clients)
+    ready, clients = [], []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        ready.append(timings["ready"] * 1000)
+        clients.append(timings["clients"] * 1000)
+
+    print(f"import-to-ready: median {statistics.median(ready):.0f} ms, min {min(ready):.0f} ms ({args.runs} runs)")
+    if args.with_clients:
+        print(f"client creation: median {statistics.median(clients):.0f} ms, min {min(clients):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure Google Wallet passes signed per second.
+
+Compares reading the private key for every pass (the previous behaviour),
+the cached signer, and batch signing on a process pool.
+
+Usage:
+    python -m benchmarks.bench_wallet_signing
+"""
+
+import os
+import time
+import uuid
+
+from google.auth import crypt, jwt
+
+from agentic_ai.wallet_pass_service.generic_pass import GenericPass
+
+PASSES = 500
+TEXT_MODULES = [{"header": "Amul Taaza Milk (1L)", "body": "198.0", "id": "text_module_id"}] * 10
+
+
+def _passes(count: int) -> list[dict]:
+    return [
+        {"object_suffix": str(uuid.uuid4()), "title": "Merchant", "header": "2850.75", "text_modules": TEXT_MODULES}
+        for _ in range(count)
+    ]
+
+
+def _report(name: str, count: int, seconds: float):
+    print(f"{name:<32}{count:>8}{seconds * 1000:>12.1f}{count / seconds:>14.1f}")
+
+
+def main():
+    generic_pass = GenericPass()
+    passes = _passes(PASSES)
+    print(f"{'mode':<32}{'passes':>8}{'total ms':>12}{'passes/sec':>14}")
+
+    start_time = time.perf_counter()
+    for new_pass in passes:
+        signer = crypt.RSASigner.from_service_account_file(generic_pass.key_file_path)
+        jwt.encode(signer, generic_pass.build_claims(**new_pass))
+    _report("key loaded per pass (before)", PASSES, time.perf_counter() - start_time)
+
+    generic_pass.signer  # Load the key outside of the measure
+    start_time = time.perf_counter()
+    for new_pass in passes:
+        generic_pass.create_jwt_new_objects(**new_pass)
+    _report("cached signer", PASSES, time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    generic_pass.create_jwts_new_objects(passes)
+    _report("batch, in process", PASSES, time.perf_counter() - start_time)
+
+    processes = os.cpu_count() or 1
+    if processes > 1:
+        start_time = time.perf_counter()
+        generic_pass.create_jwts_new_objects(passes, processes=processes)
+        _report(f"batch, {processes} processes", PASSES, time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""In-process stand-ins for the cloud services, with a configurable latency."""
+
+import copy
+import threading
+import time
+
+
+class FakeArtifactService:
+    """Dict backed artifact service mimicking the GcsArtifactService calls used by the backend.
+
+    Attributes:
+        latency: Seconds slept by every call, to emulate a GCS round-trip.
+        calls: Number of calls per method.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = {"list_versions": 0, "save_artifact": 0, "load_artifact": 0}
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+        time.sleep(self.latency)
+
+    def list_versions(self, app_name, user_id, session_id, filename):
+        self._call("list_versions")
+        return [0] if (app_name, user_id, session_id, filename) in self._artifacts else []
+
+    def save_artifact(self, app_name, user_id, session_id, filename, artifact):
+        self._call("save_artifact")
+        self._artifacts[(app_name, user_id, session_id, filename)] = artifact
+        return 0
+
+    def load_artifact(self, app_name, user_id, session_id, filename):
+        self._call("load_artifact")
+        return self._artifacts.get((app_name, user_id, session_id, filename))
+
+
+def _merge(stored: dict, fields: dict, nested: bool) -> dict:
+    """Apply the fields of a set, merge or update to a stored document, with their increments and deletions."""
+    from google.cloud.firestore_v1.transforms import DELETE_FIELD, Increment
+
+    for name, value in fields.items():
+        if value is DELETE_FIELD:
+            stored.pop(name, None)
+        elif isinstance(value, Increment):
+            stored[name] = stored.get(name, 0) + value.value
+        elif nested and isinstance(value, dict) and isinstance(stored.get(name), dict):
+            _merge(stored[name], value, nested)
+        elif nested and isinstance(value, dict):
+            stored[name] = _merge({}, value, nested)
+        else:
+            stored[name] = copy.deepcopy(value)
+    return stored
+
+
+class _FakeDocumentReference:
+    def __init__(self, collection: "_FakeCollection", document_id: str):
+        self.collection = collection
+        self.id = document_id
+
+
+class _FakeSnapshot:
+    def __init__(self, reference: _FakeDocumentReference, document, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = document is not None
+        self.update_time = update_time
+        self._document = document
+
+    def to_dict(self):
+        return copy.deepcopy(self._document)
+
+    def get(self, field):
+        return self._document.get(field)
+
+
+class _FakeQuery:
+    """A collection filtered on field equalities, the FieldFilter("field", "==", value) of the repository."""
+
+    def __init__(self, collection: "_FakeCollection", filters=()):
+        self.collection = collection
+        self.filters = filters
+
+    def where(self, filter):
+        return _FakeQuery(self.collection, (*self.filters, (filter.field_path, filter.value)))
+
+    def select(self, fields):
+        return self
+
+    def stream(self):
+        time.sleep(self.collection.firestore.latency)
+        with self.collection.firestore._lock:
+            documents = list(self.collection.documents.items())
+        for document_id, document in documents:
+            if all(document.get(field) == value for field, value in self.filters):
+                yield _FakeSnapshot(_FakeDocumentReference(self.collection, document_id), document)
+
+
+class _FakeCollection:
+    def __init__(self, firestore: "FakeFirestore", name: str):
+        self.firestore = firestore
+        self.name = name
+        self.documents = {}
+        self.update_times = {}
+
+    def where(self, filter) -> _FakeQuery:
+        return _FakeQuery(self).where(filter)
+
+    def select(self, fields) -> _FakeQuery:
+        return _FakeQuery(self)
+
+    def stream(self):
+        return _FakeQuery(self).stream()
+
+    def document(self, document_id: str | None = None) -> _FakeDocumentReference:
+        if document_id is None:
+            with self.firestore._lock:
+                self.firestore._next_id += 1
+                document_id = f"auto-{self.firestore._next_id}"
+        return _FakeDocumentReference(self, document_id)
+
+    def add(self, document) -> None:
+        self.firestore._commit([(self.document(), document, "set", None)])
+
+
+class _FakeWriteOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class _FakeWriteBatch:
+    def __init__(self, firestore: "FakeFirestore"):
+        self.firestore = firestore
+        self.writes = []
+
+    def set(self, reference, document, merge=False):
+        self.writes.append((reference, document, "merge" if merge else "set", None))
+
+    def create(self, reference, document):
+        self.writes.append((reference, document, "create", None))
+
+    def update(self, reference, fields, option=None):
+        self.writes.append((reference, fields, "update", option))
+
+    def commit(self):
+        self.firestore._commit(self.writes)
+
+
+class _FakeTransaction:
+    """The transaction calls used by firestore.transactional and the repository.
+
+    Transactions run one at a time, as Firestore serializes the ones writing the same documents.
+    """
+
+    _max_attempts = 5
+    _read_only = False
+
+    def __init__(self, firestore: "FakeFirestore"):
+        self.firestore = firestore
+        self.writes = []
+        self._id = None
+        self._locked = False
+
+    def _clean_up(self):
+        self.writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self.firestore._transaction_lock.acquire()
+        self._locked = True
+        self._id = b"fake-transaction"
+
+    def _release(self):
+        if self._locked:
+            self._locked = False
+            self.firestore._transaction_lock.release()
+
+    def get_all(self, references):
+        return self.firestore.get_all(references)
+
+    def set(self, reference, document):
+        self.writes.append((reference, document, "set", None))
+
+    def delete(self, reference):
+        self.writes.append((reference, None, "delete", None))
+
+    def _commit(self):
+        try:
+            self.firestore._commit(self.writes)
+        finally:
+            self._release()
+
+    def _rollback(self):
+        self._release()
+
+
+class FakeFirestore:
+    """Dict backed Firestore client, for the calls used by the receipt imports and the rollup checks.
+
+    Attributes:
+        latency: Seconds slept by every round-trip.
+        failure_rate: Fraction of the commits failing with ServiceUnavailable, before anything is written.
+        round_trips: Number of write round-trips.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 42):
+        import random
+
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.round_trips = 0
+        self._collections = {}
+        self._random = random.Random(seed)
+        self._next_id = 0
+        self._update_time = 0
+        self._lock = threading.Lock()
+        self._transaction_lock = threading.Lock()
+
+    def _commit(self, writes) -> None:
+        from google.api_core.exceptions import AlreadyExists, FailedPrecondition, ServiceUnavailable
+
+        time.sleep(self.latency)
+        with self._lock:
+            self.round_trips += 1
+            if self._random.random() < self.failure_rate:
+                raise ServiceUnavailable("Fake transient failure")
+            # Preconditions are checked before anything is written, a batch is all or nothing
+            for reference, _, kind, option in writes:
+                stored = reference.collection.documents.get(reference.id)
+                if kind == "create" and stored is not None:
+                    raise AlreadyExists(f"Document {reference.id} already exists")
+                if kind == "update" and (
+                    stored is None
+                    or option is not None
+                    and reference.collection.update_times.get(reference.id) != option.last_update_time
+                ):
+                    raise FailedPrecondition(f"Document {reference.id} changed or missing")
+            for reference, document, kind, _ in writes:
+                self._update_time += 1
+                if kind == "delete":
+                    reference.collection.documents.pop(reference.id, None)
+                    reference.collection.update_times.pop(reference.id, None)
+                    continue
+                stored = reference.collection.documents.get(reference.id) if kind in ("merge", "update") else None
+                reference.collection.documents[reference.id] = _merge(
+                    copy.deepcopy(stored) if stored is not None else {}, document, nested=kind == "merge"
+                )
+                reference.collection.update_times[reference.id] = self._update_time
+
+    def get_all(self, references):
+        time.sleep(self.latency)
+        with self._lock:
+            return [
+                _FakeSnapshot(
+                    reference,
+                    copy.deepcopy(reference.collection.documents.get(reference.id)),
+                    reference.collection.update_times.get(reference.id),
+                )
+                for reference in references
+            ]
+
+    def write_option(self, last_update_time):
+        return _FakeWriteOption(last_update_time)
+
+    def collection(self, name: str) -> _FakeCollection:
+        with self._lock:
+            return self._collections.setdefault(name, _FakeCollection(self, name))
+
+    def batch(self) -> _FakeWriteBatch:
+        return _FakeWriteBatch(self)
+
+    def transaction(self) -> _FakeTransaction:
+        return _FakeTransaction(self)
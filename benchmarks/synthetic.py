@@ -0,0 +1,100 @@
+"""Synthetic purchase histories derived from the demo dataset, used by the benchmarks."""
+
+import copy
+import datetime
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "agentic_ai", "datasetv2.json")
+
+
+def load_dataset() -> List[Dict[str, Any]]:
+    """Load the 44 demo receipts from datasetv2.json."""
+    with open(DATASET_PATH, "r") as file:
+        return json.load(file)
+
+
+def make_history(scale: int, seed: int = 42, days: int = 730) -> List[Dict[str, Any]]:
+    """Build a synthetic history `scale` times the size of the demo dataset.
+
+    Every copy of a demo receipt is moved to a random day in the last `days`
+    days and its prices are jittered by up to 10%, so that aggregations see
+    realistic spread of months, merchants and prices.
+
+    Args:
+        scale: Number of copies of the demo dataset.
+        seed: Seed of the random generator, for reproducible runs.
+        days: Time span of the generated history.
+
+    Returns:
+        List[Dict[str, Any]]: The generated receipts.
+    """
+    rng = random.Random(seed)
+    dataset = load_dataset()
+    today = datetime.datetime.now().replace(second=0, microsecond=0)
+    history = []
+
+    for _ in range(scale):
+        for receipt in dataset:
+            receipt = copy.deepcopy(receipt)
+            purchased_at = today - datetime.timedelta(days=rng.randrange(days), minutes=rng.randrange(1440))
+            receipt["purchasedAt"] = purchased_at.strftime("%d-%m-%Y %H:%M")
+            total = 0.0
+            for item in receipt["items"]:
+                factor = rng.uniform(0.9, 1.1)
+                item["unitPrice"] = round(item["unitPrice"] * factor, 2)
+                item["totalPrice"] = round(item["unitPrice"] * item["quantity"], 2)
+                total += item["totalPrice"]
+            receipt["totalAmount"] = round(total, 2)
+            history.append(receipt)
+
+    return history
+
+
+def render_receipt_image(receipt: Dict[str, Any], kind: str = "photo", seed: int = 42) -> bytes:
+    """Render a receipt the way users upload it.
+
+    Args:
+        receipt: A receipt of the demo dataset.
+        kind: "photo" for a 12 MP phone JPEG of the receipt on a table, taken sideways
+            with an EXIF orientation tag, "scan" for a 300 dpi grey PNG scan of an A4 page.
+        seed: Seed of the random generator, for reproducible runs.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    import io
+
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    lines = [receipt.get("merchantName") or "", receipt.get("purchasedAt") or "", f"No. {receipt.get('purchaseNumber')}", ""]
+    for item in receipt.get("items") or []:
+        lines.append(f"{str(item.get('name'))[:28]:<28} {item.get('quantity')} x {item.get('unitPrice')}  {item.get('totalPrice')}")
+    lines += ["", f"TAX {receipt.get('taxAmount')}", f"TOTAL {receipt.get('totalAmount')} {receipt.get('currency')}"]
+
+    if kind == "scan":
+        image = Image.new("L", (2480, 3508), 255)
+        paper = (600, 200, 1880, 300 + 70 * len(lines))
+        ImageDraw.Draw(image).multiline_text((660, 260), "\n".join(lines), fill=30, font_size=40, spacing=30)
+        buffer = io.BytesIO()
+        image.crop((0, 0, 2480, min(3508, paper[3] + 400))).save(buffer, "PNG")
+        return buffer.getvalue()
+
+    # Table texture, receipt paper and text, slightly rotated and blurred like a hand-held photo
+    image = Image.effect_noise((4032, 3024), 40).convert("RGB")
+    image = Image.blend(image, Image.new("RGB", image.size, (120, 90, 60)), 0.7)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((1200, 150, 2900, 2900), fill=(245, 243, 236))
+    draw.multiline_text((1300, 250), "\n".join(lines), fill=(40, 40, 40), font_size=54, spacing=40)
+    image = image.rotate(rng.uniform(-3, 3), resample=Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(1.2))
+    noise = Image.effect_noise(image.size, 12).convert("RGB")
+    image = Image.blend(image, noise, 0.08)
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Taken in portrait, stored sideways
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
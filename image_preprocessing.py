@@ -0,0 +1,189 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageChops, ImageOps
+
+# Output formats understood by both Gemini and the browsers showing the attachments
+OUTPUT_MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+# EXIF tag telling how the camera was held, 1 is upright
+ORIENTATION_TAG = 0x0112
+
+# Difference with the corner colour above which a pixel belongs to the content, out of 255
+MARGIN_THRESHOLD = 24
+
+# The JPEG decoder may shrink an image to down to this fraction of the maximum dimension,
+# decoding at half the size is about four times faster than decoding and then resizing
+DRAFT_TOLERANCE = 0.9
+
+# WebP encoder effort, higher methods were slower without making receipts smaller, see bench_image_preprocessing
+WEBP_METHOD = 2
+
+# Images that fit the maximum dimension and are smaller than this are kept as uploaded,
+# processing them costs more time than their upload
+SMALL_IMAGE_BYTES = 256 * 1024
+
+# Side of the thumbnail the margins are searched on, and content kept around them
+MARGIN_SEARCH_SIZE = 256
+MARGIN_PADDING = 0.02
+
+
+def _crop_margins(image: Image.Image) -> Image.Image:
+    """Crop the uniform borders around the content of an image, e.g. of a scan or a screenshot.
+
+    The border colour is read from the top left corner, and the content box is
+    searched on a small grey thumbnail so that this stays cheap on large photos.
+    """
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((MARGIN_SEARCH_SIZE, MARGIN_SEARCH_SIZE))
+    background = Image.new("L", thumbnail.size, thumbnail.getpixel((0, 0)))
+    difference = ImageChops.difference(thumbnail, background).point(lambda value: 255 if value > MARGIN_THRESHOLD else 0)
+    box = difference.getbbox()
+    if box is None:
+        return image
+
+    scale_x, scale_y = image.width / thumbnail.width, image.height / thumbnail.height
+    padding_x, padding_y = image.width * MARGIN_PADDING, image.height * MARGIN_PADDING
+    left = max(0, int(box[0] * scale_x - padding_x))
+    top = max(0, int(box[1] * scale_y - padding_y))
+    right = min(image.width, int(box[2] * scale_x + padding_x))
+    bottom = min(image.height, int(box[3] * scale_y + padding_y))
+    if (right - left) * (bottom - top) >= image.width * image.height * 0.95:
+        return image
+    return image.crop((left, top, right, bottom))
+
+
+class ImagePreprocessor:
+    """Shrinks uploaded images before they are stored and sent to the model.
+
+    Every image is oriented from its EXIF tag, cropped to its content, downsized
+    so that its longest side fits `max_dimension` and re-encoded. Grey images
+    stay grey, which keeps scanned receipts small. Files that are not images,
+    cannot be decoded, or would not get smaller are kept as uploaded.
+
+    Decoding, resizing and encoding release the GIL, so the work runs in a
+    thread pool bounded to the number of CPUs, separate from the upload pool.
+
+    Attributes:
+        max_dimension: Maximum width and height of the processed images, in pixels.
+        output_format: Format of the processed images, "WEBP" or "JPEG".
+        quality: Encoder quality of the processed images, from 1 to 100.
+        crop_margins: Crop the uniform borders around the content.
+        enabled: Process the images, False keeps every upload as is.
+    """
+
+    def __init__(
+        self,
+        max_dimension: int = 2048,
+        output_format: str = "WEBP",
+        quality: int = 85,
+        crop_margins: bool = True,
+        enabled: bool = True,
+        workers: int | None = None,
+    ):
+        if output_format not in OUTPUT_MIME_TYPES:
+            raise ValueError(f"Unsupported image output format {output_format}, expected one of {list(OUTPUT_MIME_TYPES)}")
+        self.max_dimension = max_dimension
+        self.output_format = output_format
+        self.quality = quality
+        self.crop_margins = crop_margins
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count(), thread_name_prefix="image-preprocess")
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._kept = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def _encode(self, image: Image.Image) -> bytes:
+        if image.mode not in ("L", "RGB"):
+            if "A" in image.getbands() or image.mode == "P":
+                # Transparent pixels become white, the colour of the paper
+                image = image.convert("RGBA")
+                flattened = Image.new("RGB", image.size, "white")
+                flattened.paste(image, mask=image.getchannel("A"))
+                image = flattened
+            else:
+                image = image.convert("RGB")
+        buffer = io.BytesIO()
+        if self.output_format == "WEBP":
+            image.save(buffer, "WEBP", quality=self.quality, method=WEBP_METHOD)
+        else:
+            image.save(buffer, "JPEG", quality=self.quality, optimize=True)
+        return buffer.getvalue()
+
+    def process(self, data: bytes, mime_type: str) -> tuple[bytes, str]:
+        """Process an image in the calling thread.
+
+        Args:
+            data: The uploaded bytes
+            mime_type: MIME type of the upload
+
+        Returns:
+            tuple[bytes, str]: The processed bytes and their MIME type, or the upload as is
+        """
+        if not self.enabled or not mime_type.startswith("image/"):
+            return data, mime_type
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                fits = max(image.size) <= self.max_dimension
+                rotated = image.getexif().get(ORIENTATION_TAG, 1) != 1
+                processed = None
+                if not fits or rotated or len(data) >= SMALL_IMAGE_BYTES:
+                    # Let the JPEG decoder downscale while decoding, it keeps at least the requested size
+                    scale = min(1.0, self.max_dimension * DRAFT_TOLERANCE / max(image.size))
+                    image.draft(image.mode, (int(image.width * scale), int(image.height * scale)))
+                    image = ImageOps.exif_transpose(image)
+                    if self.crop_margins:
+                        image = _crop_margins(image)
+                    image.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS)
+                    processed = self._encode(image)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            processed = None
+
+        with self._lock:
+            self._bytes_in += len(data)
+            # A bigger file is still worth it when the image is too large for the model, it has fewer pixels
+            if processed is None or (fits and len(processed) >= len(data)):
+                self._kept += 1
+                self._bytes_out += len(data)
+                return data, mime_type
+            self._processed += 1
+            self._bytes_out += len(processed)
+        return processed, OUTPUT_MIME_TYPES[self.output_format]
+
+    def run(self, data: bytes, mime_type: str) -> tuple[bytes, str]:
+        """Process an image in the worker pool and wait for the result, see `process`."""
+        if not self.enabled or not mime_type.startswith("image/"):
+            return data, mime_type
+        return self._executor.submit(self.process, data, mime_type).result()
+
+    def stats(self) -> dict:
+        """Return the preprocessing counters, for logging and monitoring."""
+        with self._lock:
+            return {
+                "processed": self._processed,
+                "kept": self._kept,
+                "bytes_in": self._bytes_in,
+                "bytes_out": self._bytes_out,
+                "bytes_saved": self._bytes_in - self._bytes_out,
+            }
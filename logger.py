@@ -14,9 +14,21 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import atexit
 import json
 import logging
 import sys
+import threading
+from collections import deque
+
+from settings import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, json is used instead
+    orjson = None
+
+SETTINGS = get_settings()
 
 # Set up structured logging for GCP
 logger = logging.getLogger(__name__)
@@ -27,6 +39,131 @@ handler = logging.StreamHandler(sys.stdout)
 handler.setFormatter(logging.Formatter("%(message)s"))
 logger.addHandler(handler)
 
+_LEVELS = {"ERROR": logging.ERROR, "WARNING": logging.WARNING, "DEBUG": logging.DEBUG}
+_json_encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+
+def encode_entry(log_entry: dict) -> str:
+    """Encode a log entry as a JSON line, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(log_entry, default=str).decode("utf-8")
+        except TypeError:
+            # orjson rejects some values json accepts, e.g. integers over 64 bits
+            pass
+    return _json_encoder.encode(log_entry)
+
+
+class AsyncWriter:
+    """Writes log entries to the handler stream from a background thread.
+
+    Callers encode the entry, so that values mutated after the call are
+    logged as they were, and append the line to a bounded buffer, writing
+    happens on the writer thread, in batches. When the buffer is full the
+    oldest entries are dropped and counted, the count is logged once the
+    writer catches up.
+
+    Attributes:
+        max_queue: Maximum number of entries waiting to be written.
+        written: Number of entries written since the writer started, the drop warnings excluded.
+        dropped: Number of entries dropped since the writer started.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self.written = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, log_entry: dict) -> None:
+        line = encode_entry(log_entry) + "\n"
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(line)
+            if len(self._queue) == 1:
+                self._condition.notify()
+
+    def _drain(self) -> list:
+        """Wait for lines and take them all, returns an empty list when stopping. Must hold the lock."""
+        while not self._queue and not self._stopping:
+            self._condition.wait()
+        lines = list(self._queue)
+        self._queue.clear()
+        self.written += len(lines)
+        if self.dropped != self._reported_dropped:
+            warning_entry = {
+                "severity": "WARNING",
+                "message": "Log entries dropped, the log writer could not keep up",
+                "dropped": self.dropped - self._reported_dropped,
+                "total_dropped": self.dropped,
+            }
+            lines.append(encode_entry(warning_entry) + "\n")
+            self._reported_dropped = self.dropped
+        return lines
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                lines = self._drain()
+                if not lines and self._stopping:
+                    return
+            try:
+                handler.acquire()
+                try:
+                    handler.stream.write("".join(lines))
+                    handler.flush()
+                finally:
+                    handler.release()
+            except Exception:  # pragma: no cover - a broken stream must not kill the writer
+                pass
+
+    def stop(self) -> None:
+        """Write the buffered entries and stop the writer thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+
+
+_ASYNC_WRITER = None
+
+
+def start_async_writer(max_queue: int = SETTINGS.LOG_QUEUE_SIZE) -> None:
+    """Switch to asynchronous logging, entries are written by a background thread."""
+    global _ASYNC_WRITER
+    if _ASYNC_WRITER is None:
+        _ASYNC_WRITER = AsyncWriter(max_queue)
+
+
+def stop_async_writer() -> AsyncWriter | None:
+    """Write the buffered entries and switch back to synchronous logging.
+
+    Returns:
+        AsyncWriter | None: The stopped writer, for its counters, None if logging was synchronous
+    """
+    global _ASYNC_WRITER
+    writer, _ASYNC_WRITER = _ASYNC_WRITER, None
+    if writer is not None:
+        writer.stop()
+    return writer
+
+
+def dropped_count() -> int:
+    """Return the number of entries dropped by the asynchronous writer."""
+    return _ASYNC_WRITER.dropped if _ASYNC_WRITER is not None else 0
+
+
+if SETTINGS.LOG_ASYNC:
+    start_async_writer()
+atexit.register(stop_async_writer)
+
 
 def log_structured(severity, message, **kwargs):
     """
@@ -37,9 +174,16 @@ def log_structured(severity, message, **kwargs):
         message: The main log message
         **kwargs: Additional key-value pairs to include in the log
     """
+    if not logger.isEnabledFor(_LEVELS.get(severity, logging.INFO)):
+        return
     log_entry = {"severity": severity, "message": message, **kwargs}
 
-    json_entry = json.dumps(log_entry)
+    writer = _ASYNC_WRITER
+    if writer is not None:
+        writer.put(log_entry)
+        return
+
+    json_entry = encode_entry(log_entry)
     if severity == "ERROR":
         logger.error(json_entry)
     elif severity == "WARNING":
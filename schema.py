@@ -60,3 +60,49 @@ class ChatResponse(BaseModel):
     thinking_process: str = ""
     attachments: List[ImageData] = []
     error: Optional[str] = None
+
+
+class ReceiptItem(BaseModel):
+    """Model for an item of a receipt.
+
+    Attributes:
+        name: Name of the item.
+        category: Category of the item, e.g. "Groceries".
+        quantity: Quantity bought, may be fractional, e.g. 0.5 for weighed goods.
+        unitPrice: Price of one unit.
+        totalPrice: Price of the whole quantity.
+        isSubscription: Whether the item is a recurring subscription.
+        tax: Tax charged on the item.
+    """
+
+    name: str
+    category: Optional[str] = None
+    quantity: Optional[float] = None
+    unitPrice: Optional[float] = None
+    totalPrice: Optional[float] = None
+    isSubscription: Optional[bool] = None
+    tax: Optional[float] = None
+
+
+class Receipt(BaseModel):
+    """Model for a receipt, as stored by the save_attachment_data tool.
+
+    Attributes:
+        merchantName: Name of the merchant.
+        purchasedAt: Purchase time, e.g. "2025-06-01 19:30:00" or "01-06-2025 19:30".
+        totalAmount: Total amount paid.
+        currency: Currency of the amounts, e.g. "INR".
+        taxAmount: Total tax of the receipt.
+        purchaseNumber: Receipt or invoice number.
+        paymentMethod: Payment method, e.g. "Card".
+        items: Items of the receipt.
+    """
+
+    merchantName: str
+    purchasedAt: str
+    totalAmount: float
+    currency: Optional[str] = None
+    taxAmount: Optional[float] = None
+    purchaseNumber: Optional[str] = None
+    paymentMethod: Optional[str] = None
+    items: List[ReceiptItem] = []
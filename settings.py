@@ -20,7 +20,8 @@ from pydantic_settings import (
     YamlConfigSettingsSource,
     PydanticBaseSettingsSource,
 )
-from typing import Type, Tuple
+from typing import Optional, Type, Tuple
+import functools
 
 
 class Settings(BaseSettings):
@@ -35,6 +36,43 @@ class Settings(BaseSettings):
         BACKEND_URL: URL for the backend service API endpoint.
         STORAGE_BUCKET_NAME: Name of the Google Cloud Storage bucket for storing receipts.
         DB_COLLECTION_NAME: Name of the Firestore collection for storing receipts.
+        PURCHASE_CACHE_MAX_USERS: Maximum number of users whose purchase history is cached in memory.
+        PURCHASE_CACHE_TTL_SECONDS: Time to live of a cached purchase history, bounds staleness across workers.
+        ARTIFACT_CACHE_DIR: Directory of the on-disk image cache, defaults to a directory in the system temp dir.
+        ARTIFACT_CACHE_MEMORY_BYTES: Byte budget of the in-memory image cache.
+        ARTIFACT_CACHE_DISK_BYTES: Byte budget of the on-disk image cache, 0 disables it.
+        ARTIFACT_UPLOAD_WORKERS: Maximum number of attachments decoded and uploaded in parallel.
+        ARTIFACT_INDEX_PATH: File of the persisted index of images stored in GCS, defaults to the system temp dir.
+        HISTORY_TOKEN_BUDGET: Estimated number of tokens the conversation history sent to the model is compacted to, 0 only deduplicates tool results.
+        HISTORY_KEEP_RECENT_TURNS: Number of most recent user turns sent to the model without compaction.
+        TRACING_ENABLED: Log tool, callback, Firestore and GCS spans with their durations and payload sizes.
+        TRACE_SAMPLE_RATE: Fraction of the traces logged when tracing is enabled, decided at the root span.
+        LOG_ASYNC: Write the logs from a background thread instead of the request thread, entries are dropped
+            when LOG_QUEUE_SIZE are waiting. Off by default, so that no log entry is lost.
+        LOG_QUEUE_SIZE: Maximum number of log entries waiting to be written, the oldest are dropped beyond it.
+        SCREEN_CACHE_MAX_ENTRIES: Maximum number of cached Dashboard and Insights responses.
+        SCREEN_CACHE_MAX_BYTES: Maximum total size of the cached screen responses.
+        SCREEN_CACHE_TTL_SECONDS: Time to live of a cached screen response, bounds staleness across workers.
+        IMAGE_PREPROCESSING_ENABLED: Orient, crop, downsize and re-encode the uploaded images before storing them
+            and sending them to the model. Off by default, the originals are stored and sent unchanged.
+        IMAGE_MAX_DIMENSION: Maximum width and height of the preprocessed images, in pixels.
+        IMAGE_OUTPUT_FORMAT: Format of the preprocessed images, "WEBP" or "JPEG".
+        IMAGE_QUALITY: Encoder quality of the preprocessed images, from 1 to 100.
+        IMAGE_CROP_MARGINS: Crop the uniform borders around the uploaded images.
+        IMAGE_PREPROCESS_WORKERS: Maximum number of images preprocessed in parallel, defaults to the number of CPUs.
+        IMPORT_COMMIT_WORKERS: Number of batches committed in parallel by the bulk import.
+        IMPORT_MAX_RETRIES: Number of retries of a bulk import batch failing with a transient error.
+        WRITE_BEHIND_ENABLED: Acknowledge saved receipts once written to a local journal, and store them in the background.
+        WRITE_BEHIND_JOURNAL_DIR: Directory of the write-behind journals and of the receipts the database refused
+            (dead-letter.jsonl), must survive restarts, defaults to a directory in the system temp dir.
+        WRITE_BEHIND_BATCH_SIZE: Maximum number of journaled receipts stored in one batch.
+        WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: Maximum time a journaled receipt waits before being stored.
+        WRITE_BEHIND_READ_TIMEOUT_SECONDS: Maximum time a purchase query waits for the user's journaled receipts to be written.
+        PURCHASE_REPOSITORY: Storage of the receipts, "firestore" or "sqlite" for a local database.
+        SQLITE_DATABASE_PATH: File of the SQLite database when PURCHASE_REPOSITORY is "sqlite".
+        DB_ROLLUP_COLLECTION_NAME: Name of the Firestore collection of the monthly rollups, defaults to DB_COLLECTION_NAME followed by "-monthly-rollups".
+        LIGHT_MODEL_NAME: Lighter model used for the intents needing little reasoning, e.g. "gemini-2.5-flash-lite", None keeps the agent's model.
+        ARTIFACT_INDEX_AUTHORITATIVE: Upload the images missing from the artifact index without asking GCS, only for a single worker whose index file survives restarts.
     """
 
     GCLOUD_LOCATION: str
@@ -42,6 +80,40 @@ class Settings(BaseSettings):
     BACKEND_URL: str = "http://localhost:8081/chat"
     STORAGE_BUCKET_NAME: str = "personal-expense-assistant-receipts"
     DB_COLLECTION_NAME: str = "personal-expense-assistant-receipts"
+    PURCHASE_CACHE_MAX_USERS: int = 256
+    PURCHASE_CACHE_TTL_SECONDS: float = 60.0
+    ARTIFACT_CACHE_DIR: Optional[str] = None
+    ARTIFACT_CACHE_MEMORY_BYTES: int = 64 * 1024 * 1024
+    ARTIFACT_CACHE_DISK_BYTES: int = 1024 * 1024 * 1024
+    ARTIFACT_INDEX_PATH: Optional[str] = None
+    ARTIFACT_UPLOAD_WORKERS: int = 8
+    HISTORY_TOKEN_BUDGET: int = 32000
+    HISTORY_KEEP_RECENT_TURNS: int = 2
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 1.0
+    LOG_ASYNC: bool = False
+    LOG_QUEUE_SIZE: int = 10000
+    LIGHT_MODEL_NAME: Optional[str] = None
+    SCREEN_CACHE_MAX_ENTRIES: int = 1024
+    SCREEN_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    SCREEN_CACHE_TTL_SECONDS: float = 300.0
+    IMAGE_PREPROCESSING_ENABLED: bool = False
+    IMAGE_MAX_DIMENSION: int = 2048
+    IMAGE_OUTPUT_FORMAT: str = "WEBP"
+    IMAGE_QUALITY: int = 85
+    IMAGE_CROP_MARGINS: bool = True
+    IMAGE_PREPROCESS_WORKERS: Optional[int] = None
+    IMPORT_COMMIT_WORKERS: int = 8
+    IMPORT_MAX_RETRIES: int = 5
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_JOURNAL_DIR: Optional[str] = None
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = 0.5
+    WRITE_BEHIND_READ_TIMEOUT_SECONDS: float = 5.0
+    PURCHASE_REPOSITORY: str = "firestore"
+    SQLITE_DATABASE_PATH: str = "purchases.db"
+    DB_ROLLUP_COLLECTION_NAME: Optional[str] = None
+    ARTIFACT_INDEX_AUTHORITATIVE: bool = False
 
     model_config = SettingsConfigDict(
         yaml_file="settings.yaml", yaml_file_encoding="utf-8"
@@ -83,12 +155,14 @@ class Settings(BaseSettings):
         )
 
 
+@functools.cache
 def get_settings() -> Settings:
     """Create and return a Settings instance with loaded configuration.
 
     Initializes a Settings object that loads configuration values from
     environment variables and the YAML configuration file, with environment
-    variables taking precedence.
+    variables taking precedence. The instance is created once and shared,
+    call `get_settings.cache_clear()` to reload the configuration.
 
     Returns:
         A fully configured Settings instance containing all application configuration.
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The settings require a project, the tests never reach Google Cloud
+os.environ.setdefault("GCLOUD_LOCATION", "us-central1")
+os.environ.setdefault("GCLOUD_PROJECT_ID", "test-project")
+os.environ.setdefault("LOG_ASYNC", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from artifact_cache import ArtifactCache
+
+
+def _cache(directory, memory=1024 * 1024, disk=1024 * 1024) -> ArtifactCache:
+    return ArtifactCache(directory=str(directory), max_memory_bytes=memory, max_disk_bytes=disk)
+
+
+def test_disk_tier_serves_artifacts_after_a_restart(tmp_path):
+    _cache(tmp_path).put("user", "abcdef01", b"image bytes", "image/webp")
+    cache = _cache(tmp_path)
+    assert cache.get("user", "abcdef01") == (b"image bytes", "image/webp")
+    assert cache.get_base64("user", "abcdef01") == ("aW1hZ2UgYnl0ZXM=", "image/webp")
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_disk_tier_evicts_least_recently_used_files(tmp_path):
+    cache = _cache(tmp_path, memory=0, disk=70)
+    for image_hash in ("aaaaaa", "bbbbbb", "cccccc"):
+        cache.put("user", image_hash, b"x" * 20, "image/webp")
+    assert cache.get("user", "aaaaaa") is None
+    assert cache.get("user", "cccccc") == (b"x" * 20, "image/webp")
+    assert cache.stats()["disk_bytes"] <= 70
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_a_missing_file_is_a_miss(tmp_path):
+    cache = _cache(tmp_path, memory=0)
+    cache.put("user", "abcdef01", b"image bytes", "image/webp")
+    for name in os.listdir(tmp_path):
+        os.remove(tmp_path / name)
+    assert cache.get("user", "abcdef01") is None
+    assert cache.stats()["disk_bytes"] == 0
+
+
+def test_lookups_do_not_wait_for_disk_writes(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("user", "aaaaaa", b"cached", "image/webp")
+    writing, release = threading.Event(), threading.Event()
+    write_file = cache._write_file
+
+    def slow_write_file(key, data, mime_type):
+        writing.set()
+        assert release.wait(5)
+        write_file(key, data, mime_type)
+
+    cache._write_file = slow_write_file
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        put = executor.submit(cache.put, "user", "bbbbbb", b"slow", "image/webp")
+        assert writing.wait(5)
+        assert cache.get("user", "aaaaaa") == (b"cached", "image/webp")
+        assert cache.get("user", "bbbbbb") == (b"slow", "image/webp")
+        release.set()
+        put.result()
+    assert cache.stats()["disk_bytes"] == 2 * len(b"image/webp\n") + len(b"cached") + len(b"slow")
+
+
+def test_concurrent_puts_and_gets_stay_consistent(tmp_path):
+    cache = _cache(tmp_path, memory=2000, disk=4000)
+    image_hashes = [f"{index:08x}" for index in range(64)]
+
+    def work(index):
+        image_hash = image_hashes[index % len(image_hashes)]
+        cache.put("user", image_hash, image_hash.encode() * 10, "image/webp")
+        cached = cache.get("user", image_hashes[(index * 7) % len(image_hashes)])
+        assert cached is None or cached[0] == image_hashes[(index * 7) % len(image_hashes)].encode() * 10
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(500)))
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 4000
+    assert stats["memory_bytes"] <= 2000
+    files = [name for name in os.listdir(tmp_path)]
+    assert not [name for name in files if name.endswith(".tmp")]
+    assert sum(os.path.getsize(tmp_path / name) for name in files) == stats["disk_bytes"]
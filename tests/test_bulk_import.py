@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+from agentic_ai import bulk_import
+from agentic_ai.bulk_import import import_receipts, iter_records
+from agentic_ai.purchase_queries import build_index_fields
+from agentic_ai.purchase_repository import FirestorePurchaseRepository
+from agentic_ai.receipt_dedup import purchase_document_id, purchase_key
+from agentic_ai.sqlite_repository import SQLitePurchaseRepository
+from benchmarks.fakes import FakeFirestore
+
+USER_ID = "user-1"
+RECEIPT = {
+    "merchantName": "Fresh Mart",
+    "purchasedAt": "2025-06-01 10:00",
+    "purchaseNumber": "INV-1",
+    "totalAmount": 280,
+    "items": [{"name": "Milk", "category": "Dairy", "totalPrice": 280, "quantity": 2}],
+}
+
+
+@pytest.fixture(params=["sqlite", "firestore"])
+def repository(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLitePurchaseRepository(str(tmp_path / "purchases.db"))
+    return FirestorePurchaseRepository("project", "receipts", client=FakeFirestore())
+
+
+def test_an_import_keeps_the_fingerprints_of_a_saved_receipt(repository):
+    key = purchase_key(RECEIPT)
+    document = {"user_id": USER_ID, "data": RECEIPT, **build_index_fields(RECEIPT)}
+    document.update(purchaseKey=key, imageFingerprints=["ab12"])
+    repository.create(purchase_document_id(USER_ID, key), document)
+
+    imported = dict(RECEIPT, paymentMethod="Card")
+    report = import_receipts(io.StringIO(json.dumps([imported])), USER_ID, repository=repository)
+
+    assert report["imported"] == 1
+    assert repository.load_fingerprints(USER_ID) == [("ab12", key)]
+    assert [receipt.get("paymentMethod") for receipt in repository.load_history(USER_ID).values()] == ["Card"]
+
+
+def test_new_fingerprints_replace_the_stored_ones(repository):
+    document = {"user_id": USER_ID, "data": RECEIPT, "purchaseKey": "key", "imageFingerprints": ["ab12"]}
+    repository.write_batch([("receipt", document)])
+    repository.write_batch([("receipt", {**document, "imageFingerprints": ["cd34"]})])
+
+    assert repository.load_fingerprints(USER_ID) == [("cd34", "key")]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Elements and separators are split across reads
+    monkeypatch.setattr(bulk_import, "READ_CHUNK_SIZE", 3)
+
+
+@pytest.mark.parametrize(
+    "text, records",
+    [
+        ('[[1],{"b":2}]', [[1], {"b": 2}]),
+        (' [ 12345678 , {"x": "a]b,c"} ]\n', [12345678, {"x": "a]b,c"}]),
+        ("[]", []),
+    ],
+)
+def test_json_arrays_are_read_whole(small_chunks, text, records):
+    assert [record for _, record in iter_records(io.StringIO(text))] == records
+
+
+@pytest.mark.parametrize(
+    "text, records, error",
+    [
+        ('[{"a":1}] [{"z":9}]', [{"a": 1}], "after the JSON array"),
+        ("[1,]", [1], "element after"),
+        ("[1 2]", [1], "found '2'"),
+        ("[1, 2", [1, 2], "end of the file"),
+    ],
+)
+def test_malformed_json_arrays_are_reported(small_chunks, text, records, error):
+    read = []
+    with pytest.raises(ValueError, match=error):
+        for _, record in iter_records(io.StringIO(text)):
+            read.append(record)
+    assert read == records
+
+
+def test_a_json_object_is_not_read_as_an_array():
+    with pytest.raises(ValueError, match="Expected a JSON array"):
+        next(bulk_import._iter_json_array(io.StringIO('{"a": 1}')))
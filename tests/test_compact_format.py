@@ -0,0 +1,43 @@
+import json
+
+from agentic_ai.compact_format import decode_purchases, encode_purchases
+
+
+def _receipt(**item):
+    return {
+        "merchantName": "Fresh Mart",
+        "purchasedAt": "2025-06-01 10:00",
+        "totalAmount": 280,
+        "items": [{"name": "Milk", "category": "Dairy", **item}],
+    }
+
+
+def test_a_derived_unit_price_is_omitted_and_restored():
+    purchases = [_receipt(totalPrice=280.0, quantity=2, unitPrice=140)]
+    encoded = encode_purchases(purchases)
+    table = json.loads(encoded)
+    assert table["items"][0][table["itemColumns"].index("unitPrice")] is None
+    assert decode_purchases(encoded)[0]["items"][0]["unitPrice"] == 140
+
+
+def test_numeric_strings_are_parsed():
+    purchases = [_receipt(totalPrice="280", quantity="2", unitPrice=140)]
+    item = decode_purchases(encode_purchases(purchases))[0]["items"][0]
+    assert (item["totalPrice"], item["quantity"], item["unitPrice"]) == ("280", "2", 140)
+
+
+def test_invalid_values_keep_the_raw_unit_price():
+    for item in (
+        {"totalPrice": "n/a", "quantity": 2, "unitPrice": 140},
+        {"totalPrice": 280, "quantity": "two", "unitPrice": "140"},
+        {"totalPrice": 280, "quantity": 0, "unitPrice": 140},
+        {"totalPrice": None, "quantity": 2, "unitPrice": 140},
+    ):
+        decoded = decode_purchases(encode_purchases([_receipt(**item)]))[0]["items"][0]
+        assert decoded["unitPrice"] == item["unitPrice"]
+        assert decoded["totalPrice"] == item["totalPrice"]
+
+
+def test_a_missing_unit_price_is_not_invented_from_invalid_values():
+    decoded = decode_purchases(encode_purchases([_receipt(totalPrice="n/a", quantity=2)]))[0]["items"][0]
+    assert decoded["unitPrice"] is None
@@ -0,0 +1,100 @@
+import datetime
+
+from agentic_ai.analytics import PurchaseColumns
+from agentic_ai.insights import InsightsEngine, UserInsights
+
+RECEIPT = {"purchasedAt": "2025-06-01 10:00", "totalAmount": 100.0, "items": []}
+NEW_RECEIPT = {"purchasedAt": "2025-06-02 10:00", "totalAmount": 50.0, "items": []}
+
+
+def _june_total(insights) -> float:
+    return insights.month_totals.get((2025, 6), 0.0)
+
+
+def test_receipts_recorded_after_the_build_are_applied():
+    engine = InsightsEngine(loader=lambda user_id: [RECEIPT])
+    insights = engine.get("user")
+    engine.record_receipt("user", NEW_RECEIPT)
+    assert engine.get("user") is insights
+    assert _june_total(insights) == 150.0
+
+
+def test_a_build_racing_with_a_save_is_not_kept():
+    histories = [[RECEIPT], [RECEIPT, NEW_RECEIPT]]
+
+    def loader(user_id):
+        history = histories.pop(0)
+        if len(history) == 1:
+            # The receipt is saved while the history is being loaded, after it was read
+            engine.record_receipt(user_id, NEW_RECEIPT)
+        return history
+
+    engine = InsightsEngine(loader=loader)
+    assert _june_total(engine.get("user")) == 100.0
+    assert _june_total(engine.get("user")) == 150.0
+    assert histories == []
+
+
+def test_a_build_racing_with_an_invalidation_is_not_kept():
+    calls = []
+
+    def loader(user_id):
+        calls.append(user_id)
+        if len(calls) == 1:
+            engine.invalidate(user_id)
+        return [RECEIPT]
+
+    engine = InsightsEngine(loader=loader)
+    engine.get("user")
+    engine.get("user")
+    engine.get("user")
+    assert len(calls) == 2
+
+
+def test_aggregates_expire_after_the_ttl():
+    calls = []
+    engine = InsightsEngine(loader=lambda user_id: calls.append(user_id) or [RECEIPT], ttl_seconds=0)
+    engine.get("user")
+    engine.get("user")
+    assert len(calls) == 2
+
+
+def test_category_totals_use_the_dashboard_item_amounts():
+    receipt = {
+        "purchasedAt": "2025-06-01 10:00",
+        "totalAmount": 95.0,
+        "items": [
+            {"name": "Eggs", "category": "Dairy", "unitPrice": 20, "quantity": 3},
+            {"name": "Milk", "category": "Dairy", "totalPrice": "35", "unitPrice": 30, "quantity": 1},
+        ],
+    }
+    insights = UserInsights()
+    insights.add_receipt(receipt)
+    assert insights.category_totals == {"Dairy": 95.0}
+    assert PurchaseColumns([receipt]).item_amount.sum() == 95.0
+
+
+def _bought(name, *days):
+    return [{"purchasedAt": f"2025-06-{day:02d} 10:00", "items": [{"name": name}]} for day in days]
+
+
+def _running_low(receipts, today):
+    insights = UserInsights()
+    for receipt in receipts:
+        insights.add_receipt(receipt)
+    return insights.build(now=datetime.datetime(2025, 6, today, 12, 0))["shoppingAlerts"]["runningLow"]
+
+
+def test_overdue_items_are_reported_as_overdue():
+    # Bought every 5 days, last on the 11th, so due on the 16th
+    assert _running_low(_bought("Rice", 1, 6, 11), today=19)["expectedRunOutIn"] == "Overdue by 3 days"
+    assert _running_low(_bought("Rice", 1, 6, 11), today=16)["expectedRunOutIn"] == "0 days"
+
+
+def test_items_not_run_out_are_preferred_to_overdue_ones():
+    receipts = _bought("Rice", 1, 6, 11) + _bought("Milk", 10, 17)
+    assert _running_low(receipts, today=19) == {
+        "itemName": "Milk",
+        "expectedRunOutIn": "5 days",
+        "lastPurchased": "June 17, 2025",
+    }
@@ -0,0 +1,59 @@
+import io
+import json
+import threading
+
+import pytest
+
+import logger
+
+
+class _BlockingStream(io.StringIO):
+    """Stream whose writes wait until released, to fill the queue of the writer."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.released.wait()
+        return super().write(text)
+
+
+@pytest.fixture
+def stream():
+    stream = _BlockingStream()
+    previous = logger.handler.setStream(stream)
+    yield stream
+    stream.released.set()
+    logger.stop_async_writer()
+    logger.handler.setStream(previous)
+
+
+def _entries(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_entries_are_logged_as_they_were_when_logged(stream):
+    logger.start_async_writer(10)
+    attributes = {"count": 1}
+    logger.info("First", attributes=attributes)
+    attributes["count"] = 2
+    stream.released.set()
+    logger.stop_async_writer()
+
+    assert _entries(stream)[0]["attributes"] == {"count": 1}
+
+
+def test_drop_warnings_are_not_counted_as_written_entries(stream):
+    logger.start_async_writer(5)
+    for index in range(50):
+        logger.info("Entry", index=index)
+    stream.released.set()
+    writer = logger.stop_async_writer()
+
+    entries = _entries(stream)
+    warnings = [entry for entry in entries if entry["severity"] == "WARNING"]
+    assert writer.dropped > 0
+    assert writer.written + writer.dropped == 50
+    assert len(entries) == writer.written + len(warnings)
+    assert sum(entry["dropped"] for entry in warnings) == writer.dropped
@@ -0,0 +1,66 @@
+import json
+
+from agentic_ai.purchase_cache import ChangeLog, PurchaseHistoryCache
+
+
+def test_put_refuses_a_history_loaded_before_an_append():
+    cache = PurchaseHistoryCache()
+    token = cache.fetch_token()
+    cache.append("user", {"id": "new"})
+    assert not cache.put("user", [{"id": "old"}], token=token)
+    assert cache.get("user") is None
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_put_refuses_a_history_loaded_before_an_invalidation():
+    cache = PurchaseHistoryCache()
+    token = cache.fetch_token()
+    cache.invalidate("user")
+    assert not cache.put("user", [], token=token)
+
+
+def test_put_accepts_a_history_loaded_after_the_last_change():
+    cache = PurchaseHistoryCache()
+    cache.append("user", {"id": "new"})
+    token = cache.fetch_token()
+    cache.append("other-user", {"id": "unrelated"})
+    assert cache.put("user", [{"id": "new"}], token=token)
+    cache.append("user", {"id": "newer"})
+    assert cache.get("user") == [{"id": "new"}, {"id": "newer"}]
+
+
+def test_forgotten_changes_count_as_changed():
+    changes = ChangeLog(max_users=2)
+    token = changes.token()
+    for user_id in ("a", "b", "c"):
+        changes.record(user_id)
+    assert changes.changed_since("a", token)
+    assert changes.changed_since("unknown", token)
+    assert not changes.changed_since("unknown", changes.token())
+
+
+def test_other_users_are_served_while_a_history_is_serialized():
+    cache = PurchaseHistoryCache()
+    cache.put("user", [{"id": "old"}])
+    cache.put("other-user", [{"id": "other"}])
+
+    def serializer(purchases):
+        # Another user's lookup and a save of this user run while serializing
+        assert cache.get("other-user") == [{"id": "other"}]
+        cache.append("user", {"id": "new"})
+        return json.dumps(purchases)
+
+    assert cache.get_serialized("user", "json", serializer) == '[{"id": "old"}]'
+    # Serialized from the history before the save, so it is not kept
+    assert cache.get_serialized("user", "json", json.dumps) == '[{"id": "old"}, {"id": "new"}]'
+
+
+def test_a_serialized_history_is_cached_for_its_history_only():
+    cache = PurchaseHistoryCache()
+    purchases = [{"id": "old"}]
+    cache.put("user", purchases)
+    cache.add_serialized("user", [{"id": "other"}], "json", "stale")
+    cache.add_serialized("user", purchases, "json", "current")
+
+    assert cache.get_serialized("user", "json", lambda purchases: "computed") == "current"
+    assert cache.stats()["misses"] == 0
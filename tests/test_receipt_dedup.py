@@ -0,0 +1,124 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from PIL import Image, ImageDraw, ImageFilter
+
+from agentic_ai.receipt_dedup import (
+    FINGERPRINTS_STATE_KEY,
+    MAX_HASH_DISTANCE,
+    DuplicateReceiptFilter,
+    ReceiptFingerprintIndex,
+    hash_distance,
+    perceptual_hash,
+    purchase_key,
+)
+
+RECEIPT = {"merchantName": "Fresh Mart", "purchasedAt": "2025-06-01 10:00", "purchaseNumber": "7", "totalAmount": 280}
+
+
+def _photo(merchant: str, prices: list, angle: float = 1.0) -> bytes:
+    """Render a receipt on a table, the length of the paper follows the number of items."""
+    lines = [merchant, "2025-06-01 10:00", ""] + [f"Item {i}   {price}" for i, price in enumerate(prices)]
+    lines += ["", f"TOTAL {sum(prices)}"]
+    image = Image.linear_gradient("L").resize((900, 1200)).convert("RGB")
+    image = Image.blend(image, Image.new("RGB", image.size, (120, 90, 60)), 0.6)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((200, 60, 700, 140 + 40 * len(lines)), fill=(245, 243, 236))
+    draw.multiline_text((230, 90), "\n".join(lines), fill=(40, 40, 40), font_size=24, spacing=16)
+    image = image.rotate(angle, resample=Image.Resampling.BICUBIC, fillcolor=(90, 70, 50))
+    return _encode(image.filter(ImageFilter.GaussianBlur(1.0)), "JPEG", quality=92)
+
+
+def _encode(image: Image.Image, format: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def _reencode(data: bytes, format: str, **options) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        return _encode(image, format, **options)
+
+
+PHOTO = _photo("Fresh Mart", [40, 120, 60, 60])
+
+
+@pytest.mark.parametrize(
+    "copy",
+    [
+        pytest.param(lambda: PHOTO, id="re-upload"),
+        pytest.param(lambda: _reencode(PHOTO, "PNG"), id="png"),
+        pytest.param(lambda: _reencode(PHOTO, "JPEG", quality=75), id="jpeg-75"),
+        pytest.param(lambda: _reencode(PHOTO, "JPEG", quality=50), id="jpeg-50"),
+    ],
+)
+def test_re_encoded_copies_are_within_the_distance(copy):
+    assert hash_distance(perceptual_hash(PHOTO), perceptual_hash(copy())) <= MAX_HASH_DISTANCE
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        pytest.param(lambda: _photo("Fresh Mart", [40, 120, 60, 60, 35, 90, 15]), id="same-merchant-more-items"),
+        pytest.param(lambda: _photo("City Pharmacy", [250, 30], angle=-2), id="other-merchant"),
+    ],
+)
+def test_other_receipts_are_beyond_the_distance(other):
+    assert hash_distance(perceptual_hash(PHOTO), perceptual_hash(other())) > MAX_HASH_DISTANCE
+
+
+def test_uniform_and_invalid_images_have_no_hash():
+    assert perceptual_hash(_encode(Image.new("RGB", (400, 600), "white"), "PNG")) is None
+    assert perceptual_hash(b"not an image") is None
+
+
+def test_purchase_keys_parse_string_totals():
+    assert purchase_key(dict(RECEIPT, totalAmount="280")) == purchase_key(RECEIPT) is not None
+    assert purchase_key(dict(RECEIPT, totalAmount=" 280.001 ")) == purchase_key(RECEIPT)
+    for total in ("n/a", None, True, "nan"):
+        assert purchase_key(dict(RECEIPT, totalAmount=total)) is None
+
+
+def _index(image_hashes):
+    key = purchase_key(RECEIPT)
+    return ReceiptFingerprintIndex(loader=lambda user_id: ([RECEIPT], [(h, key) for h in image_hashes]))
+
+
+def test_find_image_matches_near_exact_hashes_only():
+    index = _index([perceptual_hash(PHOTO)])
+    assert index.find_image("user", perceptual_hash(_reencode(PHOTO, "JPEG", quality=75))) is RECEIPT
+    assert index.find_image("user", perceptual_hash(_photo("City Pharmacy", [250, 30], angle=-2))) is None
+    assert index.stats()["duplicate_images"] == 1
+
+
+def _request(*images):
+    parts = [types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=image)) for image in images]
+    return LlmRequest(contents=[types.Content(role="user", parts=parts)])
+
+
+def _callback_context():
+    return SimpleNamespace(state={}, _invocation_context=SimpleNamespace(user_id="user"))
+
+
+def test_the_filter_answers_re_uploads_without_the_model():
+    receipt_filter = DuplicateReceiptFilter(_index([perceptual_hash(PHOTO)]), wallet_token=lambda receipt: "token")
+    context = _callback_context()
+
+    response = receipt_filter(context, _request(_reencode(PHOTO, "JPEG", quality=75)))
+
+    assert json.loads(response.content.parts[0].text) == {**RECEIPT, "wallet_token": "token", "duplicate": True}
+    assert len(context.state[FINGERPRINTS_STATE_KEY]) == 1
+
+
+def test_the_filter_lets_new_receipts_through():
+    receipt_filter = DuplicateReceiptFilter(_index([perceptual_hash(PHOTO)]), wallet_token=lambda receipt: "token")
+    context = _callback_context()
+    other = _photo("Fresh Mart", [40, 120, 60, 60, 35, 90, 15])
+
+    # One new receipt among re-uploads is enough to call the model
+    assert receipt_filter(context, _request(PHOTO, other)) is None
+    assert context.state[FINGERPRINTS_STATE_KEY] == [perceptual_hash(PHOTO), perceptual_hash(other)]
@@ -0,0 +1,180 @@
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import Agent
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from agentic_ai import model_policy
+from agentic_ai.model_policy import KeywordIntentClassifier
+from agentic_ai.router import DEFAULT_ROUTES, IntentRouter, IntentRouterAgent, Route
+
+
+@pytest.mark.parametrize(
+    "text, intent",
+    [
+        ("Dashboard", model_policy.DASHBOARD),
+        ("dashboard", model_policy.DASHBOARD),
+        ('Generate data for "Dashboard" screen', model_policy.DASHBOARD),
+        ("Show me the dashboard.", model_policy.DASHBOARD),
+        ("Insights", model_policy.INSIGHTS),
+        ("Generate data for Insights screen", model_policy.INSIGHTS),
+        ("please get the insight data", model_policy.INSIGHTS),
+        ("ADD TO SHOPPING LIST: milk, eggs", model_policy.SHOPPING_LIST),
+        ("  add to shopping list: bread", model_policy.SHOPPING_LIST),
+        ("Give me a recipe for paneer butter masala", model_policy.SHOPPING_LIST),
+        ("hello", model_policy.CHIT_CHAT),
+        ("Thanks!", model_policy.CHIT_CHAT),
+        ("How much did I spend on snacks in June?", model_policy.FREE_FORM_QUERY),
+    ],
+)
+def test_classify(text, intent):
+    assert KeywordIntentClassifier().classify(text, has_attachments=False) == intent
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Why is groceries the top category on my dashboard?",
+        "Show my dashboard for last month",
+        "The dashboard numbers look wrong, what did I spend in May?",
+        "Any insights on my spending?",
+        "Give me insights about my coffee purchases this year",
+        "What does the Insights screen mean by tax ratio?",
+        "Dashboard for March please",
+    ],
+)
+def test_questions_mentioning_a_screen_are_free_form(text):
+    assert KeywordIntentClassifier().classify(text, has_attachments=False) == model_policy.FREE_FORM_QUERY
+
+
+def test_attachments_are_receipt_extraction():
+    classifier = KeywordIntentClassifier()
+    assert classifier.classify("Dashboard", has_attachments=True) == model_policy.RECEIPT_EXTRACTION
+    assert classifier.classify("", has_attachments=True) == model_policy.RECEIPT_EXTRACTION
+
+
+def _request(*parts: types.Part, role: str = "user") -> LlmRequest:
+    return LlmRequest(contents=[types.Content(role=role, parts=list(parts))])
+
+
+def _context() -> SimpleNamespace:
+    return SimpleNamespace(invocation_id="test-invocation")
+
+
+def _router(calls: list) -> IntentRouter:
+    def handler(name):
+        def handle(callback_context, match):
+            calls.append((name, match.groups()))
+            return f"{name} response"
+
+        return handle
+
+    return IntentRouter([Route(route.name, route.pattern.pattern, handler(route.name)) for route in DEFAULT_ROUTES])
+
+
+@pytest.mark.parametrize(
+    "text, route",
+    [
+        ("Dashboard", "dashboard"),
+        ('Generate data for "Insights" screen', "insights"),
+        ("ADD TO SHOPPING LIST: milk, eggs", "shopping_list"),
+    ],
+)
+def test_router_answers_fixed_format_requests(text, route):
+    calls = []
+    router = _router(calls)
+    response = router(_context(), _request(types.Part(text=text)))
+    assert response.content.parts[0].text == f"{route} response"
+    assert [name for name, _ in calls] == [route]
+    assert router.stats()[route] == 1
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Why is groceries the top category on my dashboard?",
+        "Any insights on my spending?",
+        "Please add milk to my shopping list",
+        "hello",
+    ],
+)
+def test_router_leaves_other_requests_to_the_model(text):
+    calls = []
+    router = _router(calls)
+    assert router(_context(), _request(types.Part(text=text))) is None
+    assert calls == []
+    assert router.stats()["model"] == 1
+    assert router.stats()["hit_ratio"] == 0.0
+
+
+def test_router_skips_attachments_and_tool_responses():
+    calls = []
+    router = _router(calls)
+    image = types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=b"receipt"))
+    assert router(_context(), _request(types.Part(text="Dashboard"), image)) is None
+    function_response = types.Part(function_response=types.FunctionResponse(name="get_dashboard_data", response={}))
+    assert router(_context(), _request(function_response)) is None
+    assert router(_context(), _request(types.Part(text="Dashboard"), role="model")) is None
+    assert calls == []
+
+
+def test_router_falls_back_to_the_model_when_a_handler_fails_or_gives_up():
+    def fail(callback_context, match):
+        raise RuntimeError("backend down")
+
+    router = IntentRouter(
+        [
+            Route("failing", r"^fail$", fail),
+            Route("giving_up", r"^give up$", lambda callback_context, match: None),
+        ]
+    )
+    assert router(_context(), _request(types.Part(text="fail"))) is None
+    assert router(_context(), _request(types.Part(text="give up"))) is None
+    assert router.stats() == {"failing": 0, "giving_up": 0, "model": 2, "hit_ratio": 0.0}
+
+
+@pytest.fixture
+def root_agent():
+    names = {
+        model_policy.RECEIPT_EXTRACTION: "extraction_agent",
+        model_policy.DASHBOARD: "dashboard_agent",
+        model_policy.INSIGHTS: "insights_agent",
+        model_policy.SHOPPING_LIST: "shopping_list_agent",
+        model_policy.FREE_FORM_QUERY: "query_agent",
+        model_policy.CHIT_CHAT: "query_agent",
+    }
+    return IntentRouterAgent(
+        name="root_agent",
+        sub_agents=[Agent(name=name, model="stub") for name in sorted(set(names.values()))],
+        classifier=KeywordIntentClassifier(),
+        intent_agents=names,
+        default_agent="query_agent",
+    )
+
+
+@pytest.mark.parametrize(
+    "parts, agent",
+    [
+        ([types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=b"receipt"))], "extraction_agent"),
+        (
+            [types.Part(text="[IMAGE-ID 0123456789ab]"), types.Part(file_data=types.FileData(file_uri="gs://b/r"))],
+            "extraction_agent",
+        ),
+        ([types.Part(text="Dashboard")], "dashboard_agent"),
+        ([types.Part(text="Generate data for Insights screen")], "insights_agent"),
+        ([types.Part(text="ADD TO SHOPPING LIST: rice")], "shopping_list_agent"),
+        ([types.Part(text="Why is groceries the top category on my dashboard?")], "query_agent"),
+        ([types.Part(text="Any insights on my spending?")], "query_agent"),
+        ([types.Part(text="hello")], "query_agent"),
+        ([], "query_agent"),
+    ],
+)
+def test_root_agent_routes_turns(root_agent, parts, agent):
+    assert root_agent.route(types.Content(role="user", parts=parts)).name == agent
+
+
+def test_root_agent_routes_unknown_intents_to_the_default_agent(root_agent):
+    root_agent.classifier = SimpleNamespace(classify=lambda text, has_attachments: "unknown")
+    assert root_agent.route(types.Content(role="user", parts=[types.Part(text="Dashboard")])).name == "query_agent"
+    assert root_agent.route(None).name == "query_agent"
@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentic_ai.single_flight import SingleFlight
+
+WAITERS = 8
+
+
+class SlowBackend:
+    """Backend whose calls block until released, counting the calls and the callers waiting."""
+
+    def __init__(self, flight: SingleFlight, error: Exception | None = None):
+        self.flight = flight
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def query(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {"call": self.calls}
+
+    def wait_for_waiters(self, count: int):
+        """Wait until `count` callers joined the computation in flight."""
+        for _ in range(500):
+            if self.flight.stats()["shared"] >= count:
+                return
+            time.sleep(0.01)
+        raise AssertionError("callers did not join the computation")
+
+
+def _run_concurrently(flight: SingleFlight, backend: SlowBackend, key="user"):
+    executor = ThreadPoolExecutor(max_workers=WAITERS)
+    futures = [executor.submit(flight.do, key, backend.query)]
+    assert backend.started.wait(5)
+    futures += [executor.submit(flight.do, key, backend.query) for _ in range(WAITERS - 1)]
+    backend.wait_for_waiters(WAITERS - 1)
+    backend.release.set()
+    executor.shutdown(wait=True)
+    return futures
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight("test")
+    backend = SlowBackend(flight)
+    futures = _run_concurrently(flight, backend)
+
+    results = [future.result() for future in futures]
+    assert backend.calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"name": "test", "calls": 1, "shared": WAITERS - 1, "in_flight": 0}
+
+
+def test_the_error_reaches_every_waiter():
+    flight = SingleFlight("test")
+    error = RuntimeError("Firestore unavailable")
+    backend = SlowBackend(flight, error=error)
+    futures = _run_concurrently(flight, backend)
+
+    for future in futures:
+        with pytest.raises(RuntimeError) as raised:
+            future.result()
+        assert raised.value is error
+    assert backend.calls == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_results_are_not_reused_after_completion():
+    flight = SingleFlight("test")
+    calls = []
+
+    def query():
+        calls.append(None)
+        return len(calls)
+
+    assert flight.do("user", query) == 1
+    assert flight.do("user", query) == 2
+    assert flight.stats()["shared"] == 0
+
+
+def test_a_failed_computation_is_not_reused():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("transient")
+
+    with pytest.raises(ValueError):
+        flight.do("user", fail)
+    assert flight.do("user", lambda: "recovered") == "recovered"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    backend = SlowBackend(flight)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(flight.do, "first-user", backend.query)
+        assert backend.started.wait(5)
+        assert flight.do("second-user", lambda: "second") == "second"
+        backend.release.set()
+        assert first.result() == {"call": 1}
+    assert flight.stats()["calls"] == 2
@@ -0,0 +1,70 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from agentic_ai import tools
+from agentic_ai.analytics import build_dashboard
+from agentic_ai.sqlite_repository import SQLitePurchaseRepository
+
+RECEIPT = {
+    "merchantName": "Fresh Mart",
+    "purchasedAt": "2025-06-01 10:00",
+    "purchaseNumber": "INV-1",
+    "totalAmount": 280,
+    "items": [{"name": "Milk", "category": "Dairy", "totalPrice": 280, "quantity": 2}],
+}
+
+
+class SlowRepository(SQLitePurchaseRepository):
+    """SQLite repository whose next history query blocks until released, once armed."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.armed = False
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def load_history(self, user_id):
+        history = super().load_history(user_id)
+        if self.armed:
+            self.armed = False
+            self.started.set()
+            assert self.release.wait(5)
+        return history
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    repository = SlowRepository(str(tmp_path / "purchases.db"))
+    monkeypatch.setattr(tools, "PURCHASE_REPOSITORY", repository)
+    monkeypatch.setattr(tools, "get_generic_pass_token", lambda *args: "wallet-token")
+    yield repository
+    repository.release.set()
+
+
+def _context(user_id):
+    return SimpleNamespace(_invocation_context=SimpleNamespace(user_id=user_id), state={})
+
+
+def test_a_request_after_a_save_does_not_join_an_older_history_query(repository):
+    user_id = "user-after-save"
+    # The receipt index is loaded and the cached history expired
+    assert not tools.RECEIPT_INDEX.contains(user_id, "unknown")
+    tools.PURCHASE_CACHE.invalidate(user_id)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        repository.armed = True
+        before_save = executor.submit(tools._fetch_user_purchases, user_id)
+        assert repository.started.wait(5)
+
+        assert tools.save_attachment_data(dict(RECEIPT), _context(user_id)) == {"wallet_token": "wallet-token"}
+        dashboard = executor.submit(tools.get_dashboard_data, _context(user_id)).result(timeout=5)
+        repository.release.set()
+        assert before_save.result(timeout=5) == []
+
+    expected = build_dashboard(list(repository.load_history(user_id).values()))
+    assert json.loads(dashboard) == expected
+    assert json.loads(tools.get_dashboard_data(_context(user_id))) == expected
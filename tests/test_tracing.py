@@ -0,0 +1,39 @@
+import pytest
+
+import logger
+import tracing
+
+
+@pytest.fixture
+def entries(monkeypatch):
+    logged = []
+    monkeypatch.setattr(tracing, "_ENABLED", True)
+    monkeypatch.setattr(tracing, "_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(logger, "info", lambda message, **kwargs: logged.append({"message": message, **kwargs}))
+    return logged
+
+
+def test_attributes_named_like_log_fields_are_nested(entries):
+    with tracing.span("tool.test", name="hello", message="hello", severity="high") as span:
+        span.set(span_id="mine", trace_id="mine")
+        span.event("Event", message="inner")
+
+    event, ended = entries
+    assert event["attributes"] == {"message": "inner"}
+    assert ended["message"] == "span tool.test"
+    assert ended["span_id"] == span.span_id
+    assert ended["attributes"] == {
+        "name": "hello",
+        "message": "hello",
+        "severity": "high",
+        "span_id": "mine",
+        "trace_id": "mine",
+    }
+
+
+def test_a_failing_span_logs_the_error(entries):
+    with pytest.raises(ValueError):
+        with tracing.span("tool.test"):
+            raise ValueError("bad")
+
+    assert entries[0]["attributes"] == {"error": "ValueError: bad"}
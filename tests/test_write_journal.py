@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+
+import pytest
+
+from agentic_ai import write_journal
+from agentic_ai.write_journal import WriteBehindJournal
+
+
+class FlakyDatabase:
+    """Flush function refusing the entries of `refused` IDs, and every batch while `down` is set."""
+
+    def __init__(self, refused=()):
+        self.refused = set(refused)
+        self.down = threading.Event()
+        self.documents = {}
+
+    def flush(self, entries):
+        if self.down.is_set():
+            raise ConnectionError("Database unavailable")
+        for entry in entries:
+            if entry.id in self.refused:
+                raise ValueError(f"Invalid document {entry.id}")
+        self.documents.update((entry.id, entry.document) for entry in entries)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(write_journal, "RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(write_journal, "RETRY_MAX_SECONDS", 0.05)
+
+
+def _journal(tmp_path, database, batch_size=8):
+    journal = WriteBehindJournal(str(tmp_path), database.flush, batch_size=batch_size, flush_interval=0.01)
+    journal.start()
+    return journal
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_a_refused_entry_is_dead_lettered_and_the_others_are_flushed(tmp_path):
+    database = FlakyDatabase(refused={"receipt-5"})
+    journal = _journal(tmp_path, database)
+    for index in range(20):
+        journal.append("user-1", f"receipt-{index}", {"index": index})
+
+    _wait(lambda: journal.stats()["pending"] == 0)
+    journal.stop()
+
+    assert sorted(database.documents) == sorted(f"receipt-{index}" for index in range(20) if index != 5)
+    assert journal.stats()["dead_lettered"] == 1
+    with open(journal.dead_letter_path) as file:
+        (record,) = [json.loads(line) for line in file]
+    assert (record["id"], record["user_id"], record["document"]) == ("receipt-5", "user-1", {"index": 5})
+    assert "Invalid document" in record["error"]
+
+    # Not replayed on next start
+    restarted = _journal(tmp_path, database)
+    assert restarted.replayed == 0
+    restarted.stop()
+
+
+def test_nothing_is_dead_lettered_during_an_outage(tmp_path):
+    database = FlakyDatabase()
+    database.down.set()
+    journal = _journal(tmp_path, database)
+    for index in range(20):
+        journal.append("user-1", f"receipt-{index}", {"index": index})
+
+    _wait(lambda: journal.stats()["failed_flushes"] >= 30)
+    database.down.clear()
+    assert journal.wait_flushed("user-1")
+    journal.stop()
+
+    assert len(database.documents) == 20
+    assert journal.stats()["dead_lettered"] == 0
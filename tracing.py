@@ -0,0 +1,153 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import contextvars
+import random
+import time
+
+import logger
+from settings import get_settings
+
+SETTINGS = get_settings()
+
+# Read once, so that a disabled tracer costs a global lookup per span
+_ENABLED = SETTINGS.TRACING_ENABLED
+_SAMPLE_RATE = SETTINGS.TRACE_SAMPLE_RATE
+
+# Innermost open span of the current thread or task
+_CURRENT_SPAN = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Span returned when tracing is disabled or the trace is not sampled, every method does nothing."""
+
+    __slots__ = ()
+
+    sampled = False
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def event(self, message: str, /, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _UnsampledRoot(_NoopSpan):
+    """Root of a trace that head sampling dropped, marks its children as not sampled too."""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self) -> "_UnsampledRoot":
+        self._token = _CURRENT_SPAN.set(NOOP_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        _CURRENT_SPAN.reset(self._token)
+        return False
+
+
+class Span:
+    """A timed operation, logged with its duration and attributes when it ends.
+
+    Attributes:
+        name: Name of the operation, e.g. "tool.get_dashboard_data" or "gcs.save_artifact".
+        trace_id: ID shared by all the spans of a trace.
+        span_id: ID of this span.
+        parent_id: ID of the enclosing span, None for the root of a trace.
+        attributes: Values logged with the span, e.g. payload sizes, nested under "attributes" so that
+            names such as "message" or "severity" do not clash with the fields of the log entry.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "_start", "_token")
+
+    sampled = True
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+
+    def __enter__(self) -> "Span":
+        self._token = _CURRENT_SPAN.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        _CURRENT_SPAN.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc_value}"
+        logger.info(
+            f"span {self.name}",
+            span=self.name,
+            trace_id=self.trace_id,
+            span_id=self.span_id,
+            parent_id=self.parent_id,
+            duration_ms=round(duration_ms, 3),
+            attributes=self.attributes,
+        )
+        return False
+
+    def set(self, **attributes) -> None:
+        """Add attributes to the span, logged when it ends."""
+        self.attributes.update(attributes)
+
+    def event(self, message: str, /, **attributes) -> None:
+        """Log a message right away, tagged with the IDs of the span."""
+        logger.info(message, span=self.name, trace_id=self.trace_id, span_id=self.span_id, attributes=attributes)
+
+
+def span(name: str, /, **attributes):
+    """Open a span, to be used as a context manager.
+
+    Head sampling decides once per trace, when its root span is opened,
+    whether the whole trace is logged. When tracing is disabled, the shared
+    no-op span is returned without any allocation.
+
+    Args:
+        name: Name of the operation
+        **attributes: Initial attributes of the span
+
+    Returns:
+        Span | _NoopSpan: The span, check `sampled` before computing expensive attributes
+    """
+    if not _ENABLED:
+        return NOOP_SPAN
+    parent = _CURRENT_SPAN.get()
+    if parent is None:
+        if random.random() >= _SAMPLE_RATE:
+            return _UnsampledRoot()
+    elif parent is NOOP_SPAN:
+        return NOOP_SPAN
+    return Span(name, parent, attributes)
+
+
+def current_span():
+    """Return the innermost open span, the no-op span if there is none."""
+    if not _ENABLED:
+        return NOOP_SPAN
+    return _CURRENT_SPAN.get() or NOOP_SPAN
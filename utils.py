@@ -14,7 +14,6 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from google.cloud import storage
 from settings import get_settings
 import base64
 import re
@@ -24,14 +23,66 @@ import hashlib
 import json
 from google.adk.artifacts import GcsArtifactService
 import logger
+import tracing
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from artifact_cache import ArtifactCache
+from artifact_index import ArtifactPresence, KnownArtifactIndex
+from image_preprocessing import ImagePreprocessor
 
 
 SETTINGS = get_settings()
 
-GCS_BUCKET_CLIENT = storage.Client(project=SETTINGS.GCLOUD_PROJECT_ID).get_bucket(
-    SETTINGS.STORAGE_BUCKET_NAME
+# Local cache of uploaded and downloaded images, keyed by user and image hash ID
+ARTIFACT_CACHE = ArtifactCache(
+    directory=SETTINGS.ARTIFACT_CACHE_DIR,
+    max_memory_bytes=SETTINGS.ARTIFACT_CACHE_MEMORY_BYTES,
+    max_disk_bytes=SETTINGS.ARTIFACT_CACHE_DISK_BYTES,
 )
 
+# Bounded pool processing the files of a request in parallel
+UPLOAD_EXECUTOR = ThreadPoolExecutor(
+    max_workers=SETTINGS.ARTIFACT_UPLOAD_WORKERS, thread_name_prefix="artifact-upload"
+)
+
+# Shrinks the uploaded images before they are stored and sent to the model
+IMAGE_PREPROCESSOR = ImagePreprocessor(
+    max_dimension=SETTINGS.IMAGE_MAX_DIMENSION,
+    output_format=SETTINGS.IMAGE_OUTPUT_FORMAT,
+    quality=SETTINGS.IMAGE_QUALITY,
+    crop_margins=SETTINGS.IMAGE_CROP_MARGINS,
+    enabled=SETTINGS.IMAGE_PREPROCESSING_ENABLED,
+    workers=SETTINGS.IMAGE_PREPROCESS_WORKERS,
+)
+
+# Artifacts already stored in GCS, checked before asking GCS with list_versions
+ARTIFACT_INDEX = KnownArtifactIndex(
+    path=SETTINGS.ARTIFACT_INDEX_PATH, authoritative=SETTINGS.ARTIFACT_INDEX_AUTHORITATIVE
+)
+
+# The bucket client is created on first use, see `get_gcs_bucket`
+_GCS_BUCKET_CLIENT = None
+_GCS_BUCKET_LOCK = threading.Lock()
+
+
+def get_gcs_bucket():
+    """Return the receipts storage bucket, creating the client on first use.
+
+    Returns:
+        storage.Bucket: The bucket named by STORAGE_BUCKET_NAME
+    """
+    global _GCS_BUCKET_CLIENT
+    if _GCS_BUCKET_CLIENT is None:
+        with _GCS_BUCKET_LOCK:
+            if _GCS_BUCKET_CLIENT is None:
+                from google.cloud import storage
+
+                _GCS_BUCKET_CLIENT = storage.Client(project=SETTINGS.GCLOUD_PROJECT_ID).get_bucket(
+                    SETTINGS.STORAGE_BUCKET_NAME
+                )
+    return _GCS_BUCKET_CLIENT
+
 
 def store_uploaded_image_as_artifact(
     artifact_service: GcsArtifactService,
@@ -39,9 +90,10 @@ def store_uploaded_image_as_artifact(
     user_id: str,
     session_id: str,
     image_data: ImageData,
-) -> tuple[str, bytes]:
+) -> tuple[str, bytes, str]:
     """
     Store an uploaded image as an artifact in Google Cloud Storage.
+    The image is preprocessed first, see IMAGE_PREPROCESSOR, its hash ID is the one of the uploaded bytes.
 
     Args:
         artifact_service: The artifact service to use for storing artifacts
@@ -51,7 +103,7 @@ def store_uploaded_image_as_artifact(
         image_data: The image data to store
 
     Returns:
-        tuple[str, bytes]: A tuple containing the image hash ID and the image byte
+        tuple[str, bytes, str]: A tuple containing the image hash ID, the stored image byte and its MIME type
     """
 
     # Decode the base64 image data and use it to generate a hash id
@@ -59,28 +111,51 @@ def store_uploaded_image_as_artifact(
     hasher = hashlib.sha256(image_byte)
     image_hash_id = hasher.hexdigest()[:12]
 
-    artifact_versions = artifact_service.list_versions(
-        app_name=app_name,
-        user_id=user_id,
-        session_id=session_id,
-        filename=image_hash_id,
-    )
-    if artifact_versions:
+    # Only ask GCS when the index cannot tell whether the image was uploaded
+    presence = ARTIFACT_INDEX.lookup(app_name, user_id, session_id, image_hash_id)
+    if presence is ArtifactPresence.POSSIBLE:
+        with tracing.span("gcs.list_versions"):
+            artifact_versions = artifact_service.list_versions(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=image_hash_id,
+            )
+        if artifact_versions:
+            presence = ArtifactPresence.KNOWN
+            ARTIFACT_INDEX.add(app_name, user_id, session_id, image_hash_id)
+        else:
+            ARTIFACT_INDEX.record_false_positive()
+
+    if presence is ArtifactPresence.KNOWN:
         logger.info(f"Image {image_hash_id} already exists in GCS, skipping upload")
+        cached = ARTIFACT_CACHE.get(user_id, image_hash_id)
+        if cached:
+            return image_hash_id, *cached
 
-        return image_hash_id, image_byte
+    # Processing is deterministic, an image already stored is processed into the stored bytes
+    with tracing.span("image.preprocess", bytes_in=len(image_byte)) as span:
+        image_byte, mime_type = IMAGE_PREPROCESSOR.run(image_byte, image_data.mime_type)
+        span.set(bytes_out=len(image_byte))
 
-    artifact_service.save_artifact(
-        app_name=app_name,
-        user_id=user_id,
-        session_id=session_id,
-        filename=image_hash_id,
-        artifact=types.Part(
-            inline_data=types.Blob(mime_type=image_data.mime_type, data=image_byte)
-        ),
-    )
+    if presence is ArtifactPresence.KNOWN:
+        ARTIFACT_CACHE.put(user_id, image_hash_id, image_byte, mime_type)
+        return image_hash_id, image_byte, mime_type
 
-    return image_hash_id, image_byte
+    with tracing.span("gcs.save_artifact", bytes=len(image_byte)):
+        artifact_service.save_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=image_hash_id,
+            artifact=types.Part(
+                inline_data=types.Blob(mime_type=mime_type, data=image_byte)
+            ),
+        )
+    ARTIFACT_INDEX.add(app_name, user_id, session_id, image_hash_id)
+    ARTIFACT_CACHE.put(user_id, image_hash_id, image_byte, mime_type)
+
+    return image_hash_id, image_byte, mime_type
 
 
 def download_image_from_gcs(
@@ -93,7 +168,7 @@ def download_image_from_gcs(
     """
     Downloads an image artifact from Google Cloud Storage and
     returns it as base64 encoded string with its MIME type.
-    Uses local caching to avoid redundant downloads.
+    Uses local caching to avoid redundant downloads, see ARTIFACT_CACHE.
 
     Args:
         artifact_service: The artifact service to use for downloading artifacts
@@ -105,13 +180,20 @@ def download_image_from_gcs(
     Returns:
         tuple[str, str] | None: A tuple containing (base64_encoded_data, mime_type), or None if download fails
     """
+    cached = ARTIFACT_CACHE.get_base64(user_id, image_hash)
+    if cached:
+        logger.debug(f"Image {image_hash} served from local cache")
+        return cached
+
     try:
-        artifact = artifact_service.load_artifact(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            filename=image_hash,
-        )
+        with tracing.span("gcs.load_artifact") as span:
+            artifact = artifact_service.load_artifact(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=image_hash,
+            )
+            span.set(bytes=len(artifact.inline_data.data) if artifact else 0)
         if not artifact:
             logger.info(f"Image {image_hash} does not exist in GCS Artifact Service")
             return None
@@ -122,12 +204,24 @@ def download_image_from_gcs(
 
         logger.info(f"Downloaded image {image_hash} with type {mime_type}")
 
-        return base64.b64encode(image_data).decode("utf-8"), mime_type
+        encoded_image = base64.b64encode(image_data).decode("utf-8")
+        ARTIFACT_CACHE.put(user_id, image_hash, image_data, mime_type, encoded=encoded_image)
+        return encoded_image, mime_type
     except Exception as e:
         logger.error(f"Error downloading image from GCS: {e}")
         return None
 
 
+def _completed(function, *args) -> Future:
+    """Run a function in the calling thread and wrap its outcome in a Future."""
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
 def format_user_request_to_adk_content_and_store_artifacts(
     request: ChatRequest, app_name: str, artifact_service: GcsArtifactService
 ) -> types.Content:
@@ -144,11 +238,9 @@ def format_user_request_to_adk_content_and_store_artifacts(
     # Create a list to hold parts
     parts = []
 
-    # Handle image files if present
-    for data in request.files:
-        # Process the image and add string placeholder
-
-        image_hash_id, image_byte = store_uploaded_image_as_artifact(
+    # Decode, hash, preprocess and upload the files concurrently, the results keep the file order
+    def store(data: ImageData) -> tuple[str, bytes, str]:
+        return store_uploaded_image_as_artifact(
             artifact_service=artifact_service,
             app_name=app_name,
             user_id=request.user_id,
@@ -156,10 +248,26 @@ def format_user_request_to_adk_content_and_store_artifacts(
             image_data=data,
         )
 
+    if len(request.files) == 1:
+        futures = [_completed(store, request.files[0])]
+    else:
+        # Run in a copy of the caller's context, so that the spans of the workers join the trace
+        futures = [UPLOAD_EXECUTOR.submit(contextvars.copy_context().run, store, data) for data in request.files]
+
+    # Handle image files if present
+    for index, (data, future) in enumerate(zip(request.files, futures)):
+        try:
+            image_hash_id, image_byte, mime_type = future.result()
+        except Exception as e:
+            # A failing file must not fail the whole message, tell the model instead
+            logger.error(f"Failed to process attachment {index + 1}: {e}")
+            parts.append(types.Part(text=f"[ATTACHMENT {index + 1} COULD NOT BE PROCESSED]"))
+            continue
+
         # Add inline data part
         parts.append(
             types.Part(
-                inline_data=types.Blob(mime_type=data.mime_type, data=image_byte)
+                inline_data=types.Blob(mime_type=mime_type, data=image_byte)
             )
         )
 